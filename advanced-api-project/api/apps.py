@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Declares the autocomplete indexes, which connect their own signal handlers
+        from . import autocomplete  # noqa: F401
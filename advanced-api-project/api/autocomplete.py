@@ -0,0 +1,10 @@
+# api/autocomplete.py
+
+from prefixindex import PrefixIndex
+
+
+# Type-ahead indexes behind BookAutocompleteView (see prefixindex.PrefixIndex)
+indexes = {
+    'titles': PrefixIndex('api.Book', 'title'),
+    'authors': PrefixIndex('api.Author', 'name'),
+}
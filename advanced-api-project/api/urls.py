@@ -1,11 +1,14 @@
 # advanced_api_project/api/urls.py
 from django.urls import path
-from .views import BookListView, BookDetailView, BookCreateView, BookUpdateView, BookDeleteView
+from .views import BookListView, BookAutocompleteView, BookDetailView, BookCreateView, BookUpdateView, BookDeleteView
 
 urlpatterns = [
     # Endpoint for listing all books and applying filters/search.
     path('books/', BookListView.as_view(), name='book-list'),
     
+    # Endpoint for type-ahead suggestions of book titles and author names.
+    path('books/autocomplete/', BookAutocompleteView.as_view(), name='book-autocomplete'),
+
     # Endpoint for creating a new book.
     path('books/create/', BookCreateView.as_view(), name='book-create'),
     
@@ -6,6 +6,9 @@ from django_filters import rest_framework as django_filters
 from .serializers import BookSerializer
 from rest_framework import mixins
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from .autocomplete import indexes
 
 
 # This view handles listing all books and creating a new one.
@@ -30,6 +33,23 @@ class BookListView(generics.ListAPIView):
     ordering_fields = ['title', 'publication_year']
     ordering = ['title']
 
+# This view answers type-ahead lookups for the BookListView search box.
+# ?q= is the typed text and ?kind= is titles (default) or authors.
+class BookAutocompleteView(APIView):
+    """
+    Suggestions from the in-memory prefix indexes in api.autocomplete,
+    so each keystroke is a binary search rather than a LIKE scan.
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    limit = 10
+
+    def get(self, request):
+        index = indexes.get(request.query_params.get('kind', 'titles'))
+        if index is None:
+            return Response({'error': 'Unknown kind.'}, status=400)
+        suggestions = index.suggest(request.query_params.get('q', ''), limit=self.limit)
+        return Response({'results': [{'id': pk, 'label': label} for pk, label in suggestions]})
+
 class BookDetailView(generics.RetrieveAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
@@ -10,11 +10,15 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Apps shared by the projects of this repository (e.g. prefixindex)
+sys.path.insert(0, str(BASE_DIR.parent.parent / 'shared'))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -61,6 +65,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'prefixindex',
     # My Apps
     #'relationship_app.apps.RelationshipAppConfig'
     'bookshelf.CustomUser',
@@ -156,3 +161,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = '/login/' # This must match the actual URL for your login page
 LOGIN_REDIRECT_URL = '/admin_view/' # This is where users go after successful login
 # --- END IMPORTANT ---
+
+# Autocomplete index refresh (see shared/README.md)
+AUTOCOMPLETE_MAX_AGE = 300
+AUTOCOMPLETE_REBUILD_INTERVAL = 60 * 60
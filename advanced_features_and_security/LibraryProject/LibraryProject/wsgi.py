@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LibraryProject.settings')
 
 application = get_wsgi_application()
+
+# Load the autocomplete indexes in the background before the first request
+from prefixindex import warm_all  # noqa: E402
+
+warm_all()
@@ -0,0 +1,9 @@
+# bookshelf/autocomplete.py
+
+from prefixindex import PrefixIndex
+
+
+# Type-ahead index behind search_book_autocomplete (see prefixindex.PrefixIndex)
+indexes = {
+    'titles': PrefixIndex('bookshelf.Book', 'title'),
+}
@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('books/', views.book_list, name='book_list'),
+    path('books/autocomplete/', views.search_book_autocomplete, name='book_autocomplete'),
     path('books/create/', views.book_create, name='book_create'),
     path('books/<int:book_id>/edit/', views.book_edit, name='book_edit'),
     path('books/<int:book_id>/delete/', views.book_delete, name='book_delete'),
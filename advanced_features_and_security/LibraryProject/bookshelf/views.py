@@ -1,10 +1,11 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, get_object_or_404
 from django.http import HttpResponseForbidden
 from .models import Book
 from django.contrib.auth.decorators import login_required, permission_required
 from .forms import BookForm
 from .forms import ExampleForm
+from .autocomplete import indexes
 
 
 def index(request):
@@ -42,6 +43,16 @@ def search_book(request):
 
     return render(request, 'bookshelf/form_example.html', {'books': books})
 
+@login_required
+@permission_required('bookshelf.can_view', raise_exception=True)
+def search_book_autocomplete(request):
+    """
+    Type-ahead suggestions for the search_book title box, answered from the
+    in-memory prefix index in bookshelf.autocomplete instead of scanning books.
+    """
+    suggestions = indexes['titles'].suggest(request.GET.get('q', ''), limit=10)
+    return JsonResponse({'results': [{'id': pk, 'title': title} for pk, title in suggestions]})
+
 def create_book(request):
     if request.method == 'POST':
         form = BookForm(request.POST)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        # Connects the search index signal handlers and declares the
+        # autocomplete indexes, which connect their own
+        from . import autocomplete, signals  # noqa: F401
@@ -0,0 +1,14 @@
+# blog/autocomplete.py
+
+from django.conf import settings
+from prefixindex import PrefixIndex
+
+
+# Type-ahead indexes for the search box (see prefixindex.PrefixIndex).
+# Post titles use updated_at as their high-water mark, so edits made by
+# other processes arrive with the next refresh rather than the next rebuild.
+indexes = {
+    'titles': PrefixIndex('blog.Post', 'title', mark='updated_at'),
+    'tags': PrefixIndex('taggit.Tag', 'name'),
+    'users': PrefixIndex(settings.AUTH_USER_MODEL, 'username', filters={'is_active': True}),
+}
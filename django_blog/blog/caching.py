@@ -0,0 +1,65 @@
+# blog/caching.py
+
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+HOME = 'home'
+
+
+def cache_timeout():
+    """
+    How long a rendered list fragment may sit unused in the cache. Entries
+    never go stale before that: they are retired by version bumps.
+    """
+    return getattr(settings, 'POST_LIST_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def version_key(scope):
+    return f'blog:list:version:{scope}'
+
+
+def tag_scope(slug):
+    return f'tag:{slug}'
+
+
+def list_version(scope):
+    """
+    Returns the version stamp of a cached list: HOME for the post list, or
+    tag_scope(slug) for one tag's posts. Fragments are stored under the
+    stamp they were rendered at, so bumping it retires every page of that
+    list at once. A missing stamp restarts from the clock, never from a
+    number that was used before.
+    """
+    key = version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def fragment_key(scope, page):
+    return f'blog:list:{scope}:{list_version(scope)}:{page}'
+
+
+def invalidate_lists(tag_slugs=(), home=True):
+    """
+    Bumps the version stamps of the post list and of these tags' lists once
+    the current transaction commits, so a reader cannot re-cache rows that
+    are about to change.
+    """
+    scopes = [tag_scope(slug) for slug in set(tag_slugs)]
+    if home:
+        scopes.append(HOME)
+
+    def bump():
+        for scope in scopes:
+            try:
+                cache.incr(version_key(scope))
+            except ValueError:
+                cache.set(version_key(scope), time.time_ns(), None)
+
+    transaction.on_commit(bump)
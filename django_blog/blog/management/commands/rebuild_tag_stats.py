@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from blog.tagstats import BATCH_SIZE, rebuild_tag_stats
+
+
+class Command(BaseCommand):
+    """
+    Recomputes blog.models.TagStat from taggit's through table. Signals keep
+    the counts current for normal edits; run this after a backfill, a raw
+    import, or any bulk change to tags that bypassed them.
+    """
+    help = 'Rebuild the per-tag post counts used by the tag cloud.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help=f'Number of rows written per statement (default: {BATCH_SIZE}).')
+
+    def handle(self, *args, **options):
+        counted = rebuild_tag_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Counted posts for {counted} tags.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from blog.models import Post
+from blog.rendering import BATCH_SIZE, RENDERER_VERSION, rerender_stale
+
+
+class Command(BaseCommand):
+    """
+    Re-renders the stored HTML and excerpts of posts saved under an older
+    blog.rendering.RENDERER_VERSION. Pages re-render stale posts as they show
+    them; run this after a renderer upgrade to catch up on the rest in batches.
+    """
+    help = 'Re-render post bodies stored by an older renderer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help=f'Number of posts rendered per batch (default: {BATCH_SIZE}).')
+
+    def handle(self, *args, **options):
+        rendered = rerender_stale(Post.objects.all(), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Re-rendered {rendered} posts to version {RENDERER_VERSION}.'))
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+
+    # Fill tag_text from the existing tags
+    content_type = ContentType.objects.filter(app_label='blog', model='post').first()
+    if content_type is not None:
+        names = {}
+        tagged = TaggedItem.objects.filter(content_type=content_type).values_list('object_id', 'tag__name')
+        for object_id, name in tagged.iterator():
+            names.setdefault(object_id, []).append(name)
+        posts = list(Post.objects.filter(pk__in=names.keys()).only('id'))
+        for post in posts:
+            post.tag_text = ' '.join(sorted(names[post.pk]))
+        Post.objects.bulk_update(posts, ['tag_text'], batch_size=1000)
+
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE blog_post_fts USING fts5(title, content, tags, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            'INSERT INTO blog_post_fts (rowid, title, content, tags) SELECT id, title, content, tag_text FROM blog_post'
+        )
+    elif vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE blog_post ADD FULLTEXT INDEX blog_post_search_idx (title, content, tag_text)')
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS blog_post_fts')
+    elif vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE blog_post DROP INDEX blog_post_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_tags'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearchIndex',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='blog.post')),
+                ('title', models.TextField()),
+                ('content', models.TextField()),
+                ('tags', models.TextField()),
+            ],
+            options={
+                'db_table': 'blog_post_fts',
+                'managed': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='tag_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
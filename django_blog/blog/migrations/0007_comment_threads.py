@@ -0,0 +1,55 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_comment_paths(apps, schema_editor):
+    # Existing comments all start their own thread
+    Comment = apps.get_model('blog', 'Comment')
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    last_id = 0
+    while True:
+        batch = list(Comment.objects.filter(pk__gt=last_id).order_by('pk').only('id')[:1000])
+        if not batch:
+            break
+        for comment in batch:
+            pk, segment = comment.pk, ''
+            while pk:
+                pk, digit = divmod(pk, 36)
+                segment = digits[digit] + segment
+            comment.path = segment.rjust(7, '0') + '/'
+        Comment.objects.bulk_update(batch, ['path'])
+        last_id = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_post_rendered_content'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='blog.comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=72),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='blog_comment_thread_idx'),
+        ),
+        migrations.RunPython(fill_comment_paths, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,37 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.urls import reverse
 from taggit.managers import TaggableManager
+from taggit.models import Tag
+from .rendering import render_post
 
 # Create your models here.
 
+class PostQuerySet(models.QuerySet):
+    def with_related(self):
+        """
+        Loads everything the post list templates read in a fixed number of
+        queries: the author through a join, the tags in one prefetch and the
+        number of comments as `comments_count`. The count is a correlated
+        subquery rather than a GROUP BY, so it also works next to the
+        full-text rank annotations of blog.search.
+        """
+        comments = Comment.objects.filter(post=models.OuterRef('pk')).order_by().values('post').annotate(
+            total=models.Count('pk'),
+        ).values('total')
+        return self.select_related('author').prefetch_related('tags').annotate(
+            comments_count=Coalesce(models.Subquery(comments), 0),
+        )
+
+    def without_bodies(self):
+        """
+        Leaves out the full content and its rendered HTML, for pages that
+        only show the excerpt.
+        """
+        return self.defer('content', 'content_html')
+
+
 class Post(models.Model):
     """
     Represents a blog post.
@@ -18,6 +46,10 @@ class Post(models.Model):
      # auto_now_add=True automatically sets the date when the post is first created.
     published_date = models.DateTimeField(auto_now_add=True)
 
+    # When the post was last saved. Indexed so the title autocomplete can
+    # pick up edits by reading only the rows changed since its last look.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
      # A foreign key to the Django User model.
     # This establishes a one-to-many relationship, allowing one user to have many posts.
     # models.CASCADE ensures that if a User is deleted, all their associated posts are also deleted.
@@ -27,18 +59,64 @@ class Post(models.Model):
     # It allows for a many-to-many relationship with tags.
     tags = TaggableManager()
 
+    # The post's tag names joined by spaces, kept up to date by blog.signals
+    # so the full-text index covers tags without a join (see blog.search).
+    tag_text = models.TextField(blank=True, default='', editable=False)
+
+    # The content rendered to sanitized HTML and a short plain-text excerpt,
+    # filled on save by blog.rendering. Rows rendered by an older version of
+    # it are re-rendered lazily, so list pages never need the full content.
+    content_html = models.TextField(blank=True, default='', editable=False)
+    excerpt = models.TextField(blank=True, default='', editable=False)
+    render_version = models.PositiveSmallIntegerField(default=0, editable=False, db_index=True)
+
+    objects = PostQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # Keep the rendered fields in step with the content they come from
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            render_post(self)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'content_html', 'excerpt', 'render_version'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         # This string method returns the title of the post, which is helpful
         # for displaying posts in the Django admin interface.
         return self.title
+
+    def get_absolute_url(self):
+        return reverse('post-detail', kwargs={'pk': self.pk})
     
 
+class CommentQuerySet(models.QuerySet):
+    def threaded(self):
+        """
+        Orders comments as threads are read: each comment followed by its
+        replies, oldest first at every level. This is plain ordering on
+        Comment.path, served by the (post, path) index.
+        """
+        return self.select_related('author').order_by('path')
+
+
 # A model for a comment on a blog post.
 class Comment(models.Model):
     """
-    Represents a comment on a blog post.
+    Represents a comment on a blog post, or a reply to another comment.
+
+    Threads are stored as a materialized path: `path` is the path of the
+    parent followed by the comment's own id as a fixed-width base-36
+    segment. Sorting by path lists every thread depth first, and a whole
+    subtree is the range of paths starting with its root's path, so either
+    loads with one ordered query.
     """
+    # Width of one path segment; 36 ** 7 ids before it overflows.
+    SEGMENT_WIDTH = 7
+    # Replies to comments this deep attach to the deepest ancestor allowed,
+    # which keeps paths within their column.
+    MAX_DEPTH = 8
+
     # Foreign key to the Post model, establishing a many-to-one relationship.
     # Each comment belongs to a single post.
     post = models.ForeignKey(Post, related_name='comments', on_delete=models.CASCADE)
@@ -46,6 +124,14 @@ class Comment(models.Model):
     # Foreign key to the User model, for tracking the comment's author.
     author = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    # The comment this one replies to; empty for top-level comments.
+    # Deleting a comment removes the replies beneath it.
+    parent = models.ForeignKey('self', related_name='replies', null=True, blank=True, on_delete=models.CASCADE)
+
+    # The materialized path described above and the number of ancestors.
+    path = models.CharField(max_length=(SEGMENT_WIDTH + 1) * (MAX_DEPTH + 1), default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
     # The content of the comment.
     content = models.TextField()
 
@@ -55,6 +141,74 @@ class Comment(models.Model):
     # The date and time the comment was last updated.
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=['post', 'path'], name='blog_comment_thread_idx')]
+
     def __str__(self):
         # Returns a string representation of the comment.
         return f'Comment by {self.author} on {self.post.title}'
+
+    @classmethod
+    def path_segment(cls, pk):
+        digits = ''
+        while pk:
+            pk, digit = divmod(pk, 36)
+            digits = '0123456789abcdefghijklmnopqrstuvwxyz'[digit] + digits
+        return digits.rjust(cls.SEGMENT_WIDTH, '0') + '/'
+
+    def save(self, *args, **kwargs):
+        # The path ends with the comment's own id, so a new comment is
+        # inserted first and given its path right after, in one transaction.
+        if self.path:
+            return super().save(*args, **kwargs)
+        while self.parent is not None and self.parent.depth >= self.MAX_DEPTH:
+            self.parent = self.parent.parent
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.depth = self.parent.depth + 1 if self.parent else 0
+            self.path = (self.parent.path if self.parent else '') + self.path_segment(self.pk)
+            Comment.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+
+    def subtree(self):
+        """
+        Returns this comment and all replies beneath it, in thread order.
+        The paths below it sort between its own path and the same path with
+        the closing '/' raised to '0', a range any index can serve.
+        """
+        return Comment.objects.filter(
+            post_id=self.post_id, path__gte=self.path, path__lt=self.path[:-1] + '0',
+        ).threaded()
+
+
+# The SQLite FTS5 table used by blog.search, created by migration 0004.
+# It is only declared so that querysets can join it; blog.search writes its
+# rows with raw SQL. On MySQL the search uses a FULLTEXT index on Post instead.
+class PostSearchIndex(models.Model):
+    post = models.OneToOneField(Post, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+                                db_constraint=False, related_name='search_index')
+    title = models.TextField()
+    content = models.TextField()
+    tags = models.TextField()
+
+    class Meta:
+        managed = False
+        db_table = 'blog_post_fts'
+
+
+# How many posts carry each tag, kept up to date by blog.signals as posts are
+# tagged and untagged (see blog.tagstats) so popular tags can be listed without
+# a GROUP BY over taggit's through table.
+class TagStat(models.Model):
+    """
+    Represents the number of posts carrying a tag.
+    """
+    tag = models.OneToOneField(Tag, on_delete=models.CASCADE, primary_key=True, related_name='blog_stat')
+    post_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['-post_count', 'tag'], name='blog_tagstat_rank_idx')]
+
+    def __str__(self):
+        return f'{self.tag} ({self.post_count})'
@@ -0,0 +1,145 @@
+# blog/search.py
+
+import re
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from .models import Post
+
+
+FTS_TABLE = 'blog_post_fts'
+
+# Relevance weights of the indexed columns (SQLite bm25)
+TITLE_WEIGHT = 3.0
+CONTENT_WEIGHT = 1.0
+TAGS_WEIGHT = 2.0
+
+SNIPPET_WORDS = 30
+# Control characters mark matches in raw snippets; they cannot occur in
+# escaped HTML, so they are swapped for <mark> tags after escaping.
+MARK_START, MARK_END = '\x02', '\x03'
+
+
+def search_backend():
+    """
+    Returns the vendor of the full-text index created by migration 0004:
+    'mysql' (InnoDB FULLTEXT) or 'sqlite' (FTS5). None means substring search.
+    """
+    return connection.vendor if connection.vendor in ('mysql', 'sqlite') else None
+
+
+def query_terms(text):
+    return re.findall(r'\w+', text)
+
+
+def search_posts(text):
+    """
+    Returns the posts matching `text` in their title, content or tags, most
+    relevant first, annotated with `search_rank` and, on SQLite, `snippet`.
+    """
+    terms = query_terms(text)
+    if not terms:
+        return Post.objects.none()
+    backend = search_backend()
+
+    if backend == 'mysql':
+        match = 'MATCH (blog_post.title, blog_post.content, blog_post.tag_text) AGAINST (%s IN NATURAL LANGUAGE MODE)'
+        # MATCH returns a relevance score, not a boolean: filtering it as a
+        # boolean would compare it with 1 on MySQL, so rows are kept by score.
+        queryset = Post.objects.annotate(
+            search_rank=RawSQL(match, [text], output_field=FloatField()),
+        ).filter(search_rank__gt=0)
+    elif backend == 'sqlite':
+        query = ' AND '.join(f'"{term}"' for term in terms)
+        queryset = Post.objects.filter(search_index__isnull=False).alias(
+            search_match=RawSQL(f'"{FTS_TABLE}" MATCH %s', [query], output_field=BooleanField()),
+        ).filter(search_match=True).annotate(
+            search_rank=RawSQL(
+                f'-bm25("{FTS_TABLE}", {TITLE_WEIGHT}, {CONTENT_WEIGHT}, {TAGS_WEIGHT})', [], output_field=FloatField()
+            ),
+            snippet=RawSQL(
+                f"snippet(\"{FTS_TABLE}\", 1, %s, %s, '…', {SNIPPET_WORDS})", [MARK_START, MARK_END]
+            ),
+        )
+    else:
+        queryset = Post.objects.filter(
+            Q(title__icontains=text) | Q(content__icontains=text) | Q(tag_text__icontains=text)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    return queryset.select_related('author').order_by('-search_rank', '-published_date', '-id')
+
+
+def add_snippets(posts, text):
+    """
+    Sets `snippet` on each post to an HTML-safe excerpt of its content with
+    the matching words wrapped in <mark>. Uses the snippet computed by the
+    index when there is one, otherwise cuts one around the first match.
+    """
+    terms = query_terms(text)
+    pattern = re.compile(r'\b(' + '|'.join(re.escape(term) for term in terms) + r')\w*', re.IGNORECASE) if terms else None
+    for post in posts:
+        raw = getattr(post, 'snippet', None)
+        if raw is None:
+            raw = _cut_snippet(post.content, pattern)
+        html = escape(raw).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+        post.snippet = mark_safe(html)
+    return posts
+
+
+def _cut_snippet(content, pattern):
+    words = content.split()
+    start = 0
+    if pattern is not None:
+        for index, word in enumerate(words):
+            if pattern.search(word):
+                start = max(0, index - SNIPPET_WORDS // 3)
+                break
+    excerpt = ' '.join(words[start:start + SNIPPET_WORDS])
+    if pattern is not None:
+        excerpt = pattern.sub(lambda m: f'{MARK_START}{m.group(0)}{MARK_END}', excerpt)
+    prefix = '…' if start else ''
+    suffix = '…' if start + SNIPPET_WORDS < len(words) else ''
+    return f'{prefix}{excerpt}{suffix}'
+
+
+def tag_text(post):
+    return ' '.join(sorted(post.tags.names()))
+
+
+def reindex_posts(posts):
+    """
+    Recomputes Post.tag_text for the given posts and rewrites their index
+    rows. Used when a tag changes without its posts being saved: a renamed
+    tag, or a deleted one whose taggings go with it.
+    """
+    for post in posts.only('id', 'title', 'content', 'tag_text').prefetch_related('tags').iterator(chunk_size=500):
+        text = ' '.join(sorted(tag.name for tag in post.tags.all()))
+        if text == post.tag_text:
+            continue
+        post.tag_text = text
+        Post.objects.filter(pk=post.pk).update(tag_text=text)
+        index_post(post)
+
+
+def index_post(post):
+    """
+    Writes the post into the SQLite FTS5 table. MySQL maintains its FULLTEXT
+    index itself.
+    """
+    if search_backend() != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}" WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO "{FTS_TABLE}" (rowid, title, content, tags) VALUES (%s, %s, %s, %s)',
+            [post.pk, post.title, post.content, post.tag_text],
+        )
+
+
+def unindex_post(post_id):
+    if search_backend() != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}" WHERE rowid = %s', [post_id])
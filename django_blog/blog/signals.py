@@ -0,0 +1,132 @@
+# blog/signals.py
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from taggit.models import Tag, TaggedItem
+from .caching import invalidate_lists
+from .models import Comment, Post
+from .search import index_post, reindex_posts, tag_text, unindex_post
+from .tagstats import adjust_tag_counts
+
+
+@receiver(post_save, sender=Post)
+def update_search_index(sender, instance, **kwargs):
+    """
+    Keeps the full-text index in step with a created or edited post.
+    """
+    index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_post(instance.pk)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_tag_text(sender, instance, action, reverse, **kwargs):
+    """
+    Copies the post's tag names into Post.tag_text whenever its tags change,
+    so tag searches hit the full-text index instead of joining taggit's tables.
+    """
+    if reverse or action not in ('post_add', 'post_remove', 'post_clear') or not isinstance(instance, Post):
+        return
+    instance.tag_text = tag_text(instance)
+    Post.objects.filter(pk=instance.pk).update(tag_text=instance.tag_text)
+    index_post(instance)
+
+
+@receiver(post_save, sender=Tag)
+def reindex_renamed_tag(sender, instance, created, **kwargs):
+    """
+    A renamed tag changes the tag_text of every post carrying it. A new tag
+    has no posts yet, and posts whose tag_text is unchanged are not rewritten.
+    """
+    if not created:
+        reindex_posts(Post.objects.filter(tags=instance))
+
+
+@receiver(post_delete, sender=Post.tags.through)
+def reindex_untagged_post(sender, instance, origin=None, **kwargs):
+    """
+    Deleting a tag removes its through rows without m2m_changed, so the
+    posts that carried it are reindexed here.
+    """
+    if isinstance(origin, Tag) and tags_a_post(instance):
+        reindex_posts(Post.objects.filter(pk=instance.object_id))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_lists(sender, instance, **kwargs):
+    # Tag names are shown on the post list
+    invalidate_lists([instance.slug])
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_lists(sender, instance, **kwargs):
+    """
+    Retires the cached pages of the post list and of the post's tags.
+    A deleted post has already lost its tags here; their removal from
+    the through table invalidates those lists (see below).
+    """
+    invalidate_lists(instance.tags.values_list('slug', flat=True))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_author_lists(sender, instance, update_fields=None, **kwargs):
+    """
+    The lists show each post's author, so a renamed user retires the post
+    list and the lists of the tags on their posts. Saves that cannot change
+    the username, such as the last_login update on every login, are skipped.
+    """
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    if not Post.objects.filter(author=instance).exists():
+        return
+    slugs = TaggedItem.objects.filter(
+        content_type=ContentType.objects.get_for_model(Post),
+        object_id__in=Post.objects.filter(author=instance).values('pk'),
+    ).values_list('tag__slug', flat=True).distinct()
+    invalidate_lists(slugs)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_lists(sender, instance, **kwargs):
+    invalidate_lists(Post(pk=instance.post_id).tags.values_list('slug', flat=True))
+
+
+@receiver(post_save, sender=Post.tags.through)
+@receiver(post_delete, sender=Post.tags.through)
+def invalidate_tagged_lists(sender, instance, **kwargs):
+    """
+    A post gained or lost a tag: that tag's list and the post list change.
+    """
+    if tags_a_post(instance):
+        invalidate_lists([instance.tag.slug])
+
+
+@receiver(post_save, sender=Post.tags.through)
+def count_tagging(sender, instance, created, **kwargs):
+    """
+    Keeps TagStat.post_count in step as posts are tagged and untagged.
+    Deleting a post or a tag removes its through rows one by one, so those
+    paths are counted here too.
+    """
+    if created and tags_a_post(instance):
+        adjust_tag_counts([instance.tag_id], 1)
+
+
+@receiver(post_delete, sender=Post.tags.through)
+def count_untagging(sender, instance, **kwargs):
+    if tags_a_post(instance):
+        adjust_tag_counts([instance.tag_id], -1)
+
+
+def tags_a_post(tagged_item):
+    # The through model is shared with any other taggable model
+    return tagged_item.content_type_id == ContentType.objects.get_for_model(Post).pk
+
@@ -0,0 +1,60 @@
+# blog/tagstats.py
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, F
+from taggit.models import TaggedItem
+from .models import Post, TagStat
+
+
+BATCH_SIZE = 1000
+MAX_LIMIT = 100
+
+
+def adjust_tag_counts(tag_ids, delta):
+    """
+    Adds `delta` to the post count of each tag, creating missing rows first.
+    Both steps are single statements, so concurrent taggings do not lose updates.
+    """
+    tag_ids = list(tag_ids)
+    if not tag_ids:
+        return
+    with transaction.atomic():
+        if delta > 0:
+            TagStat.objects.bulk_create([TagStat(tag_id=tag_id) for tag_id in tag_ids], ignore_conflicts=True)
+            TagStat.objects.filter(tag_id__in=tag_ids).update(post_count=F('post_count') + delta)
+        else:
+            TagStat.objects.filter(tag_id__in=tag_ids, post_count__gte=-delta).update(
+                post_count=F('post_count') + delta
+            )
+
+
+def top_tags(limit=10):
+    """
+    Returns the `limit` tags used by the most posts, as TagStat rows with
+    their tag loaded. Served from the rank index without touching taggit's tables.
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    return list(
+        TagStat.objects.filter(post_count__gt=0).select_related('tag').order_by('-post_count', 'tag')[:limit]
+    )
+
+
+def rebuild_tag_stats(batch_size=BATCH_SIZE):
+    """
+    Recomputes every tag's post count from taggit's through table, e.g. for
+    a backfill or after tags were changed in bulk without signals. Returns
+    the number of tags counted.
+    """
+    tagged = TaggedItem.objects.filter(content_type=ContentType.objects.get_for_model(Post))
+    counts = (
+        tagged.values('tag').annotate(total=Count('object_id', distinct=True)).order_by('tag')
+        .values_list('tag', 'total')
+    )
+    rows = [TagStat(tag_id=tag_id, post_count=total) for tag_id, total in counts.iterator()]
+    with transaction.atomic():
+        TagStat.objects.exclude(tag__in=tagged.values('tag')).delete()
+        TagStat.objects.bulk_create(
+            rows, batch_size=batch_size, update_conflicts=True, unique_fields=['tag'], update_fields=['post_count'],
+        )
+    return len(rows)
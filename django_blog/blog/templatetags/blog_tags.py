@@ -0,0 +1,15 @@
+# blog/templatetags/blog_tags.py
+
+from django import template
+from ..tagstats import top_tags
+
+register = template.Library()
+
+
+@register.simple_tag
+def popular_tags(limit=10):
+    """
+    The most used tags with their post counts, read from blog.models.TagStat:
+    {% popular_tags 10 as tags %}{% for stat in tags %}{{ stat.tag.name }} ({{ stat.post_count }}){% endfor %}
+    """
+    return top_tags(limit)
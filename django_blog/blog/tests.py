@@ -1,3 +1,449 @@
+# blog/tests.py
+
+from django.contrib.auth.models import User
+from io import StringIO
+from unittest import mock, skipUnless
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import Context, Template
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .autocomplete import indexes
+from taggit.models import Tag
+from .models import Comment, Post, TagStat
+from .search import search_posts
+
+
+class SearchViewTests(TestCase):
+    """
+    Tests for the full-text search view.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='password123')
+        self.in_title = Post.objects.create(author=self.author, title='Gardening basics', content='Water daily.')
+        self.in_content = Post.objects.create(
+            author=self.author, title='Weekend', content='We spent it gardening and <b>reading</b>.'
+        )
+        self.tagged = Post.objects.create(author=self.author, title='Tomatoes', content='Grow them in pots.')
+        self.tagged.tags.add('Gardening')
+        Post.objects.create(author=self.author, title='Cooking', content='Pasta recipes.')
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('search-posts'), {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_results_are_ranked_across_title_content_and_tags(self):
+        """
+        Title matches come first; tag matches are found through the index.
+        """
+        results = list(self.search('gardening').context['results'])
+        self.assertEqual(results[0], self.in_title)
+        self.assertCountEqual(results, [self.in_title, self.in_content, self.tagged])
+
+    def test_snippets_are_highlighted_and_escaped(self):
+        """
+        Snippets mark the matching words and escape the post's own HTML.
+        """
+        response = self.search('reading')
+        self.assertContains(response, '<mark>reading</mark>')
+        self.assertContains(response, '&lt;b&gt;')
+
+    def test_tag_changes_update_the_index(self):
+        """
+        Removing a tag removes the post from searches for it.
+        """
+        self.tagged.tags.remove('Gardening')
+        self.assertNotIn(self.tagged, self.search('gardening').context['results'])
+
+    def test_tag_rename_and_delete_update_the_index(self):
+        tag = Tag.objects.get(name='Gardening')
+        tag.name = 'Horticulture'
+        tag.save()
+        self.tagged.refresh_from_db()
+        self.assertEqual(self.tagged.tag_text, 'Horticulture')
+        self.assertIn(self.tagged, self.search('horticulture').context['results'])
+        self.assertNotIn(self.tagged, self.search('gardening').context['results'])
+
+        tag.delete()
+        self.tagged.refresh_from_db()
+        self.assertEqual(self.tagged.tag_text, '')
+        self.assertNotIn(self.tagged, self.search('horticulture').context['results'])
+
+    def test_results_are_paginated(self):
+        """
+        Results are served ten per page.
+        """
+        for i in range(12):
+            Post.objects.create(author=self.author, title=f'Garden diary {i}', content='More gardening.')
+        first = self.search('gardening')
+        self.assertEqual(len(first.context['results']), 10)
+        self.assertTrue(first.context['is_paginated'])
+        second = self.search('gardening', page=2)
+        self.assertEqual(len(second.context['results']), 5)
+
+    def test_mysql_query_filters_on_relevance(self):
+        """
+        The MySQL branch keeps rows whose MATCH score is positive rather
+        than comparing the score with a boolean.
+        """
+        with mock.patch('blog.search.search_backend', return_value='mysql'):
+            sql = str(search_posts('gardening').query)
+        where = sql.split(' WHERE ', 1)[1]
+        self.assertIn('AGAINST (gardening IN NATURAL LANGUAGE MODE)) > 0', where)
+        self.assertNotIn('True', where)
+
+    @skipUnless(connection.vendor == 'mysql', 'needs the MySQL FULLTEXT index')
+    def test_mysql_results(self):
+        """
+        Against a real MySQL database, matches in any column are found.
+        """
+        results = list(self.search('gardening').context['results'])
+        self.assertCountEqual(results, [self.in_title, self.in_content, self.tagged])
+
+
+class AutocompleteTests(TestCase):
+    """
+    Tests for the type-ahead endpoint and its prefix indexes.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='Renée', password='password123')
+        self.post = Post.objects.create(author=self.author, title='Harry Potter reviewed', content='Content')
+        self.post.tags.add('python', 'pottery')
+        # Loaded in the foreground: a background thread would not see the
+        # test's uncommitted rows
+        for index in indexes.values():
+            index.clear()
+            index.warm(background=False)
+
+    def suggest(self, q, kind='titles'):
+        response = self.client.get(reverse('search-autocomplete'), {'q': q, 'kind': kind})
+        self.assertEqual(response.status_code, 200)
+        return [r['label'] for r in response.json()['results']]
+
+    def test_prefix_of_any_word_matches(self):
+        """
+        Suggestions match the start of any word, ignoring case and accents.
+        """
+        self.assertEqual(self.suggest('har'), ['Harry Potter reviewed'])
+        self.assertEqual(self.suggest('POTTER rev'), ['Harry Potter reviewed'])
+        self.assertEqual(self.suggest('pot', kind='tags'), ['pottery'])
+        self.assertEqual(self.suggest('rene', kind='users'), ['Renée'])
+        self.assertEqual(self.suggest('otter'), [])
+
+    def test_lookups_skip_the_database_and_follow_signals(self):
+        """
+        Once loaded, lookups need no queries and edits show up straight away.
+        """
+        with self.assertNumQueries(0):
+            self.suggest('harry')
+
+        self.post.title = 'Hermione Granger'
+        self.post.save()
+        self.assertEqual(self.suggest('har'), [])
+        self.assertEqual(self.suggest('gran'), ['Hermione Granger'])
+        self.post.delete()
+        self.assertEqual(self.suggest('gran'), [])
+
+
+class PostListCacheTests(TestCase):
+    """
+    Tests for the cached post list pages and their signal-driven invalidation.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='password123')
+        self.post = Post.objects.create(author=self.author, title='First post', content='Hello.')
+        self.post.tags.add('Django')
+
+    def get(self, url):
+        # Invalidation runs once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            pass
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_repeat_hits_skip_the_database(self):
+        """
+        The second anonymous hit on a page is served from the cache.
+        """
+        for url in (reverse('home'), reverse('posts-by-tag', args=['django'])):
+            self.assertIn('First post', self.get(url))
+            with self.assertNumQueries(0):
+                self.assertIn('First post', self.get(url))
+
+    def test_post_comment_and_tag_changes_invalidate(self):
+        """
+        Saving or deleting posts, comments and tag links retires the cached pages.
+        """
+        home, tag_page = reverse('home'), reverse('posts-by-tag', args=['django'])
+        self.get(home), self.get(tag_page)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Renamed post'
+            self.post.save()
+        self.assertIn('Renamed post', self.get(home))
+        self.assertIn('Renamed post', self.get(tag_page))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, author=self.author, content='Nice')
+        with self.assertNumQueries(4):
+            # The page is rendered again (see PostListQueryCountTests)
+            self.get(tag_page)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.tags.remove('Django')
+        self.assertNotIn('Renamed post', self.get(tag_page))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.delete()
+        self.assertIn('No posts yet.', self.get(home))
+
+    def test_author_rename_invalidates(self):
+        """
+        A username change shows up on the lists; a login does not clear them.
+        """
+        home, tag_page = reverse('home'), reverse('posts-by-tag', args=['django'])
+        self.get(home), self.get(tag_page)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.get(home)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.username = 'renamed'
+            self.author.save()
+        self.assertIn('renamed', self.get(home))
+        self.assertIn('renamed', self.get(tag_page))
+
+
+class PostListQueryCountTests(TestCase):
+    """
+    Regression tests for the number of queries behind the post list pages.
+    The count must not grow with the number of posts shown, their tags or
+    their comments.
+    """
+
+    def setUp(self):
+        self.created = 0
+
+    def add_posts(self, count):
+        for _ in range(count):
+            author = User.objects.create_user(username=f'author{self.created}', password='password123')
+            post = Post.objects.create(author=author, title=f'Garden post {self.created}', content='gardening')
+            post.tags.add('garden', f'tag{self.created}')
+            Comment.objects.create(post=post, author=author, content='Nice')
+            self.created += 1
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def assertConstantQueries(self, url, expected):
+        self.add_posts(2)
+        small, _ = self.count_queries(url)
+        self.add_posts(8)
+        full, response = self.count_queries(url)
+        self.assertEqual(len(response.context['posts']), 10)
+        self.assertEqual((small, full), (expected, expected))
+        return response
+
+    def test_home_page(self):
+        """
+        Count, page (with authors and comment counts), tags and the tag cloud.
+        """
+        response = self.assertConstantQueries(reverse('home'), 4)
+        self.assertContains(response, '1 comment')
+
+    def test_tag_page(self):
+        """
+        Tag lookup, count, page and tags; the tag page has no tag cloud.
+        """
+        self.assertConstantQueries(reverse('posts-by-tag', args=['garden']), 4)
+
+    def test_search_results(self):
+        """
+        Count, page and tags.
+        """
+        self.assertConstantQueries(reverse('search-posts') + '?q=gardening', 3)
+
+
+class TagStatTests(TestCase):
+    """
+    Tests for the maintained per-tag post counts and the popular tags served from them.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='password123')
+        self.posts = [Post.objects.create(author=self.author, title=f'Post {i}', content='Hello.') for i in range(3)]
+        for post in self.posts:
+            post.tags.add('django')
+        self.posts[0].tags.add('python')
+
+    def counts(self):
+        return dict(TagStat.objects.values_list('tag__name', 'post_count'))
+
+    def test_counts_follow_tagging_and_deletes(self):
+        """
+        Tagging, untagging and deleting posts or tags adjust the counts in place.
+        """
+        self.assertEqual(self.counts(), {'django': 3, 'python': 1})
+        self.posts[1].tags.remove('django')
+        self.posts[2].delete()
+        Tag.objects.get(name='python').delete()
+        self.assertEqual(self.counts(), {'django': 1})
+
+    def test_popular_tags_endpoint_and_template_tag(self):
+        """
+        Both list the tags by post count without grouping over the through table.
+        """
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('popular-tags'), {'limit': 1})
+        self.assertEqual(response.json()['results'], [{'name': 'django', 'slug': 'django', 'post_count': 3}])
+        rendered = Template(
+            '{% load blog_tags %}{% popular_tags 5 as tags %}{% for stat in tags %}{{ stat.tag.name }}={{ stat.post_count }};{% endfor %}'
+        ).render(Context())
+        self.assertEqual(rendered, 'django=3;python=1;')
+
+    def test_rebuild_fixes_drifted_counts(self):
+        """
+        The rebuild command rewrites counts that no longer match the tags.
+        """
+        TagStat.objects.filter(tag__name='django').update(post_count=9)
+        TagStat.objects.filter(tag__name='python').delete()
+        TagStat.objects.create(tag=Tag.objects.create(name='unused'), post_count=4)
+        call_command('rebuild_tag_stats', stdout=StringIO())
+        self.assertEqual(self.counts(), {'django': 3, 'python': 1})
+
+
+class RenderedContentTests(TestCase):
+    """
+    Tests for the pre-rendered post bodies and excerpts.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='password123')
+        self.post = Post.objects.create(
+            author=self.author, title='Links', content='See https://example.com <script>x</script>\n\n' + 'word ' * 50,
+        )
+
+    def test_body_is_rendered_and_sanitized_on_save(self):
+        """
+        The HTML escapes markup, links URLs and splits paragraphs; the excerpt is short plain text.
+        """
+        self.assertIn('<a href="https://example.com" rel="nofollow">', self.post.content_html)
+        self.assertIn('&lt;script&gt;', self.post.content_html)
+        self.assertEqual(self.post.content_html.count('<p>'), 2)
+        self.assertTrue(self.post.excerpt.endswith('word…'))
+        self.assertContains(self.client.get(reverse('post-detail', args=[self.post.pk])), 'rel="nofollow"')
+
+    def test_list_pages_leave_out_the_full_content(self):
+        """
+        Only the excerpt is read for the home page.
+        """
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, '&lt;script&gt;x&lt;/script&gt; word word')
+        self.assertFalse(any('"blog_post"."content"' in query['sql'] for query in queries))
+
+    def test_renderer_upgrade_rerenders_lazily_and_in_batches(self):
+        """
+        Posts from an older renderer are re-rendered when shown or by the command.
+        """
+        other = Post.objects.create(author=self.author, title='Other', content='Plain.')
+        with mock.patch('blog.rendering.RENDERER_VERSION', 2):
+            cache.clear()
+            self.client.get(reverse('home'))
+            self.assertEqual(set(Post.objects.values_list('render_version', flat=True)), {2})
+        with mock.patch('blog.rendering.RENDERER_VERSION', 3):
+            self.client.get(reverse('post-detail', args=[other.pk]))
+            self.assertEqual(Post.objects.get(pk=other.pk).render_version, 3)
+            call_command('rerender_posts', batch_size=1, stdout=StringIO())
+            self.assertEqual(set(Post.objects.values_list('render_version', flat=True)), {3})
+
+
+class CommentThreadTests(TestCase):
+    """
+    Tests for threaded comments and the paginated comment list on the post page.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='password123')
+        self.post = Post.objects.create(author=self.author, title='Title', content='Content')
+
+    def comment(self, content, parent=None):
+        return Comment.objects.create(post=self.post, author=self.author, content=content, parent=parent)
+
+    def test_threads_load_depth_first_in_one_query(self):
+        """
+        Replies follow their parent, oldest first at every level; a subtree is one range.
+        """
+        first = self.comment('first')
+        second = self.comment('second')
+        reply = self.comment('reply', first)
+        nested = self.comment('nested', reply)
+        late_reply = self.comment('late reply', first)
+        self.assertEqual(list(Comment.objects.filter(post=self.post).threaded()),
+                         [first, reply, nested, late_reply, second])
+        self.assertEqual(nested.depth, 2)
+        with self.assertNumQueries(1):
+            self.assertEqual([c.content for c in first.subtree()], ['first', 'reply', 'nested', 'late reply'])
+
+    def test_replies_stop_nesting_at_max_depth(self):
+        """
+        A reply below the deepest level attaches to the deepest allowed ancestor.
+        """
+        comment = self.comment('root')
+        for i in range(Comment.MAX_DEPTH + 2):
+            comment = self.comment(f'reply {i}', comment)
+        self.assertEqual(comment.depth, Comment.MAX_DEPTH)
+
+    def test_comment_pages_are_bounded(self):
+        """
+        The post page shows one page of comments at a fixed query cost.
+        """
+        from .views import COMMENTS_PER_PAGE
+        url = reverse('post-detail', args=[self.post.pk])
+        root = self.comment('root')
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.author, content=f'c{i}', parent=root,
+                    path=root.path + Comment.path_segment(10_000 + i), depth=1)
+            for i in range(COMMENTS_PER_PAGE * 2)
+        ])
+        with self.assertNumQueries(3):
+            # post, comment count and page
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['comments']), COMMENTS_PER_PAGE)
+        self.assertEqual(response.context['comments'][0], root)
+        self.assertEqual(len(self.client.get(url, {'page': 3}).context['comments']), 1)
+
+    def test_reply_is_posted_to_its_parent(self):
+        """
+        The create view attaches replies and refuses parents from other posts.
+        """
+        parent = self.comment('parent')
+        other_post = Post.objects.create(author=self.author, title='Other', content='Content')
+        self.client.force_login(self.author)
+        url = reverse('comment-create', args=[self.post.pk])
+        response = self.client.post(url, {'content': 'Agreed', 'parent': parent.pk})
+        self.assertRedirects(response, self.post.get_absolute_url())
+        self.assertEqual(parent.replies.get().content, 'Agreed')
+        other_url = reverse('comment-create', args=[other_post.pk])
+        self.assertEqual(self.client.post(other_url, {'content': 'x', 'parent': parent.pk}).status_code, 404)
 
-# Create your tests here.
+    def test_malformed_parent_is_not_found(self):
+        self.client.force_login(self.author)
+        url = reverse('comment-create', args=[self.post.pk])
+        self.assertEqual(self.client.post(url, {'content': 'x', 'parent': 'abc'}).status_code, 404)
+        self.assertFalse(self.post.comments.exists())
@@ -5,7 +5,7 @@ from .views import (
     PostListView, PostDetailView,
     PostCreateView, PostUpdateView, PostDeleteView,
     CommentCreateView, CommentUpdateView, CommentDeleteView,
-    PostByTagListView, search_posts
+    PostsByTagListView
 )
 
 urlpatterns = [
@@ -13,7 +13,7 @@ urlpatterns = [
     path('login/', auth_views.LoginView.as_view(template_name='blog/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(template_name='blog/logout.html'), name='logout'),
     path('profile/', views.profile, name='profile'),
-    path('', views.home, name='home'),
+    path('', PostListView.as_view(), name='home'),
 
     path('post/', PostListView.as_view(), name='post-list'),
     path('post/<int:pk>/', PostDetailView.as_view(), name='post-detail'),
@@ -24,8 +24,10 @@ urlpatterns = [
     path('post/<int:pk>/comments/new/', CommentCreateView.as_view(), name='comment-create'),
     path('comment/<int:pk>/update/', CommentUpdateView.as_view(), name='comment-update'),
     path('comment/<int:pk>/delete/', CommentDeleteView.as_view(), name='comment-delete'),
-    path('tags/<str:tag_name>/', views.posts_by_tag, name='posts-by-tag'),
-    path('search/', views.search_posts, name='search-posts'),
-    path('tags/<slug:tag_slug>/', PostByTagListView.as_view(), name='posts_by_tag'),
-    path('search/', search_posts, name='search_posts'),
+    path('tags/<slug:tag_slug>/', PostsByTagListView.as_view(), name='posts-by-tag'),
+    path('popular-tags/', views.popular_tags, name='popular-tags'),
+    path('search/', views.search, name='search-posts'),
+    path('search/autocomplete/', views.autocomplete, name='search-autocomplete'),
+    path('tags/<slug:tag_slug>/', PostsByTagListView.as_view(), name='posts_by_tag'),
+    path('search/', views.search, name='search_posts'),
 ]
\ No newline at end of file
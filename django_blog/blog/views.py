@@ -8,10 +8,24 @@ from django.contrib.auth.views import LoginView, LogoutView
 from django.views.generic import (ListView,DetailView,CreateView,UpdateView,DeleteView)
 from .models import Post, User,Comment
 
-from django.db.models import Q
+from django.core.paginator import Paginator
 from taggit.models import Tag
+from .search import search_posts, add_snippets
+from .autocomplete import indexes
+from django.http import Http404, JsonResponse
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from .caching import HOME, cache_timeout, fragment_key, tag_scope
+from .tagstats import top_tags
+from .rendering import ensure_rendered
 # Create your views here.
 
+SEARCH_RESULTS_PER_PAGE = 10
+AUTOCOMPLETE_LIMIT = 10
+POPULAR_TAGS_LIMIT = 10
+COMMENTS_PER_PAGE = 50
+
 # The register view handles the user registration process.
 def register(request):
     """
@@ -73,35 +87,77 @@ def profile(request):
 
     return render(request, 'blog/profile.html', context)
 
+# Serves the post list part of a ListView page from the cache.
+class CachedListMixin:
+    """
+    Caches the rendered post list of each page, keyed by the list's scope
+    (see blog.caching) and page number. The fragment is rendered without the
+    request, so it is the same for every visitor; only the surrounding page
+    (messages, navigation) is rendered per request. On a hit no query runs.
+    Entries are retired by the Post, Comment and tag signals in blog.signals.
+    """
+    fragment_template_name = None
+
+    def get_cache_scope(self):
+        return HOME
+
+    def get(self, request, *args, **kwargs):
+        page = str(self.kwargs.get(self.page_kwarg) or request.GET.get(self.page_kwarg) or 1)
+        # Anything else is a 404 from the paginator and is not worth a cache entry
+        key = fragment_key(self.get_cache_scope(), page) if page.isdigit() or page == 'last' else None
+        fragment = cache.get(key) if key else None
+        # Unevaluated; ListView only inspects it to pick a template
+        self.object_list = self.model.objects.none()
+        if fragment is None:
+            self.object_list = self.get_queryset()
+            context = self.get_context_data()
+            # Posts stored by an older renderer get their excerpts refreshed
+            ensure_rendered(context['object_list'])
+            fragment = render_to_string(self.fragment_template_name, context)
+            if key:
+                cache.set(key, str(fragment), cache_timeout())
+        return self.render_to_response(self.get_page_context(mark_safe(fragment)))
+
+    def get_page_context(self, posts_html):
+        return {'view': self, 'posts_html': posts_html}
+
 # A class-based view to display a list of all blog posts.
-class PostListView(ListView):
+class PostListView(CachedListMixin, ListView):
     """
     Displays a list of all blog posts.
     """
     model = Post
     template_name = 'blog/home.html'
+    fragment_template_name = 'blog/home_posts.html'
     context_object_name = 'posts'
     ordering = ['-published_date']
     paginate_by = 10
 
+    def get_queryset(self):
+        return super().get_queryset().with_related().without_bodies()
+
 # A class-based view to display posts filtered by a specific tag.
-class PostsByTagListView(ListView):
+class PostsByTagListView(CachedListMixin, ListView):
     """
     Displays a list of posts filtered by a specific tag.
     """
     model = Post
     template_name = 'blog/posts_by_tag.html'
+    fragment_template_name = 'blog/posts_by_tag_posts.html'
     context_object_name = 'posts'
     paginate_by = 10
 
+    def get_cache_scope(self):
+        return tag_scope(self.kwargs.get('tag_slug'))
+
     def get_queryset(self):
         # Get the tag from the URL and filter posts by it.
         tag = get_object_or_404(Tag, slug=self.kwargs.get('tag_slug'))
-        return Post.objects.filter(tags__in=[tag]).order_by('-published_date')
+        return Post.objects.filter(tags__in=[tag]).with_related().without_bodies().order_by('-published_date')
 
-    def get_context_data(self, **kwargs):
+    def get_page_context(self, posts_html):
         # Add the tag name to the context for use in the template.
-        context = super().get_context_data(**kwargs)
+        context = super().get_page_context(posts_html)
         context['tag_name'] = self.kwargs.get('tag_slug')
         return context
 
@@ -112,13 +168,37 @@ class PostDetailView(DetailView):
     Displays a single blog post.
     """
     model = Post
+    queryset = Post.objects.select_related('author')
+
+    def get_object(self, queryset=None):
+        # Re-render the body if it was stored by an older renderer
+        post = super().get_object(queryset)
+        ensure_rendered([post])
+        return post
 
     def get_context_data(self, **kwargs):
-        # This method adds the comment form and comments to the context
-        # so they can be displayed in the template.
+        # This method adds the comment form and one page of comments to the
+        # context. Comments come in thread order (replies under their parent),
+        # COMMENTS_PER_PAGE at a time; ?thread=<id> narrows them to one
+        # comment and its replies, and ?reply_to=<id> points the form at one.
         context = super().get_context_data(**kwargs)
+        thread = None
+        comments = self.object.comments.threaded()
+        if self.request.GET.get('thread', '').isdigit():
+            thread = get_object_or_404(Comment, pk=self.request.GET['thread'], post=self.object)
+            comments = thread.subtree()
+        reply_to = None
+        if self.request.GET.get('reply_to', '').isdigit():
+            reply_to = get_object_or_404(Comment, pk=self.request.GET['reply_to'], post=self.object)
+
+        paginator = Paginator(comments, COMMENTS_PER_PAGE)
+        page_obj = paginator.get_page(self.request.GET.get('page'))
         context['comment_form'] = CommentForm()
-        context['comments'] = self.object.comments.order_by('-created_at')
+        context['comments'] = page_obj.object_list
+        context['comments_page'] = page_obj
+        context['comments_paginator'] = paginator
+        context['thread'] = thread
+        context['reply_to'] = reply_to
         return context
 
 # A class-based view to create a new blog post.
@@ -181,6 +261,12 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
         # Set the author and post for the comment.
         form.instance.author = self.request.user
         form.instance.post_id = self.kwargs['pk']
+        # A reply names the comment it answers, which must be on the same post.
+        parent = self.request.POST.get('parent', '')
+        if parent:
+            if not parent.isdigit():
+                raise Http404('No comment matches the given query.')
+            form.instance.parent = get_object_or_404(Comment, pk=parent, post_id=self.kwargs['pk'])
         messages.success(self.request, 'Your comment has been added!')
         return super().form_valid(form)
 
@@ -227,19 +313,54 @@ class CommentDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
 def search(request):
     """
     Handles search queries to find posts by title, content, or tags.
+    Results come from the full-text index (see blog.search), most relevant
+    first, with highlighted snippets and ten posts per page.
     """
-    query = request.GET.get('q', '')
-    posts = Post.objects.all().order_by('-published_date')
+    query = request.GET.get('q', '').strip()
     if query:
-        # Use Q objects to perform a complex search across multiple fields.
-        posts = posts.filter(
-            Q(title__icontains=query) |
-            Q(content__icontains=query) |
-            Q(tags__name__icontains=query)
-        ).distinct()
+        posts = search_posts(query).with_related().defer('content_html')
+    else:
+        posts = Post.objects.with_related().defer('content_html').order_by('-published_date')
+
+    paginator = Paginator(posts, SEARCH_RESULTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    add_snippets(page_obj.object_list, query)
 
     context = {
-        'posts': posts,
+        'posts': page_obj.object_list,
+        'results': page_obj.object_list,
         'query': query,
+        'page_obj': page_obj,
+        'paginator': paginator,
+        'is_paginated': page_obj.has_other_pages(),
     }
-    return render(request, 'blog/search_results.html', context)
\ No newline at end of file
+    return render(request, 'blog/search_results.html', context)
+
+
+def autocomplete(request):
+    """
+    Type-ahead suggestions for the search box, served from the in-memory
+    prefix indexes in blog.autocomplete without touching the database.
+    ?q= is the typed text and ?kind= one of titles (default), tags or users.
+    """
+    index = indexes.get(request.GET.get('kind', 'titles'))
+    if index is None:
+        return JsonResponse({'error': 'Unknown kind.'}, status=400)
+    suggestions = index.suggest(request.GET.get('q', ''), limit=AUTOCOMPLETE_LIMIT)
+    return JsonResponse({'results': [{'id': pk, 'label': label} for pk, label in suggestions]})
+
+
+def popular_tags(request):
+    """
+    The most used tags with their post counts, from the maintained tag
+    statistics rather than a GROUP BY over the tagged posts.
+    ?limit= picks how many (at most 100, 10 by default).
+    """
+    try:
+        limit = int(request.GET.get('limit', POPULAR_TAGS_LIMIT))
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number.'}, status=400)
+    return JsonResponse({'results': [
+        {'name': stat.tag.name, 'slug': stat.tag.slug, 'post_count': stat.post_count}
+        for stat in top_tags(limit)
+    ]})
@@ -10,11 +10,15 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Apps shared by the projects of this repository (e.g. prefixindex)
+sys.path.insert(0, str(BASE_DIR.parent / 'shared'))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -38,6 +42,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'blog',
+    'prefixindex',
     'taggit',
 ]
 
@@ -131,3 +136,29 @@ STATICFILES_DIRS = [
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Autocomplete index refresh (see shared/README.md)
+AUTOCOMPLETE_MAX_AGE = 300
+AUTOCOMPLETE_REBUILD_INTERVAL = 60 * 60
+
+# Cache for the rendered post lists (blog.caching). It must be shared by all
+# web processes so that a post saved in one retires the pages cached in the
+# others; the in-process cache is only for local development and tests.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Idle lifetime of a cached post list page, in seconds. Pages are retired by
+# signals as soon as their posts change, not by this timeout.
+POST_LIST_CACHE_TIMEOUT = 24 * 60 * 60
@@ -0,0 +1,6 @@
+# prefixindex: in-memory prefix indexes for type-ahead lookups, shared by
+# the projects in this repository (see shared/README.md).
+
+from .index import PrefixIndex, index_keys, normalize, warm_all
+
+__all__ = ['PrefixIndex', 'index_keys', 'normalize', 'warm_all']
@@ -0,0 +1,6 @@
+from django.apps import AppConfig
+
+
+class PrefixIndexConfig(AppConfig):
+    name = 'prefixindex'
+    verbose_name = 'Prefix index autocomplete'
@@ -0,0 +1,288 @@
+# prefixindex/index.py
+
+import logging
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+
+
+logger = logging.getLogger(__name__)
+
+# Longest indexed key; longer phrases still match on their first characters
+MAX_KEY_LENGTH = 48
+WORD = re.compile(r'\w+')
+# Joins a key to its primary key in one string. It sorts before any
+# character, so the entries of a key still sit right before its extensions.
+SEPARATOR = '\x00'
+CHUNK_SIZE = 10000
+# Seconds to wait before retrying a load that failed
+RETRY_DELAY = 5
+
+_registry = []
+
+
+def normalize(text):
+    """
+    Lowercases the text, drops accents and collapses it to space separated words.
+    """
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(WORD.findall(text.casefold()))
+
+
+def index_keys(label):
+    """
+    Returns the keys a label is found under: the label itself and every
+    tail of it starting at a word, so "Harry Potter" answers "ha" and "pot".
+    """
+    words = normalize(label).split(' ')
+    return {' '.join(words[index:])[:MAX_KEY_LENGTH] for index in range(len(words)) if words[index]}
+
+
+def warm_all(background=True):
+    """
+    Starts loading every index declared so far. Called from wsgi.py once
+    the app registry is ready, so the first lookup after a deploy or a
+    worker restart finds the index built instead of waiting for it.
+    """
+    for index in _registry:
+        index.warm(background=background)
+
+
+class PrefixIndex:
+    """
+    In-memory type-ahead index over one text column of a model: a sorted
+    array of "key\\0pk" strings. This is a flattened prefix trie: all keys
+    under a prefix sit next to each other, so a lookup is one binary search
+    plus a short scan, whatever the size.
+
+    `model` is an "app_label.ModelName" string, `label` the indexed field,
+    `filters` plain field values a row must have to be suggested, and
+    `mark` an ever-increasing column (the primary key by default, or an
+    auto_now timestamp) used as a high-water mark.
+
+    Lookups never load the index themselves. It is loaded in a background
+    thread by warm_all() at startup, or by the first lookup, which answers
+    nothing until then. Saves and deletes in this process reach it through
+    model signals. Other processes' writes are picked up every
+    AUTOCOMPLETE_MAX_AGE seconds by reading only the rows past the mark.
+    With a primary key mark that misses edits and deletes made elsewhere,
+    so the whole index is reloaded in the background every
+    AUTOCOMPLETE_REBUILD_INTERVAL seconds as well.
+    """
+
+    def __init__(self, model, label, mark='pk', filters=None):
+        self.model = model
+        self.label = label
+        self.mark = mark
+        self.filters = filters or {}
+        self._entries = []
+        self._labels = {}
+        self._mark = None
+        self._built_at = self._refreshed_at = None
+        self._retry_at = 0
+        self._busy = False
+        # Changes seen while a load is reading, replayed over its result
+        self._pending = None
+        self._lock = threading.Lock()
+        post_save.connect(self._saved, sender=model)
+        post_delete.connect(self._deleted, sender=model)
+        _registry.append(self)
+
+    @property
+    def max_age(self):
+        return getattr(settings, 'AUTOCOMPLETE_MAX_AGE', 300)
+
+    @property
+    def rebuild_interval(self):
+        return getattr(settings, 'AUTOCOMPLETE_REBUILD_INTERVAL', 60 * 60)
+
+    @property
+    def overlap(self):
+        # Timestamp marks are re-read this far back, for rows whose
+        # transaction committed after a later-stamped one was read.
+        return timedelta(seconds=getattr(settings, 'AUTOCOMPLETE_REFRESH_OVERLAP', 60))
+
+    @property
+    def loaded(self):
+        return self._built_at is not None
+
+    def queryset(self):
+        return apps.get_model(self.model)._default_manager.filter(**self.filters)
+
+    def _rows(self, queryset):
+        if self.mark == 'pk':
+            for pk, label in queryset.values_list('pk', self.label).iterator(chunk_size=CHUNK_SIZE):
+                yield pk, label, pk
+        else:
+            yield from queryset.values_list('pk', self.label, self.mark).iterator(chunk_size=CHUNK_SIZE)
+
+    def build(self, rows=None):
+        """
+        Replaces the contents of the index with `rows` ((pk, label, mark)
+        triples), read from the database by default, sorting once.
+        """
+        with self._lock:
+            self._pending = []
+        try:
+            labels = {}
+            entries = []
+            mark = None
+            for pk, label, row_mark in self._rows(self.queryset()) if rows is None else rows:
+                labels[str(pk)] = (pk, label)
+                entries.extend(f'{key}{SEPARATOR}{pk}' for key in index_keys(label))
+                if mark is None or row_mark > mark:
+                    mark = row_mark
+            entries.sort()
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._entries, self._labels, self._mark = entries, labels, mark
+            self._built_at = self._refreshed_at = time.monotonic()
+            for pk, label in pending:
+                self._remove(pk)
+                if label is not None:
+                    self._add(pk, label)
+
+    def refresh(self):
+        """
+        Indexes the rows written since the high-water mark and moves it on.
+        Returns the number of rows that changed.
+        """
+        queryset = self.queryset()
+        since = self._mark
+        if isinstance(since, datetime):
+            queryset = queryset.filter(**{f'{self.mark}__gte': since - self.overlap})
+        elif since is not None:
+            queryset = queryset.filter(**{f'{self.mark}__gt': since})
+        changed = 0
+        for pk, label, row_mark in self._rows(queryset):
+            with self._lock:
+                if self._labels.get(str(pk)) != (pk, label):
+                    self._remove(pk)
+                    self._add(pk, label)
+                    changed += 1
+            if since is None or row_mark > since:
+                since = row_mark
+        self._mark = since
+        self._refreshed_at = time.monotonic()
+        return changed
+
+    def warm(self, background=True):
+        """
+        Loads the index, in a background thread unless `background` is False.
+        """
+        if background:
+            self._start(self.build)
+        else:
+            self.build()
+
+    def add(self, pk, label):
+        """
+        Indexes (or re-indexes) one object.
+        """
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((pk, label))
+            if self.loaded:
+                self._remove(pk)
+                self._add(pk, label)
+
+    def remove(self, pk):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((pk, None))
+            if self.loaded:
+                self._remove(pk)
+
+    def _add(self, pk, label):
+        self._labels[str(pk)] = (pk, label)
+        for key in index_keys(label):
+            insort(self._entries, f'{key}{SEPARATOR}{pk}')
+
+    def _remove(self, pk):
+        item = self._labels.pop(str(pk), None)
+        if item is None:
+            return
+        for key in index_keys(item[1]):
+            entry = f'{key}{SEPARATOR}{pk}'
+            index = bisect_left(self._entries, entry)
+            if index < len(self._entries) and self._entries[index] == entry:
+                del self._entries[index]
+
+    def _saved(self, sender, instance, **kwargs):
+        if all(getattr(instance, field) == value for field, value in self.filters.items()):
+            self.add(instance.pk, getattr(instance, self.label))
+        else:
+            self.remove(instance.pk)
+
+    def _deleted(self, sender, instance, **kwargs):
+        self.remove(instance.pk)
+
+    def suggest(self, text, limit=10):
+        """
+        Returns up to `limit` (pk, label) pairs whose label has a word
+        sequence starting with `text`, in alphabetical order of the match.
+        """
+        prefix = normalize(text)[:MAX_KEY_LENGTH]
+        if not prefix:
+            return []
+        self._schedule()
+        results = []
+        seen = set()
+        with self._lock:
+            entries = self._entries
+            index = bisect_left(entries, prefix)
+            while index < len(entries) and len(results) < limit:
+                entry = entries[index]
+                if not entry.startswith(prefix):
+                    break
+                pk = entry.rpartition(SEPARATOR)[2]
+                if pk not in seen:
+                    seen.add(pk)
+                    results.append(self._labels[pk])
+                index += 1
+        return results
+
+    def _schedule(self):
+        now = time.monotonic()
+        if self._busy or now < self._retry_at:
+            return
+        if not self.loaded or now - self._built_at >= self.rebuild_interval:
+            self._start(self.build)
+        elif now - self._refreshed_at >= self.max_age:
+            self._start(self.refresh)
+
+    def _start(self, job):
+        with self._lock:
+            if self._busy:
+                return
+            self._busy = True
+        threading.Thread(target=self._run, args=(job,), daemon=True, name=f'prefixindex {self.model}').start()
+
+    def _run(self, job):
+        try:
+            job()
+        except Exception:
+            logger.exception('Loading the %s.%s prefix index failed', self.model, self.label)
+            self._retry_at = time.monotonic() + RETRY_DELAY
+        finally:
+            self._busy = False
+            connection.close()
+
+    def clear(self):
+        with self._lock:
+            self._entries, self._labels = [], {}
+            self._mark = self._built_at = self._refreshed_at = None
+            self._retry_at = 0
@@ -0,0 +1,80 @@
+import random
+import statistics
+import string
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from prefixindex import PrefixIndex
+
+
+class Command(BaseCommand):
+    """
+    Measures prefixindex.PrefixIndex: the time to build it, how long a
+    lookup waits while it is still loading, single updates and, per
+    keystroke, the time to answer every prefix of sampled labels.
+
+    By default the index is filled from synthetic labels held in memory.
+    With --model and --label it is built from that table instead, and the
+    incremental refresh from the high-water mark (--mark) is timed as well.
+    """
+    help = 'Benchmark the autocomplete prefix index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=1_000_000,
+                            help='Synthetic labels to index (default: 1000000).')
+        parser.add_argument('--model', help='Index this model ("app_label.ModelName") instead.')
+        parser.add_argument('--label', help='Text field of --model to index.')
+        parser.add_argument('--mark', default='pk', help='High-water mark column of --model (default: pk).')
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        if options['model']:
+            if not options['label']:
+                raise CommandError('--model needs --label.')
+            index = PrefixIndex(options['model'], options['label'], mark=options['mark'])
+            rows = None
+        else:
+            vocabulary = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(50_000)]
+            rows = [(pk, ' '.join(rng.choices(vocabulary, k=rng.randint(1, 4))), pk) for pk in range(options['entries'])]
+            # Any model will do: the rows are passed in, only signals are connected to it
+            index = PrefixIndex(settings.AUTH_USER_MODEL, 'username')
+
+        # A lookup arriving while the index loads must not wait for it
+        started = time.perf_counter()
+        index._start(lambda: index.build(rows))
+        waited = time.perf_counter()
+        index.suggest('a')
+        waited = time.perf_counter() - waited
+        while index._busy:
+            time.sleep(0.01)
+        labels = [label for _, label in index._labels.values()]
+        self.stdout.write(f'Built {len(labels)} labels ({len(index._entries)} keys) '
+                          f'in {time.perf_counter() - started:.1f}s; a lookup during the load took {waited * 1000:.3f}ms')
+
+        timings = []
+        for label in rng.sample(labels, min(options['queries'], len(labels))):
+            # One lookup per keystroke while typing the label
+            for end in range(1, len(label) + 1):
+                started = time.perf_counter()
+                index.suggest(label[:end])
+                timings.append(time.perf_counter() - started)
+        if timings:
+            timings.sort()
+            self.stdout.write(
+                f'{len(timings)} lookups: median {statistics.median(timings) * 1000:.3f}ms, '
+                f'p99 {timings[int(len(timings) * 0.99)] * 1000:.3f}ms, max {timings[-1] * 1000:.3f}ms'
+            )
+
+        if labels:
+            started = time.perf_counter()
+            for pk in range(-100, 0):
+                index.add(pk, rng.choice(labels))
+            self.stdout.write(f'Incremental add: {(time.perf_counter() - started) * 10:.3f}ms per label')
+
+        if rows is None:
+            started = time.perf_counter()
+            changed = index.refresh()
+            self.stdout.write(f'Refresh from the high-water mark: {changed} changed rows '
+                              f'in {(time.perf_counter() - started) * 1000:.1f}ms')
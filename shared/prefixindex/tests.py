@@ -0,0 +1,76 @@
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from . import index as prefixindex
+from .index import PrefixIndex, index_keys
+
+
+class PrefixIndexTests(TestCase):
+    """
+    Tests for PrefixIndex, built over auth users.
+    """
+
+    def setUp(self):
+        self.index = PrefixIndex('auth.User', 'username', filters={'is_active': True})
+        self.addCleanup(prefixindex._registry.remove, self.index)
+        self.alice = User.objects.create_user(username='alice')
+        User.objects.create_user(username='albert', is_active=False)
+
+    def test_index_keys(self):
+        self.assertEqual(index_keys('Crème Brûlée!'), {'creme brulee', 'brulee'})
+
+    def test_lookups_never_load_synchronously(self):
+        """
+        An unloaded index answers nothing without a query and starts a load
+        in the background.
+        """
+        with mock.patch.object(self.index, '_start') as start, self.assertNumQueries(0):
+            self.assertEqual(self.index.suggest('al'), [])
+        start.assert_called_once_with(self.index.build)
+
+    def test_build_and_filters(self):
+        self.index.warm(background=False)
+        self.assertEqual(self.index.suggest('al'), [(self.alice.pk, 'alice')])
+        with mock.patch.object(self.index, '_start') as start:
+            self.index.suggest('al')
+        start.assert_not_called()
+
+    def test_refresh_reads_past_the_primary_key_mark(self):
+        self.index.warm(background=False)
+        # Written by another process: no signal reaches this index
+        User.objects.bulk_create([User(username='alfred')])
+        with self.assertNumQueries(1) as queries:
+            self.assertEqual(self.index.refresh(), 1)
+        self.assertIn(f'"id" > {self.alice.pk}', queries.captured_queries[0]['sql'])
+        self.assertEqual([label for pk, label in self.index.suggest('al')], ['alfred', 'alice'])
+
+    def test_refresh_reads_past_the_timestamp_mark(self):
+        """
+        A timestamp mark also picks up edits, re-reading an overlap window.
+        """
+        index = PrefixIndex('auth.User', 'username', mark='date_joined')
+        self.addCleanup(prefixindex._registry.remove, index)
+        index.warm(background=False)
+        later = timezone.now() + timedelta(hours=1)
+        User.objects.filter(pk=self.alice.pk).update(username='alicia', date_joined=later)
+        self.assertEqual(index.refresh(), 1)
+        self.assertEqual(index.suggest('alic'), [(self.alice.pk, 'alicia')])
+        self.assertEqual(index._mark, later)
+        # Only the overlap window is read again, and nothing in it changed
+        self.assertEqual(index.refresh(), 0)
+
+    def test_changes_during_a_load_are_replayed(self):
+        """
+        A save that lands while a load is reading is not lost when the
+        load swaps in rows read before it.
+        """
+        def rows():
+            yield self.alice.pk, 'alice', self.alice.pk
+            self.alice.username = 'alison'
+            self.alice.save()
+
+        self.index.build(rows())
+        self.assertEqual(self.index.suggest('alice'), [])
+        self.assertEqual(self.index.suggest('alis'), [(self.alice.pk, 'alison')])
@@ -0,0 +1,2 @@
+# tokenauth: in-process cache of validated DRF tokens, shared by the
+# projects in this repository (see shared/README.md).
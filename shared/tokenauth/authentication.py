@@ -0,0 +1,101 @@
+# tokenauth/authentication.py
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """
+    In-process map of token key -> (user, token) with a TTL and LRU eviction.
+    Entries are dropped by the Token/User signal handlers in tokenauth.signals
+    when a token is deleted or its user changes. Those signals only reach
+    this process, so in a multi-process deployment the TTL bounds how long
+    another process keeps accepting a revoked token.
+
+    The keys cached for each user are tracked too, so a user save (every
+    login updates last_login) drops that user's entries without scanning
+    the whole cache.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._lock = threading.Lock()
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'TOKEN_AUTH_CACHE_TIMEOUT', 60)
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'TOKEN_AUTH_CACHE_SIZE', 10000)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        if self.timeout <= 0:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (time.monotonic() + self.timeout, value)
+            self._user_keys.setdefault(value[0].pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._pop(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            for key in self._user_keys.get(user_id, set()).copy():
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[1][0].pk
+        keys = self._user_keys.get(user_id)
+        keys.discard(key)
+        if not keys:
+            del self._user_keys[user_id]
+
+
+token_cache = TokenCache()
+
+
+class CachingTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that remembers validated tokens in token_cache, so a
+    repeat request authenticates with a dictionary lookup instead of a query
+    joining authtoken_token to the user table. Each request gets its own copy
+    of the cached user, so per-request changes to it do not leak.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            cached = (copy.copy(user), token)
+            token_cache.set(key, cached)
+        user, token = cached
+        return (copy.copy(user), token)
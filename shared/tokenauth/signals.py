@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import token_cache
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """
+    Stops accepting a token from the authentication cache once it is deleted.
+    The key is the Token's primary key, so it never changes in place:
+    rotating a token means deleting the row and creating a new one.
+    """
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_user_tokens(sender, instance, **kwargs):
+    """
+    Drops cached tokens of a user who was changed (e.g. deactivated) or deleted.
+    """
+    token_cache.delete_user(instance.pk)
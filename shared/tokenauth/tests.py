@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+from .authentication import CachingTokenAuthentication, token_cache
+
+
+class CachingTokenAuthenticationTests(TestCase):
+    """
+    Tests for the cached token authentication.
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(username='reader', password='password123')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachingTokenAuthentication()
+
+    def test_repeat_requests_skip_token_lookup(self):
+        """
+        Only the first request looks the token up in the database, and each
+        request gets its own copy of the user.
+        """
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+        user.username = 'changed'
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual((user.username, token), ('reader', self.token))
+
+    def test_deleted_token_is_rejected(self):
+        """
+        Deleting a token (logging out or rotating it) stops it from authenticating.
+        """
+        self.auth.authenticate_credentials(self.token.key)
+        self.token.delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_deactivated_user_is_rejected(self):
+        """
+        Changes to the user drop its cached tokens, and only those.
+        """
+        other = get_user_model().objects.create_user(username='other', password='password123')
+        other_token = Token.objects.create(user=other)
+        self.auth.authenticate_credentials(self.token.key)
+        self.auth.authenticate_credentials(other_token.key)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertIsNotNone(token_cache.get(other_token.key))
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    @override_settings(TOKEN_AUTH_CACHE_SIZE=1)
+    def test_evicted_keys_leave_the_user_map(self):
+        other = get_user_model().objects.create_user(username='other', password='password123')
+        other_token = Token.objects.create(user=other)
+        self.auth.authenticate_credentials(self.token.key)
+        self.auth.authenticate_credentials(other_token.key)
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertEqual(token_cache._user_keys, {other.pk: {other_token.key}})
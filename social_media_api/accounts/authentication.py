@@ -0,0 +1,26 @@
+# accounts/authentication.py
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from . import signed_tokens
+
+
+class SignedTokenAuthentication(TokenAuthentication):
+    """
+    Authenticates "Authorization: Bearer <access token>" headers carrying the
+    stateless signed tokens issued by accounts/token/. Validation only checks
+    the signature, the expiry and the cached deny-list, so it needs no
+    database access. Does nothing unless SIGNED_TOKEN_AUTH is enabled.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        if not signed_tokens.enabled():
+            return None
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        try:
+            return (signed_tokens.read_access_token(key), key)
+        except signed_tokens.InvalidToken as exc:
+            raise exceptions.AuthenticationFailed(str(exc))
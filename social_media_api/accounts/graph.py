@@ -0,0 +1,190 @@
+# accounts/graph.py
+
+import time
+from bisect import bisect_left
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import CustomUser, StaleFollowSuggestions
+
+
+Follow = CustomUser.following.through
+
+
+def cache_timeout():
+    return getattr(settings, 'FOLLOW_GRAPH_CACHE_TIMEOUT', 60 * 60)
+
+
+def version_key(user_id):
+    return f'accounts:graph:version:{user_id}'
+
+
+def graph_version(user_id):
+    """
+    Returns the current version stamp of the user's follow edges.
+
+    Cached ID arrays are stored under the version they were read at, so
+    bumping the stamp retires them at once and a reader racing a follow can
+    only repopulate a version nobody asks for any more. A missing stamp
+    restarts from the clock, never from a number that was used before.
+    """
+    key = version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_graph(user_ids):
+    """
+    Bumps the version stamp of these users after their edges changed.
+    """
+    for user_id in set(user_ids):
+        try:
+            cache.incr(version_key(user_id))
+        except ValueError:
+            cache.set(version_key(user_id), time.time_ns(), None)
+
+
+def _cached_ids(user_id, direction, queryset):
+    key = f'accounts:graph:{direction}:{user_id}:{graph_version(user_id)}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+        cache.set(key, ids, cache_timeout())
+    return ids
+
+
+def following_ids(user_id):
+    """
+    Returns the sorted IDs of the accounts the user follows.
+    """
+    return _cached_ids(user_id, 'following', CustomUser.objects.filter(followers=user_id))
+
+
+def follower_ids(user_id):
+    """
+    Returns the sorted IDs of the accounts following the user.
+    """
+    return _cached_ids(user_id, 'followers', CustomUser.objects.filter(following=user_id))
+
+
+def is_following(user_id, other_id):
+    """
+    Returns True when user_id follows other_id, answered from the cached array.
+    """
+    ids = following_ids(user_id)
+    index = bisect_left(ids, other_id)
+    return index < len(ids) and ids[index] == other_id
+
+
+def follow(user, target):
+    """
+    Makes user follow target. Returns True if the edge is new.
+    The follower and following counters move only when a row was inserted.
+    """
+    with transaction.atomic():
+        _, created = Follow.objects.get_or_create(from_customuser_id=user.pk, to_customuser_id=target.pk)
+        if created:
+            _adjust_counts(user.pk, [target.pk], 1)
+    return created
+
+
+def unfollow(user, target):
+    """
+    Makes user stop following target. Returns True if there was an edge to remove.
+    """
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(from_customuser_id=user.pk, to_customuser_id=target.pk).delete()
+        if deleted:
+            _adjust_counts(user.pk, [target.pk], -1)
+    return bool(deleted)
+
+
+def follow_many(user, target_ids):
+    """
+    Makes user follow every account in target_ids.
+
+    The IDs are checked with one query and the new edges written with one
+    bulk insert that skips existing rows, so repeating a request is harmless.
+    Returns an outcome per ID: 'followed', 'already_following', 'not_found'
+    or 'self'.
+    """
+    target_ids = list(dict.fromkeys(target_ids))
+    existing = set(CustomUser.objects.filter(pk__in=target_ids).values_list('pk', flat=True))
+    with transaction.atomic():
+        followed = set(
+            Follow.objects.filter(from_customuser_id=user.pk, to_customuser_id__in=existing)
+            .values_list('to_customuser_id', flat=True)
+        )
+        new_ids = [pk for pk in target_ids if pk in existing and pk not in followed and pk != user.pk]
+        if new_ids:
+            Follow.objects.bulk_create(
+                [Follow(from_customuser_id=user.pk, to_customuser_id=pk) for pk in new_ids],
+                ignore_conflicts=True,
+            )
+            _recount(user.pk, new_ids)
+    return {pk: _outcome(pk, user, existing, followed, 'followed', 'already_following') for pk in target_ids}
+
+
+def unfollow_many(user, target_ids):
+    """
+    Makes user stop following every account in target_ids with one delete.
+    Returns an outcome per ID: 'unfollowed', 'not_following', 'not_found' or 'self'.
+    """
+    target_ids = list(dict.fromkeys(target_ids))
+    existing = set(CustomUser.objects.filter(pk__in=target_ids).values_list('pk', flat=True))
+    with transaction.atomic():
+        edges = Follow.objects.filter(from_customuser_id=user.pk, to_customuser_id__in=existing)
+        removed = set(edges.values_list('to_customuser_id', flat=True))
+        if removed:
+            edges.delete()
+            _recount(user.pk, list(removed))
+    unfollowed = existing - removed
+    return {pk: _outcome(pk, user, existing, unfollowed, 'unfollowed', 'not_following') for pk in target_ids}
+
+
+def _outcome(pk, user, existing, unchanged, changed_label, unchanged_label):
+    if pk == user.pk:
+        return 'self'
+    if pk not in existing:
+        return 'not_found'
+    return unchanged_label if pk in unchanged else changed_label
+
+
+def _recount(user_id, target_ids):
+    """
+    Recomputes the counters of the users touched by a bulk change from the
+    through table. Unlike an F() increment this stays exact when a
+    concurrent request inserted or removed one of the same edges.
+    """
+    def total(match):
+        rows = Follow.objects.filter(**{match: OuterRef('pk')}).order_by().values(match).annotate(n=Count('pk')).values('n')
+        return Coalesce(Subquery(rows), 0)
+
+    CustomUser.objects.filter(pk=user_id).update(following_count=total('from_customuser'))
+    CustomUser.objects.filter(pk__in=target_ids).update(followers_count=total('to_customuser'))
+    mark_suggestions_stale(user_id)
+    transaction.on_commit(lambda: invalidate_graph([user_id, *target_ids]))
+
+
+def _adjust_counts(user_id, target_ids, delta):
+    CustomUser.objects.filter(pk=user_id).update(following_count=F('following_count') + delta * len(target_ids))
+    CustomUser.objects.filter(pk__in=target_ids).update(followers_count=F('followers_count') + delta)
+    mark_suggestions_stale(user_id)
+    transaction.on_commit(lambda: invalidate_graph([user_id, *target_ids]))
+
+
+def mark_suggestions_stale(user_id):
+    """
+    Flags the user's "who to follow" list for the next incremental refresh.
+    Re-marking an already stale user moves its timestamp forward.
+    """
+    StaleFollowSuggestions.objects.bulk_create(
+        [StaleFollowSuggestions(user_id=user_id, marked_at=timezone.now())],
+        update_conflicts=True, unique_fields=['user_id'], update_fields=['marked_at'],
+    )
@@ -0,0 +1,124 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from accounts.graph import Follow
+from accounts.models import CustomUser, FollowSuggestion, StaleFollowSuggestions
+from accounts.suggestions import BATCH_SIZE, FollowingCache, following_cache_edges, refresh_all, refresh_stale
+
+
+class Command(BaseCommand):
+    """
+    Times the refresh_follow_suggestions job against the database on a
+    synthetic follow graph. Followees are drawn from a skewed popularity
+    distribution so a few accounts have very large follower counts, as in
+    a real network.
+
+    The graph is written to the configured database (users prefixed with
+    --prefix, removed at the end). The full refresh covers every user in
+    the database, so run it against an empty one for clean numbers. Each
+    run reports its queries and the edge rows it read; --cache-edges 0
+    shows the cost without the edge cache shared between batches.
+    """
+    help = 'Benchmark the follow suggestion refresh on a synthetic graph.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--edges', type=int, default=1_000_000)
+        parser.add_argument('--users', type=int, default=50_000)
+        parser.add_argument('--stale', type=float, default=0.01,
+                            help='Share of users marked stale for the incremental run (default: 0.01).')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--cache-edges', type=int, default=None,
+                            help='Edges kept between batches (default: FOLLOW_SUGGESTIONS_CACHE_EDGES).')
+        parser.add_argument('--prefix', default='suggestload')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        prefix = options['prefix']
+        cache_edges = following_cache_edges() if options['cache_edges'] is None else options['cache_edges']
+        started = time.perf_counter()
+        user_ids = self.create_graph(rng, prefix, options['users'], options['edges'])
+        edges = Follow.objects.filter(from_customuser_id__in=self.prefixed(prefix)).count()
+        self.stdout.write(f'Wrote {len(user_ids)} users / {edges} edges in {time.perf_counter() - started:.1f}s')
+
+        try:
+            following = FollowingCache(cache_edges)
+            elapsed, queries, processed = self.timed(refresh_all, options['batch_size'], following)
+            self.stdout.write(
+                f'Full refresh: {processed} users in {elapsed:.1f}s ({processed / elapsed:.0f} users/s), '
+                f'{queries} queries, {following.rows_read} edge rows read'
+            )
+
+            stale = rng.sample(user_ids, max(1, int(len(user_ids) * options['stale'])))
+            now = timezone.now()
+            StaleFollowSuggestions.objects.bulk_create(
+                [StaleFollowSuggestions(user_id=pk, marked_at=now) for pk in stale], ignore_conflicts=True
+            )
+            following = FollowingCache(cache_edges)
+            elapsed, queries, processed = self.timed(self.drain, options['batch_size'], following)
+            self.stdout.write(
+                f'Incremental refresh of {len(stale)} stale users ({processed} affected): {elapsed:.2f}s, '
+                f'{queries} queries, {following.rows_read} edge rows read'
+            )
+        finally:
+            self.delete_graph(prefix)
+
+    def prefixed(self, prefix):
+        return CustomUser.objects.filter(username__startswith=f'{prefix}-').values('pk')
+
+    def create_graph(self, rng, prefix, users, edges):
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=f'{prefix}-{i}') for i in range(users)], batch_size=5000
+        )
+        user_ids = list(self.prefixed(prefix).order_by('pk').values_list('pk', flat=True))
+        # The first users are the most followed
+        weights = [1 / rank ** 0.8 for rank in range(1, len(user_ids) + 1)]
+        pairs = set()
+        for followee_id in rng.choices(user_ids, weights=weights, k=edges):
+            follower_id = rng.choice(user_ids)
+            if follower_id != followee_id:
+                pairs.add((follower_id, followee_id))
+        Follow.objects.bulk_create(
+            [Follow(from_customuser_id=a, to_customuser_id=b) for a, b in pairs], batch_size=5000
+        )
+
+        def total(match):
+            rows = Follow.objects.filter(**{match: OuterRef('pk')}).order_by().values(match).annotate(n=Count('pk')).values('n')
+            return Coalesce(Subquery(rows), 0)
+
+        CustomUser.objects.filter(pk__in=user_ids).update(
+            following_count=total('from_customuser'), followers_count=total('to_customuser')
+        )
+        return user_ids
+
+    def delete_graph(self, prefix):
+        users = self.prefixed(prefix)
+        StaleFollowSuggestions.objects.filter(user_id__in=users).delete()
+        FollowSuggestion.objects.filter(user_id__in=users).delete()
+        FollowSuggestion.objects.filter(candidate_id__in=users).delete()
+        Follow.objects.filter(from_customuser_id__in=users).delete()
+        Follow.objects.filter(to_customuser_id__in=users).delete()
+        CustomUser.objects.filter(username__startswith=f'{prefix}-').delete()
+
+    def drain(self, batch_size, following):
+        processed = 0
+        while count := refresh_stale(batch_size, following):
+            processed += count
+        return processed
+
+    def timed(self, job, *args):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count):
+            result = job(*args)
+        return time.perf_counter() - started, queries, result
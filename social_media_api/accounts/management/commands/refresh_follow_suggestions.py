@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand
+from accounts.suggestions import BATCH_SIZE, refresh_all, refresh_stale
+
+
+class Command(BaseCommand):
+    """
+    Precomputes the "who to follow" lists served by accounts/suggestions/.
+    By default only users marked stale by a follow or unfollow (and their
+    followers) are refreshed; run it from cron or with --interval as a worker.
+    --full recomputes every user, e.g. after the initial deploy.
+    """
+    help = 'Refresh the precomputed follow suggestions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Recompute the suggestions of every user.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help=f'Number of users refreshed per batch (default: {BATCH_SIZE}).')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep running and poll for stale users every N seconds.')
+
+    def handle(self, *args, **options):
+        if options['full']:
+            processed = refresh_all(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Refreshed suggestions for {processed} users.'))
+            return
+
+        processed = 0
+        while True:
+            count = refresh_stale(options['batch_size'])
+            processed += count
+            if count:
+                continue
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed suggestions for {processed} users.'))
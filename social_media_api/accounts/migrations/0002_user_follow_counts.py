@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:24
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counts(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    Follow = CustomUser.following.through
+
+    def total(match, group):
+        rows = Follow.objects.filter(**{match: OuterRef('pk')}).order_by().values(group).annotate(n=Count('pk')).values('n')
+        return Coalesce(Subquery(rows), 0)
+
+    CustomUser.objects.update(
+        followers_count=total('to_customuser', 'to_customuser'),
+        following_count=total('from_customuser', 'from_customuser'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
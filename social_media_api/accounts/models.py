@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 
 # Create your models here.
 
@@ -7,6 +8,60 @@ class CustomUser(AbstractUser):
     bio = models.TextField(max_length=500,blank=True, null=True)
     profile_picture = models.ImageField(upload_to='profile_pics/',blank=True,null=True)
     following = models.ManyToManyField('self',symmetrical=False,related_name='followers',blank=True)
+    # Kept in step with `following` by accounts.graph
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.username
+
+
+class TokenUser(CustomUser):
+    """
+    The user behind a signed access token (accounts.signed_tokens), built
+    from the token's claims without reading the database. Only id, username,
+    is_staff and is_active are filled in, so it refuses to be written back;
+    load a CustomUser when the full row is needed.
+    """
+
+    class Meta:
+        proxy = True
+
+    def save(self, *args, **kwargs):
+        raise TypeError('TokenUser is built from token claims and cannot be saved.')
+
+    def delete(self, *args, **kwargs):
+        raise TypeError('TokenUser is built from token claims and cannot be deleted.')
+
+
+class FollowSuggestion(models.Model):
+    """
+    A precomputed "who to follow" candidate: `candidate` is followed by
+    `score` of the accounts `user` follows (friends of friends). Written by
+    the refresh_follow_suggestions job, read by the suggestions endpoint.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='follow_suggestions')
+    candidate = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='+')
+    score = models.PositiveIntegerField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'candidate')
+        indexes = [
+            models.Index(fields=['user', '-score', 'candidate'], name='suggestion_user_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.candidate_id} for {self.user_id} ({self.score})"
+
+
+class StaleFollowSuggestions(models.Model):
+    """
+    Marks a user whose suggestions are out of date after a follow or unfollow.
+    The refresh job recomputes and clears these rows in batches.
+    """
+    user_id = models.BigIntegerField(primary_key=True)
+    marked_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user_id} (stale)"
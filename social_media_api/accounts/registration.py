@@ -0,0 +1,49 @@
+# accounts/registration.py
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+
+_executor = None
+
+
+def hash_executor():
+    """
+    Returns the thread pool that password hashes are computed on.
+    hashlib releases the GIL while hashing, so the pool runs hashes in
+    parallel without holding up the event loop or the thread that serves
+    sync views under ASGI. Its size (PASSWORD_HASH_WORKERS) caps how many
+    signups hash at once.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'PASSWORD_HASH_WORKERS', 4),
+            thread_name_prefix='password-hash',
+        )
+    return _executor
+
+
+async def ahash_password(raw_password):
+    """
+    Hashes a password with the configured hasher on the hashing thread pool.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hash_executor(), make_password, raw_password)
+
+
+def create_account(username, email, password_hash):
+    """
+    Creates a user from an already hashed password together with its API
+    token. This is the only place registration creates a token.
+    """
+    with transaction.atomic():
+        user = get_user_model()(username=username, email=email, password=password_hash)
+        user.save()
+        Token.objects.create(user=user)
+    return user
@@ -1,14 +1,30 @@
 # accounts/serializers.py
 
 from rest_framework import serializers
-from .models import CustomUser
-from rest_framework.authtoken.models import Token
+from .models import CustomUser, FollowSuggestion
+from .graph import is_following
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from .registration import create_account
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUser
-        fields = ['id', 'username', 'email', 'bio', 'profile_picture']
+        fields = ['id', 'username', 'email', 'bio', 'profile_picture', 'followers_count', 'following_count']
+        read_only_fields = ['followers_count', 'following_count']
+
+class UserProfileSerializer(UserSerializer):
+    is_following = serializers.SerializerMethodField()
+    follows_you = serializers.SerializerMethodField()
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ['is_following', 'follows_you']
+
+    def get_is_following(self, obj):
+        return is_following(self.context['request'].user.pk, obj.pk)
+
+    def get_follows_you(self, obj):
+        return is_following(obj.pk, self.context['request'].user.pk)
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
@@ -28,14 +44,31 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        user = get_user_model().objects.create_user( 
-            username=validated_data['username'],
-            email=validated_data['email'],
-            password=validated_data['password']
+        password_hash = validated_data.get('password_hash') or make_password(validated_data['password'])
+        return create_account(
+            username=get_user_model().normalize_username(validated_data['username']),
+            email=get_user_model().objects.normalize_email(validated_data['email']),
+            password_hash=password_hash,
         )
-        Token.objects.create(user=user)
-        return user
 
 class LoginSerializer(serializers.Serializer):
     username = serializers.CharField()
-    password = serializers.CharField(write_only=True, style={'input_type': 'password'})
\ No newline at end of file
+    password = serializers.CharField(write_only=True, style={'input_type': 'password'})
+
+class BulkFollowSerializer(serializers.Serializer):
+    user_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=200)
+
+class FollowSuggestionSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='candidate.id')
+    username = serializers.CharField(source='candidate.username')
+    profile_picture = serializers.ImageField(source='candidate.profile_picture')
+    followers_count = serializers.IntegerField(source='candidate.followers_count')
+    mutual_count = serializers.IntegerField(source='score')
+
+    class Meta:
+        model = FollowSuggestion
+        fields = ['id', 'username', 'profile_picture', 'followers_count', 'mutual_count']
+
+class RefreshTokenSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+    access = serializers.CharField(required=False)
@@ -0,0 +1,90 @@
+# accounts/signed_tokens.py
+
+import secrets
+import time
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from .models import TokenUser
+
+
+ACCESS_SALT = 'accounts.signed_tokens.access'
+REFRESH_SALT = 'accounts.signed_tokens.refresh'
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def enabled():
+    return getattr(settings, 'SIGNED_TOKEN_AUTH', False)
+
+
+def access_lifetime():
+    return getattr(settings, 'SIGNED_TOKEN_ACCESS_LIFETIME', 5 * 60)
+
+
+def refresh_lifetime():
+    return getattr(settings, 'SIGNED_TOKEN_REFRESH_LIFETIME', 14 * 24 * 60 * 60)
+
+
+def issue_tokens(user):
+    """
+    Returns a new {'access': ..., 'refresh': ...} pair for the user.
+    Both are signed with SECRET_KEY (salted per kind) and carry the user's
+    id, username and staff flag plus a random ID used for revocation.
+    """
+    claims = {'u': user.pk, 'n': user.get_username(), 's': user.is_staff}
+    return {
+        'access': signing.dumps({**claims, 'j': secrets.token_urlsafe(8)}, salt=ACCESS_SALT),
+        'refresh': signing.dumps({**claims, 'j': secrets.token_urlsafe(8)}, salt=REFRESH_SALT),
+    }
+
+
+def read_access_token(token):
+    """
+    Validates an access token and returns its user as a TokenUser.
+    Checks the signature, the expiry and the deny-list; the database is not used.
+    """
+    claims = _load(token, ACCESS_SALT, access_lifetime())
+    return TokenUser(id=claims['u'], username=claims['n'], is_staff=claims['s'], is_active=True)
+
+
+def read_refresh_token(token):
+    return _load(token, REFRESH_SALT, refresh_lifetime())
+
+
+def deny(token, salt, lifetime):
+    """
+    Revokes a token by putting its ID on the deny-list until it would have
+    expired anyway, so the list only ever holds live tokens.
+    """
+    try:
+        claims = _load(token, salt, lifetime)
+    except InvalidToken:
+        return False
+    remaining = lifetime - (time.time() - signing.b62_decode(token.split(':')[-2]))
+    cache.set(_deny_key(claims['j']), 1, max(1, int(remaining) + 1))
+    return True
+
+
+def deny_access_token(token):
+    return deny(token, ACCESS_SALT, access_lifetime())
+
+
+def deny_refresh_token(token):
+    return deny(token, REFRESH_SALT, refresh_lifetime())
+
+
+def _load(token, salt, lifetime):
+    try:
+        claims = signing.loads(token, salt=salt, max_age=lifetime)
+    except signing.BadSignature:
+        raise InvalidToken('Invalid or expired token.')
+    if cache.get(_deny_key(claims['j'])):
+        raise InvalidToken('Token has been revoked.')
+    return claims
+
+
+def _deny_key(token_id):
+    return f'accounts:denied:{token_id}'
@@ -0,0 +1,173 @@
+# accounts/suggestions.py
+
+import heapq
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .graph import Follow
+from .models import CustomUser, FollowSuggestion, StaleFollowSuggestions
+
+
+BATCH_SIZE = 500
+# Keeps IN (...) lists under the bound-parameter limits of every backend
+LOOKUP_CHUNK = 900
+
+
+def suggestion_limit():
+    """
+    How many candidates are stored per user (the K in top-K).
+    """
+    return getattr(settings, 'FOLLOW_SUGGESTIONS_LIMIT', 50)
+
+
+def stale_max_followers():
+    """
+    A follow by an account with more followers than this refreshes only that
+    account's own suggestions; its followers catch up on the next full run.
+    """
+    return getattr(settings, 'FOLLOW_SUGGESTIONS_STALE_MAX_FOLLOWERS', 5000)
+
+
+def rank_candidates(user_id, following, following_of, limit):
+    """
+    Returns the top `limit` (candidate_id, score) pairs for one user, where
+    score is the number of accounts in `following` that follow the candidate.
+    Accounts the user already follows, and the user, are left out. Ties are
+    broken by the lower ID so reruns produce the same list.
+    """
+    counts = Counter()
+    for followee in following:
+        counts.update(following_of.get(followee, ()))
+    counts.pop(user_id, None)
+    for followee in following:
+        counts.pop(followee, None)
+    return heapq.nsmallest(limit, counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+def following_cache_edges():
+    """
+    How many edges a full refresh keeps in memory between batches before
+    it starts over.
+    """
+    return getattr(settings, 'FOLLOW_SUGGESTIONS_CACHE_EDGES', 5_000_000)
+
+
+class FollowingCache:
+    """
+    The outgoing edges read so far, as {user_id: [followee_id, ...]}.
+
+    Consecutive batches of a full refresh share most of their second hop
+    (everyone follows the same popular accounts), so keeping the lists they
+    have read lets each list be fetched about once per run instead of once
+    per batch. Once more than `max_edges` edges are held, the next batch
+    starts from an empty cache. `rows_read` counts the edge rows fetched.
+    """
+
+    def __init__(self, max_edges=None):
+        self.max_edges = following_cache_edges() if max_edges is None else max_edges
+        self.adjacency = {}
+        self.edges = 0
+        self.rows_read = 0
+
+    def trim(self):
+        if self.edges > self.max_edges:
+            self.adjacency = {}
+            self.edges = 0
+
+    def load(self, user_ids):
+        """
+        Reads the outgoing edges of the users among `user_ids` not held yet.
+        """
+        missing = [pk for pk in dict.fromkeys(user_ids) if pk not in self.adjacency]
+        for pk in missing:
+            self.adjacency[pk] = []
+        for start in range(0, len(missing), LOOKUP_CHUNK):
+            edges = Follow.objects.filter(from_customuser_id__in=missing[start:start + LOOKUP_CHUNK])
+            for follower_id, followee_id in edges.values_list('from_customuser_id', 'to_customuser_id').iterator():
+                self.adjacency[follower_id].append(followee_id)
+                self.edges += 1
+                self.rows_read += 1
+        return self.adjacency
+
+
+def refresh_suggestions(user_ids, limit=None, following=None):
+    """
+    Recomputes the stored suggestions of these users.
+    Needs one read for their edges and one for the edges of the accounts they
+    follow (less whatever `following`, a FollowingCache shared between
+    batches, already holds), then replaces their rows with a delete and a
+    bulk insert. Returns the number of suggestions written.
+    """
+    user_ids = list(user_ids)
+    limit = limit or suggestion_limit()
+    following = FollowingCache() if following is None else following
+    following.trim()
+    adjacency = following.load(user_ids)
+    adjacency = following.load(pk for user_id in user_ids for pk in adjacency[user_id])
+
+    rows = [
+        FollowSuggestion(user_id=user_id, candidate_id=candidate_id, score=score)
+        for user_id in user_ids
+        for candidate_id, score in rank_candidates(user_id, adjacency[user_id], adjacency, limit)
+    ]
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user_id__in=user_ids).delete()
+        FollowSuggestion.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def refresh_all(batch_size=BATCH_SIZE, following=None):
+    """
+    Recomputes the suggestions of every user, in primary key order.
+
+    Each batch clears the stale markers of its own users that were set
+    before the run started; a follow that lands mid-run keeps its marker,
+    since its followers may have been computed already.
+    Returns the number of users processed.
+    """
+    started = timezone.now()
+    following = FollowingCache() if following is None else following
+    last_id = 0
+    processed = 0
+    while True:
+        user_ids = list(
+            CustomUser.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not user_ids:
+            break
+        refresh_suggestions(user_ids, following=following)
+        StaleFollowSuggestions.objects.filter(user_id__in=user_ids, marked_at__lte=started).delete()
+        processed += len(user_ids)
+        last_id = user_ids[-1]
+    return processed
+
+
+def refresh_stale(batch_size=BATCH_SIZE, following=None):
+    """
+    Recomputes the suggestions of up to `batch_size` users marked stale, plus
+    the followers of those users (their friends of friends changed too) when
+    the marked account has at most stale_max_followers() followers.
+
+    Markers are cleared only if they were not touched again while the batch
+    was being computed, so a follow that lands mid-refresh is not lost.
+    Returns the number of users refreshed.
+    """
+    markers = list(StaleFollowSuggestions.objects.order_by('marked_at')[:batch_size])
+    if not markers:
+        return 0
+    stale_ids = [marker.user_id for marker in markers]
+
+    small_ids = CustomUser.objects.filter(
+        pk__in=stale_ids, followers_count__lte=stale_max_followers()
+    ).values('pk')
+    follower_ids = Follow.objects.filter(to_customuser_id__in=small_ids).values_list('from_customuser_id', flat=True)
+    affected = list(dict.fromkeys([*stale_ids, *follower_ids]))
+    following = FollowingCache() if following is None else following
+    for start in range(0, len(affected), batch_size):
+        refresh_suggestions(affected[start:start + batch_size], following=following)
+
+    StaleFollowSuggestions.objects.filter(
+        user_id__in=stale_ids, marked_at__lte=max(marker.marked_at for marker in markers)
+    ).delete()
+    return len(affected)
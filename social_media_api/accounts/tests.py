@@ -1,3 +1,306 @@
-from django.test import TestCase
+# accounts/tests.py
 
-# Create your tests here.
+from datetime import timedelta
+from io import StringIO
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from .graph import Follow, following_ids, follower_ids
+from notifications.models import QueuedNotification
+from posts.models import Post, TimelineEntry
+from .models import CustomUser, FollowSuggestion, StaleFollowSuggestions
+from .suggestions import FollowingCache, refresh_all
+
+
+class FollowGraphTests(APITestCase):
+    """
+    Tests for the follower counters and the cached follow graph.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.alice = CustomUser.objects.create_user(username='alice', password='password123')
+        self.bob = CustomUser.objects.create_user(username='bob', password='password123')
+        self.carol = CustomUser.objects.create_user(username='carol', password='password123')
+        self.client.force_authenticate(self.alice)
+
+    def follow(self, user):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('follow-user', kwargs={'user_id': user.id}))
+
+    def unfollow(self, user):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('unfollow-user', kwargs={'user_id': user.id}))
+
+    def test_counters_follow_the_edges(self):
+        """
+        Following twice counts once and unfollowing brings both counters back.
+        """
+        self.follow(self.bob)
+        self.follow(self.bob)
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual((self.alice.following_count, self.bob.followers_count), (1, 1))
+
+        self.unfollow(self.bob)
+        self.unfollow(self.bob)
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual((self.alice.following_count, self.bob.followers_count), (0, 0))
+
+    def test_cached_arrays_are_invalidated(self):
+        """
+        The cached ID arrays are served without queries and refreshed after a change.
+        """
+        self.follow(self.carol)
+        self.assertEqual(following_ids(self.alice.id), [self.carol.id])
+        with self.assertNumQueries(0):
+            following_ids(self.alice.id)
+
+        self.follow(self.bob)
+        self.assertEqual(following_ids(self.alice.id), sorted([self.bob.id, self.carol.id]))
+        self.assertEqual(follower_ids(self.bob.id), [self.alice.id])
+
+        self.unfollow(self.carol)
+        self.assertEqual(following_ids(self.alice.id), [self.bob.id])
+
+    def test_profile_flags_come_from_cache(self):
+        """
+        The profile reports counts and follow flags with a single query for the user.
+        """
+        self.follow(self.bob)
+        self.client.force_authenticate(self.bob)
+        self.follow(self.alice)
+        following_ids(self.alice.id), following_ids(self.bob.id)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('user-profile', kwargs={'pk': self.alice.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['followers_count'], 1)
+        self.assertTrue(response.data['is_following'])
+        self.assertTrue(response.data['follows_you'])
+
+
+class BulkFollowTests(APITestCase):
+    """
+    Tests for the bulk follow and unfollow endpoints.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='newcomer', password='password123')
+        self.suggested = [
+            CustomUser.objects.create_user(username=f'suggested{i}', password='password123')
+            for i in range(5)
+        ]
+        for author in self.suggested:
+            Post.objects.create(author=author, title='Hello', content='Content')
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_follow_reports_each_id(self):
+        """
+        New, repeated, unknown and own IDs each get their own outcome.
+        """
+        ids = [u.id for u in self.suggested]
+        self.client.post(reverse('follow-user', kwargs={'user_id': ids[0]}))
+        response = self.client.post(reverse('bulk-follow'), {'user_ids': ids + [ids[1], 9999, self.user.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = {r['user_id']: r['result'] for r in response.data['results']}
+        self.assertEqual(results[ids[0]], 'already_following')
+        self.assertEqual(results[ids[1]], 'followed')
+        self.assertEqual(results[9999], 'not_found')
+        self.assertEqual(results[self.user.id], 'self')
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.following_count, 5)
+        self.assertEqual(TimelineEntry.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(QueuedNotification.objects.count(), 5)
+
+        # Repeating the request changes nothing
+        response = self.client.post(reverse('bulk-follow'), {'user_ids': ids}, format='json')
+        self.assertEqual({r['result'] for r in response.data['results']}, {'already_following'})
+        self.suggested[1].refresh_from_db()
+        self.assertEqual(self.suggested[1].followers_count, 1)
+
+    def test_bulk_unfollow(self):
+        """
+        Unfollowing in bulk removes the edges, counters and timeline rows.
+        """
+        ids = [u.id for u in self.suggested]
+        self.client.post(reverse('bulk-follow'), {'user_ids': ids[:3]}, format='json')
+        response = self.client.post(reverse('bulk-unfollow'), {'user_ids': ids}, format='json')
+        results = [r['result'] for r in response.data['results']]
+        self.assertEqual(results, ['unfollowed'] * 3 + ['not_following'] * 2)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.following_count, 0)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+
+    def test_bulk_follow_rejects_bad_payload(self):
+        """
+        An empty list of IDs is a validation error.
+        """
+        response = self.client.post(reverse('bulk-follow'), {'user_ids': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FollowSuggestionTests(APITestCase):
+    """
+    Tests for the precomputed friends-of-friends suggestions.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.me, self.friend1, self.friend2, self.popular, self.niche = [
+            CustomUser.objects.create_user(username=name, password='password123')
+            for name in ['me', 'friend1', 'friend2', 'popular', 'niche']
+        ]
+        self.client.force_authenticate(self.me)
+        self.client.post(reverse('bulk-follow'), {'user_ids': [self.friend1.id, self.friend2.id]}, format='json')
+        self.client.force_authenticate(self.friend1)
+        self.client.post(reverse('bulk-follow'), {'user_ids': [self.popular.id, self.niche.id]}, format='json')
+        self.client.force_authenticate(self.friend2)
+        self.client.post(reverse('follow-user', kwargs={'user_id': self.popular.id}))
+        self.client.force_authenticate(self.me)
+
+    def suggestions(self):
+        response = self.client.get(reverse('follow-suggestions'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(r['username'], r['mutual_count']) for r in response.data['results']]
+
+    def test_full_refresh_ranks_friends_of_friends(self):
+        """
+        Candidates are ranked by mutual follows and exclude accounts already followed.
+        """
+        call_command('refresh_follow_suggestions', full=True, stdout=StringIO())
+        self.assertEqual(self.suggestions(), [('popular', 2), ('niche', 1)])
+        self.assertFalse(StaleFollowSuggestions.objects.exists())
+
+    def test_incremental_refresh_follows_graph_changes(self):
+        """
+        Follows mark users stale, and the incremental run refreshes them and their followers.
+        """
+        call_command('refresh_follow_suggestions', stdout=StringIO())
+        self.assertEqual(self.suggestions(), [('popular', 2), ('niche', 1)])
+
+        # friend2 unfollowing popular lowers its score for me on the next run
+        self.client.force_authenticate(self.friend2)
+        self.client.post(reverse('unfollow-user', kwargs={'user_id': self.popular.id}))
+        self.client.force_authenticate(self.me)
+        call_command('refresh_follow_suggestions', stdout=StringIO())
+        self.assertEqual(self.suggestions(), [('popular', 1), ('niche', 1)])
+
+        # A new follow hides the candidate before the job runs again
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('follow-user', kwargs={'user_id': self.niche.id}))
+        self.assertEqual(self.suggestions(), [('popular', 1)])
+        self.assertTrue(FollowSuggestion.objects.filter(user=self.me, candidate=self.niche).exists())
+
+    def test_full_refresh_reads_each_edge_once(self):
+        """
+        Batches share the edges they have read, and markers set after the
+        run started survive it.
+        """
+        StaleFollowSuggestions.objects.filter(user_id=self.friend2.id).update(
+            marked_at=timezone.now() + timedelta(minutes=1)
+        )
+        following = FollowingCache()
+        refresh_all(batch_size=1, following=following)
+        self.assertEqual(self.suggestions(), [('popular', 2), ('niche', 1)])
+        self.assertEqual(following.rows_read, Follow.objects.count())
+        self.assertEqual(list(StaleFollowSuggestions.objects.values_list('user_id', flat=True)), [self.friend2.id])
+
+
+@override_settings(SIGNED_TOKEN_AUTH=True)
+class SignedTokenTests(APITestCase):
+    """
+    Tests for the optional stateless signed-token mode.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='reader', password='password123')
+        response = self.client.post(reverse('token-obtain'), {'username': 'reader', 'password': 'password123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.tokens = response.data
+        self.url = reverse('notification-unread-count')
+
+    def get(self, access):
+        return self.client.get(self.url, HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_access_token_is_checked_without_queries(self):
+        """
+        A valid access token authenticates without touching the database.
+        """
+        self.get(self.tokens['access'])
+        with self.assertNumQueries(0):
+            response = self.get(self.tokens['access'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_tampered_and_expired_tokens_are_rejected(self):
+        """
+        A modified token and one older than the access lifetime both fail.
+        """
+        self.assertEqual(self.get(self.tokens['access'] + 'x').status_code, status.HTTP_401_UNAUTHORIZED)
+        with override_settings(SIGNED_TOKEN_ACCESS_LIFETIME=-1):
+            self.assertEqual(self.get(self.tokens['access']).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rotates_and_revoke_denies(self):
+        """
+        A refresh token works once, and revoked tokens stop working.
+        """
+        response = self.client.post(reverse('token-refresh'), {'refresh': self.tokens['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        renewed = response.data
+        response = self.client.post(reverse('token-refresh'), {'refresh': self.tokens['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.post(reverse('token-revoke'), {'refresh': renewed['refresh'], 'access': renewed['access']})
+        self.assertEqual(self.get(renewed['access']).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(reverse('token-refresh'), {'refresh': renewed['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(SIGNED_TOKEN_AUTH=False)
+    def test_disabled_by_default(self):
+        """
+        With the mode off the endpoint is absent and bearer tokens are ignored.
+        """
+        response = self.client.post(reverse('token-obtain'), {'username': 'reader', 'password': 'password123'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.get(self.tokens['access']).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class RegistrationTests(TestCase):
+    """
+    Tests for the sync and async registration endpoints.
+    """
+    payload = {'username': 'newcomer', 'email': 'new@example.com', 'password': 'password123', 'password2': 'password123'}
+
+    def assert_registered(self, response):
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user = CustomUser.objects.get(username='newcomer')
+        self.assertTrue(user.check_password('password123'))
+        self.assertEqual(Token.objects.filter(user=user).count(), 1)
+        self.assertEqual(response.json()['token'], user.auth_token.key)
+
+    def test_register_creates_one_token(self):
+        """
+        Registering creates the user and exactly one token, returned in the response.
+        """
+        self.assert_registered(self.client.post(reverse('register'), self.payload))
+
+    async def test_async_register(self):
+        """
+        The async endpoint hashes on the thread pool and returns the same response.
+        """
+        response = await self.async_client.post(reverse('register-async'), self.payload, content_type='application/json')
+        await sync_to_async(self.assert_registered)(response)
+
+        response = await self.async_client.post(reverse('register-async'), self.payload, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('username', response.json())
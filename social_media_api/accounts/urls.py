@@ -1,11 +1,19 @@
 # accounts/urls.py
 
 from django.urls import path
-from .views import RegisterView, LoginView, FollowUserView,UnfollowUserView
+from .views import RegisterView, register_async, LoginView, SignedTokenObtainView, SignedTokenRefreshView, SignedTokenRevokeView, FollowUserView,UnfollowUserView, UserProfileView, BulkFollowView, BulkUnfollowView, FollowSuggestionsView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
+    path('register/async/', register_async, name='register-async'),
     path('login/', LoginView.as_view(), name='login'),
+    path('token/', SignedTokenObtainView.as_view(), name='token-obtain'),
+    path('token/refresh/', SignedTokenRefreshView.as_view(), name='token-refresh'),
+    path('token/revoke/', SignedTokenRevokeView.as_view(), name='token-revoke'),
+    path('users/<int:pk>/', UserProfileView.as_view(), name='user-profile'),
+    path('suggestions/', FollowSuggestionsView.as_view(), name='follow-suggestions'),
+    path('follow/bulk/', BulkFollowView.as_view(), name='bulk-follow'),
+    path('unfollow/bulk/', BulkUnfollowView.as_view(), name='bulk-unfollow'),
     path('follow/<int:user_id>/', FollowUserView.as_view(), name='follow-user'),
     path('unfollow/<int:user_id>/', UnfollowUserView.as_view(), name='unfollow-user'),
 ]
\ No newline at end of file
@@ -1,15 +1,25 @@
 # accounts/views.py
 
+import json
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.views import APIView
 from rest_framework import generics, status, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
+from rest_framework.exceptions import AuthenticationFailed, NotFound
 from django.contrib.auth import get_user_model
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
-from .models import CustomUser
-from .serializers import UserRegistrationSerializer, UserSerializer, LoginSerializer
+from .models import CustomUser, FollowSuggestion
+from . import signed_tokens
+from .registration import ahash_password
+from .graph import follow, unfollow, follow_many, unfollow_many, following_ids
+from posts.timeline import backfill_timeline, backfill_timelines, recheck_fanout, trim_timeline, trim_timelines
+from notifications.queue import enqueue, enqueue_many
+from .serializers import UserRegistrationSerializer, UserSerializer, UserProfileSerializer, LoginSerializer, BulkFollowSerializer, FollowSuggestionSerializer, RefreshTokenSerializer
 
 # Note: serializers are imported here
 
@@ -28,9 +38,37 @@ class RegisterView(generics.CreateAPIView):
     serializer_class = UserRegistrationSerializer
     permission_classes = [permissions.AllowAny]
 
-    def perform_create(self, serializer):
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # The serializer creates the user and its (single) token together
         user = serializer.save()
-        Token.objects.create(user=user)
+        return Response({'token': user.auth_token.key, 'user': UserSerializer(user).data},
+                        status=status.HTTP_201_CREATED)
+
+
+@csrf_exempt
+async def register_async(request):
+    """
+    Async variant of RegisterView for signup bursts under ASGI.
+    The password is hashed on the accounts.registration thread pool while the
+    event loop keeps serving other requests; validation and the inserts run
+    through sync_to_async. Accepts the same JSON body and returns the same
+    response as register/.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'detail': 'JSON parse error.'}, status=400)
+
+    serializer = UserRegistrationSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=400)
+    password_hash = await ahash_password(serializer.validated_data['password'])
+    user = await sync_to_async(serializer.save)(password_hash=password_hash)
+    return JsonResponse({'token': user.auth_token.key, 'user': UserSerializer(user).data}, status=201)
 
 class LoginView(ObtainAuthToken):
     """
@@ -39,11 +77,84 @@ class LoginView(ObtainAuthToken):
     to handle username/password authentication and token retrieval.
     """
     def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        token = Token.objects.get(key=response.data['token'])
-        user = UserSerializer(token.user).data
-        return Response({'token': token.key, 'user': user})
-    
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        token, _ = Token.objects.get_or_create(user=user)
+        return Response({'token': token.key, 'user': UserSerializer(user).data})
+
+
+class SignedTokenObtainView(ObtainAuthToken):
+    """
+    API view for logging in with stateless signed tokens.
+    Returns a short-lived access token for the "Authorization: Bearer" header
+    and a refresh token to get new ones. Available when SIGNED_TOKEN_AUTH is on.
+    """
+    def post(self, request, *args, **kwargs):
+        if not signed_tokens.enabled():
+            raise NotFound()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        return Response({**signed_tokens.issue_tokens(user), 'user': UserSerializer(user).data})
+
+
+class SignedTokenRefreshView(generics.GenericAPIView):
+    """
+    API view that trades a refresh token for a new access/refresh pair.
+    The old refresh token is revoked, so each one can be used only once.
+    This is the one step that reads the user, so deactivated accounts stop
+    getting tokens.
+    """
+    serializer_class = RefreshTokenSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        if not signed_tokens.enabled():
+            raise NotFound()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        refresh = serializer.validated_data['refresh']
+        try:
+            claims = signed_tokens.read_refresh_token(refresh)
+        except signed_tokens.InvalidToken as exc:
+            raise AuthenticationFailed(str(exc))
+        user = User.objects.filter(pk=claims['u'], is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed('User inactive or deleted.')
+        signed_tokens.deny_refresh_token(refresh)
+        return Response(signed_tokens.issue_tokens(user))
+
+
+class SignedTokenRevokeView(generics.GenericAPIView):
+    """
+    API view for logging out of the signed-token mode. Puts the refresh token,
+    and the access token if given, on the deny-list.
+    """
+    serializer_class = RefreshTokenSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        if not signed_tokens.enabled():
+            raise NotFound()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        signed_tokens.deny_refresh_token(serializer.validated_data['refresh'])
+        if serializer.validated_data.get('access'):
+            signed_tokens.deny_access_token(serializer.validated_data['access'])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UserProfileView(generics.RetrieveAPIView):
+    """
+    API view for a user's profile.
+    Counts come from the stored counters and the "following" / "follows you"
+    flags from the cached follow graph, so the through table is not queried.
+    """
+    queryset = User.objects.all()
+    serializer_class = UserProfileSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
 
 class FollowUserView(generics.GenericAPIView):
     queryset =CustomUser.objects.all
@@ -58,7 +169,10 @@ class FollowUserView(generics.GenericAPIView):
         if request.user == user_to_follow:
             return Response({'error': 'You cannot follow yourself.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        request.user.following.add(user_to_follow)
+        if follow(request.user, user_to_follow):
+            backfill_timeline(request.user, user_to_follow)
+            recheck_fanout([user_to_follow.pk])
+            enqueue(recipient=user_to_follow, actor=request.user, verb='started following you', target=request.user)
         return Response({'message': f'You are now following {user_to_follow.username}.'}, status=status.HTTP_200_OK)
 
 class UnfollowUserView(generics.GenericAPIView):
@@ -74,5 +188,74 @@ class UnfollowUserView(generics.GenericAPIView):
         if request.user == user_to_unfollow:
             return Response({'error': 'You cannot unfollow yourself.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        request.user.following.remove(user_to_unfollow)
+        if unfollow(request.user, user_to_unfollow):
+            trim_timeline(request.user, user_to_unfollow)
+            recheck_fanout([user_to_unfollow.pk])
         return Response({'message': f'You have unfollowed {user_to_unfollow.username}.'}, status=status.HTTP_200_OK)
+
+
+class BulkFollowView(generics.GenericAPIView):
+    """
+    API view for following many users at once, e.g. during onboarding.
+    Accepts {"user_ids": [...]} and reports the outcome for every ID.
+    """
+    serializer_class = BulkFollowSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        outcomes = follow_many(request.user, serializer.validated_data['user_ids'])
+        followed = [pk for pk, outcome in outcomes.items() if outcome == 'followed']
+        if followed:
+            backfill_timelines(request.user, followed)
+            recheck_fanout(followed)
+            enqueue_many(followed, actor=request.user, verb='started following you', target=request.user)
+        return Response({'results': [{'user_id': pk, 'result': outcome} for pk, outcome in outcomes.items()]},
+                        status=status.HTTP_200_OK)
+
+
+class BulkUnfollowView(generics.GenericAPIView):
+    """
+    API view for unfollowing many users at once.
+    Accepts {"user_ids": [...]} and reports the outcome for every ID.
+    """
+    serializer_class = BulkFollowSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        outcomes = unfollow_many(request.user, serializer.validated_data['user_ids'])
+        unfollowed = [pk for pk, outcome in outcomes.items() if outcome == 'unfollowed']
+        if unfollowed:
+            trim_timelines(request.user, unfollowed)
+            recheck_fanout(unfollowed)
+        return Response({'results': [{'user_id': pk, 'result': outcome} for pk, outcome in outcomes.items()]},
+                        status=status.HTTP_200_OK)
+
+
+class FollowSuggestionsView(generics.GenericAPIView):
+    """
+    API view for "who to follow": accounts followed by the people you follow,
+    ranked by how many of them follow each one. Served from the table kept by
+    refresh_follow_suggestions; accounts followed since the last refresh are
+    dropped using the cached follow graph. Use ?limit= to change the size.
+    """
+    serializer_class = FollowSuggestionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    default_limit = 20
+
+    def get(self, request):
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', self.default_limit)), 100))
+        except ValueError:
+            limit = self.default_limit
+
+        followed = set(following_ids(request.user.pk))
+        suggestions = (
+            FollowSuggestion.objects.filter(user=request.user).select_related('candidate')
+            .order_by('-score', 'candidate')[:limit + len(followed)]
+        )
+        results = [s for s in suggestions if s.candidate_id not in followed][:limit]
+        return Response({'results': self.get_serializer(results, many=True).data})
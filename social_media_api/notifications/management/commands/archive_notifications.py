@@ -0,0 +1,43 @@
+import json
+import os
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from notifications.retention import archive_read_notifications, archive_to_table
+
+
+class Command(BaseCommand):
+    """
+    Archives read notifications older than the retention age and removes them
+    from the live table in bounded batches. By default rows go to the
+    ArchivedNotification table; --jsonl appends them to a file instead.
+    """
+    help = 'Archive and prune old read notifications.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help='Archive read notifications older than this many days '
+                                 '(default: NOTIFICATION_RETENTION_DAYS).')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows archived and deleted per transaction (default: 1000).')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to sleep between batches (default: 0).')
+        parser.add_argument('--jsonl', metavar='PATH',
+                            help='Append archived rows to this JSON Lines file instead of the archive table.')
+
+    def handle(self, *args, **options):
+        older_than = timedelta(days=options['days']) if options['days'] is not None else None
+        archive = dict(older_than=older_than, batch_size=options['batch_size'], pause=options['pause'])
+
+        if options['jsonl']:
+            with open(options['jsonl'], 'a', encoding='utf-8') as output:
+                def write_lines(rows):
+                    output.writelines(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows)
+                    # Make sure the copy is on disk before the batch is deleted
+                    output.flush()
+                    os.fsync(output.fileno())
+                total = archive_read_notifications(writer=write_lines, **archive)
+        else:
+            total = archive_read_notifications(writer=archive_to_table, **archive)
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} notifications.'))
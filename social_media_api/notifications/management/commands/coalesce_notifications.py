@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from notifications.models import Notification
+from notifications.queue import aggregation_window
+from notifications.unread import invalidate_unread
+
+
+class Command(BaseCommand):
+    """
+    Migration path for notifications written before aggregation existed.
+    Folds rows with the same recipient, verb, target and read state that lie
+    within the aggregation window of each other into the newest row of the
+    run, then deletes the rest. Each group is handled in its own transaction.
+    """
+    help = 'Merge historical per-event notifications into aggregated rows.'
+
+    def handle(self, *args, **options):
+        window = aggregation_window()
+        duplicated = (
+            Notification.objects.order_by()
+            .values('recipient', 'verb', 'content_type', 'object_id', 'read')
+            .annotate(rows=Count('id'))
+            .filter(rows__gt=1)
+        )
+
+        merged = 0
+        for key in duplicated.iterator():
+            key.pop('rows')
+            with transaction.atomic():
+                count = self.merge_group(Notification.objects.filter(**key), window)
+                if count and not key['read']:
+                    # Merged unread rows lower the recipient's unread count
+                    recipient_id = key['recipient']
+                    transaction.on_commit(lambda: invalidate_unread([recipient_id]))
+            merged += count
+        self.stdout.write(self.style.SUCCESS(f'Merged {merged} notifications.'))
+
+    def merge_group(self, queryset, window):
+        rows = list(queryset.select_related('actor').order_by('timestamp', 'id'))
+        survivor, absorbed, merged = rows[0], [], 0
+
+        for row in rows[1:]:
+            # Same sliding window as live delivery: measured from the last event folded in
+            if row.timestamp - survivor.timestamp > window:
+                merged += self.save_run(survivor, absorbed)
+                survivor, absorbed = row, []
+                continue
+            for actor in reversed(row.get_sample_actors()):
+                survivor.add_actor(actor['id'], actor['username'], row.timestamp)
+            absorbed.append(row.pk)
+        return merged + self.save_run(survivor, absorbed)
+
+    def save_run(self, survivor, absorbed):
+        if not absorbed:
+            return 0
+        survivor.save(update_fields=['actor', 'actor_count', 'sample_actors', 'timestamp'])
+        Notification.objects.filter(pk__in=absorbed).delete()
+        return len(absorbed)
@@ -0,0 +1,46 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from notifications.queue import deliver_pending
+from notifications.retention import archive_read_notifications
+
+
+class Command(BaseCommand):
+    """
+    Worker that drains the notification queue in batches.
+    Runs until interrupted, or drains once and exits with --once.
+    While idle it also archives old read notifications every
+    NOTIFICATION_ARCHIVE_INTERVAL seconds (0 disables it), one batch per
+    idle tick so a large backlog never holds up delivery. Large backlogs
+    are better cleared with the archive_notifications command.
+    """
+    help = 'Deliver queued notifications.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the queue once and exit.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Notifications written per bulk insert (default: 500).')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty (default: 1).')
+
+    def handle(self, *args, **options):
+        archive_interval = getattr(settings, 'NOTIFICATION_ARCHIVE_INTERVAL', 60 * 60)
+        next_archive = time.monotonic() + archive_interval
+        archiving = False
+        delivered = 0
+        while True:
+            count = deliver_pending(options['batch_size'])
+            delivered += count
+            if count:
+                continue
+            if options['once']:
+                break
+            if archive_interval and (archiving or time.monotonic() >= next_archive):
+                # Check the queue again between batches
+                archiving = archive_read_notifications(max_batches=1) > 0
+                if archiving:
+                    continue
+                next_archive = time.monotonic() + archive_interval
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Delivered {delivered} notifications.'))
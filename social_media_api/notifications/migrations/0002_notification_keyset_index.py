@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notifications', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # 0001 was generated before the generic relation fields were renamed
+        # on the model; bring the table in line with Notification first.
+        migrations.RenameField(
+            model_name='notification',
+            old_name='target_content_type',
+            new_name='content_type',
+        ),
+        migrations.RenameField(
+            model_name='notification',
+            old_name='target_object_id',
+            new_name='object_id',
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='content_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='object_id',
+            field=models.PositiveIntegerField(),
+        ),
+        migrations.AlterModelOptions(
+            name='notification',
+            options={'ordering': ['-timestamp']},
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-timestamp', '-id'], name='notif_recipient_recent_idx'),
+        ),
+    ]
@@ -2,14 +2,25 @@ from django.db import models
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.conf import settings
+from django.utils import timezone
 
 # Create your models here.
 
 class Notification(models.Model):
+    """
+    A notification for `recipient`. Events with the same recipient, verb and
+    target that arrive within NOTIFICATION_AGGREGATION_WINDOW are folded into
+    one row ("alice and 41 others liked your post"): `actor` is the latest
+    actor, `actor_count` the number of actors and `sample_actors` the few
+    most recent ones.
+    """
+    SAMPLE_SIZE = 3
+
     recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
     actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications_sent')
     verb = models.CharField(max_length=255)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set from the queued event so delayed delivery keeps the original time
+    timestamp = models.DateTimeField(default=timezone.now)
     read = models.BooleanField(default=False)
 
     # Generic Foreign Key to a Post, Comment, etc.
@@ -17,9 +28,83 @@ class Notification(models.Model):
     object_id = models.PositiveIntegerField()
     target = GenericForeignKey('content_type', 'object_id')
 
+    actor_count = models.PositiveIntegerField(default=1)
+    # Most recent distinct actors, newest first: [{"id": 1, "username": "alice"}, ...]
+    sample_actors = models.JSONField(default=list, blank=True)
+
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Back the keyset pagination on (timestamp, id) per recipient
+            models.Index(fields=['recipient', '-timestamp', '-id'], name='notif_recipient_recent_idx'),
+            # Find the open group for (recipient, target, verb) on delivery
+            models.Index(fields=['recipient', 'object_id', 'content_type', 'verb'], name='notif_group_idx'),
+            # Unread counts and mark-all-read
+            models.Index(fields=['recipient', 'read'], name='notif_recipient_read_idx'),
+            # Retention sweeps over read rows, oldest first by (timestamp, id)
+            models.Index(fields=['read', 'timestamp', 'id'], name='notif_read_age_id_idx'),
+        ]
+
+
+    def __str__(self):
+        return f"{self.actor.username} {self.verb}"
+
+    @property
+    def group_key(self):
+        return (self.recipient_id, self.verb, self.content_type_id, self.object_id)
+
+    def get_sample_actors(self):
+        # Rows created before aggregation only know their single actor
+        return self.sample_actors or [{'id': self.actor_id, 'username': self.actor.username}]
+
+    def add_actor(self, actor_id, username, timestamp):
+        """
+        Folds one more actor into this notification.
+        An actor already in the sample is not counted again; beyond the
+        sample the count is an upper bound, which is all the summary needs.
+        """
+        sample = self.get_sample_actors()
+        if not any(actor['id'] == actor_id for actor in sample):
+            self.actor_count += 1
+        sample = [{'id': actor_id, 'username': username}] + [actor for actor in sample if actor['id'] != actor_id]
+        self.sample_actors = sample[:self.SAMPLE_SIZE]
+        self.actor_id = actor_id
+        self.timestamp = max(self.timestamp, timestamp)
+
 
+class QueuedNotification(models.Model):
+    """
+    Outbox row for a notification that has not been delivered yet.
+    Request handlers only append here; the process_notifications worker turns
+    batches of rows into Notification objects with bulk_create. Plain integer
+    columns (no foreign keys, no secondary indexes) keep the append cheap.
+    """
+    recipient_id = models.BigIntegerField()
+    actor_id = models.BigIntegerField()
+    verb = models.CharField(max_length=255)
+    content_type_id = models.IntegerField()
+    object_id = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.actor_id} {self.verb} (queued)"
+
+
+class ArchivedNotification(models.Model):
+    """
+    Compact copy of a read notification moved out of the live table by the
+    archive_notifications command. Keeps the original id and integer
+    references only, so the archive has no foreign keys to maintain.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    recipient_id = models.BigIntegerField(db_index=True)
+    actor_id = models.BigIntegerField()
+    verb = models.CharField(max_length=255)
+    content_type_id = models.IntegerField()
+    object_id = models.PositiveIntegerField()
+    actor_count = models.PositiveIntegerField(default=1)
+    timestamp = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
-        return f"{self.actor.username} {self.verb}"
\ No newline at end of file
+        return f"{self.actor_id} {self.verb} (archived)"
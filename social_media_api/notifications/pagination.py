@@ -0,0 +1,10 @@
+# notifications/pagination.py
+
+from posts.pagination import KeysetPagination
+
+
+class NotificationPagination(KeysetPagination):
+    """
+    Keyset pagination for notifications, keyed on (timestamp, id).
+    """
+    ordering = ('-timestamp', '-id')
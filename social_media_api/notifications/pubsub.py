@@ -0,0 +1,214 @@
+# notifications/pubsub.py
+
+import asyncio
+import json
+import logging
+import threading
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+
+class InProcessBroker:
+    """
+    Publish/subscribe of notification events between code in one process.
+    Subscribers are asyncio queues living on the event loop of the streaming
+    view; publishers may run in any thread (sync views, the worker), so events
+    are handed over with call_soon_threadsafe. A slow subscriber whose queue
+    is full loses events rather than blocking the publisher.
+    """
+    queue_size = 100
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    @asynccontextmanager
+    async def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[user_id].add(entry)
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                self._subscribers[user_id].discard(entry)
+                if not self._subscribers[user_id]:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_id, event):
+        with self._lock:
+            targets = list(self._subscribers.get(user_id, ()))
+        for loop, queue in targets:
+            loop.call_soon_threadsafe(self._offer, queue, event)
+
+    @staticmethod
+    def _offer(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Bridges the in-process broker across processes through Redis pub/sub,
+    so events published by the notification worker reach streams served by
+    the web processes. Each event loop keeps one Redis connection subscribed
+    to the channels of the users it is streaming to, so a process only
+    receives the events of its own connected users.
+
+    A lost connection is retried with exponential backoff (retry_delay
+    doubling up to max_retry_delay seconds), after which the listener
+    subscribes to the current channels again. Events published in between
+    are not replayed; clients catch up from the notification list.
+    """
+    channel_prefix = 'notifications:'
+    retry_delay = 1
+    max_retry_delay = 30
+
+    def __init__(self, url=None):
+        super().__init__()
+        self.url = url or settings.REDIS_URL
+        self._client = None
+        self._listeners = {}
+
+    def channel(self, user_id):
+        return f'{self.channel_prefix}{user_id}'
+
+    def publish(self, user_id, event):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(self.channel(user_id), json.dumps(event))
+
+    @asynccontextmanager
+    async def subscribe(self, user_id):
+        loop = asyncio.get_running_loop()
+        listener = self._listeners.get(loop)
+        # The listener retries on its own; a done task means it was cancelled or crashed
+        if listener is None or listener.task.done():
+            listener = self._listeners[loop] = _RedisListener(self, loop)
+        async with super().subscribe(user_id) as queue:
+            await listener.add(user_id)
+            try:
+                yield queue
+            finally:
+                await listener.discard(user_id)
+
+    def connect(self):
+        import redis.asyncio
+        return redis.asyncio.Redis.from_url(self.url).pubsub(ignore_subscribe_messages=True)
+
+    def deliver(self, loop, user_id, event):
+        """
+        Hands an event from Redis to this loop's subscribers of the user.
+        Other loops of the process receive it through their own listener.
+        """
+        with self._lock:
+            targets = [queue for target_loop, queue in self._subscribers.get(user_id, ()) if target_loop is loop]
+        for queue in targets:
+            self._offer(queue, event)
+
+
+class _RedisListener:
+    """
+    The Redis subscription of one event loop, and the task reading from it.
+    """
+
+    def __init__(self, broker, loop):
+        self.broker = broker
+        self.loop = loop
+        self.users = Counter()
+        self.pubsub = None
+        self.changed = asyncio.Event()
+        self.task = loop.create_task(self.run())
+
+    async def add(self, user_id):
+        self.users[user_id] += 1
+        if self.users[user_id] == 1:
+            await self._send('subscribe', user_id)
+
+    async def discard(self, user_id):
+        self.users[user_id] -= 1
+        if self.users[user_id] <= 0:
+            del self.users[user_id]
+            await self._send('unsubscribe', user_id)
+
+    async def _send(self, command, user_id):
+        try:
+            if self.pubsub is not None:
+                await getattr(self.pubsub, command)(self.broker.channel(user_id))
+        except Exception:
+            # The listener re-subscribes from self.users once it reconnects
+            logger.debug('Could not %s to %s', command, self.broker.channel(user_id), exc_info=True)
+        finally:
+            self.changed.set()
+
+    async def run(self):
+        delay = self.broker.retry_delay
+        while True:
+            try:
+                self.pubsub = self.broker.connect()
+                if self.users:
+                    await self.pubsub.subscribe(*map(self.broker.channel, list(self.users)))
+                delay = self.broker.retry_delay
+                await self._read()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning('Lost the Redis notification channel, retrying in %ss', delay, exc_info=True)
+                await self._close()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.broker.max_retry_delay)
+
+    async def _read(self):
+        while True:
+            if not self.pubsub.subscribed:
+                # Nobody on this loop is streaming; wait for a subscriber
+                self.changed.clear()
+                await self.changed.wait()
+                continue
+            message = await self.pubsub.get_message(timeout=1.0)
+            if message is None or message['type'] != 'message':
+                continue
+            channel = message['channel']
+            channel = channel.decode() if isinstance(channel, bytes) else channel
+            user_id = int(channel.removeprefix(self.broker.channel_prefix))
+            self.broker.deliver(self.loop, user_id, json.loads(message['data']))
+
+    async def _close(self):
+        pubsub, self.pubsub = self.pubsub, None
+        if pubsub is not None:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+
+_broker = None
+
+
+def get_broker():
+    """
+    Returns the process-wide broker named by NOTIFICATION_BROKER.
+    """
+    global _broker
+    if _broker is None:
+        _broker = import_string(getattr(settings, 'NOTIFICATION_BROKER', 'notifications.pubsub.InProcessBroker'))()
+    return _broker
+
+
+def set_broker(broker):
+    """
+    Replaces the process-wide broker, e.g. with a stand-in in tests.
+    Returns the previous one so it can be restored.
+    """
+    global _broker
+    previous, _broker = _broker, broker
+    return previous
@@ -0,0 +1,145 @@
+# notifications/queue.py
+
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from .models import Notification, QueuedNotification
+from .pubsub import get_broker
+from .serializers import NotificationSerializer
+from .unread import invalidate_unread
+
+
+def aggregation_window():
+    """
+    Events for the same (recipient, verb, target) closer together than this
+    are folded into one notification.
+    """
+    return timedelta(seconds=getattr(settings, 'NOTIFICATION_AGGREGATION_WINDOW', 24 * 60 * 60))
+
+
+def enqueue(recipient, actor, verb, target):
+    """
+    Queues a notification for background delivery.
+    `recipient` and `actor` may be user instances or primary keys.
+    ContentType.get_for_model is served from Django's in-process cache,
+    so this costs a single narrow insert on the request path.
+    """
+    return QueuedNotification.objects.create(
+        recipient_id=getattr(recipient, 'pk', recipient),
+        actor_id=getattr(actor, 'pk', actor),
+        verb=verb,
+        content_type_id=ContentType.objects.get_for_model(target).pk,
+        object_id=target.pk,
+    )
+
+
+def enqueue_many(recipients, actor, verb, target):
+    """
+    Queues the same notification for several recipients with one bulk insert.
+    """
+    content_type_id = ContentType.objects.get_for_model(target).pk
+    return QueuedNotification.objects.bulk_create([
+        QueuedNotification(
+            recipient_id=getattr(recipient, 'pk', recipient),
+            actor_id=getattr(actor, 'pk', actor),
+            verb=verb,
+            content_type_id=content_type_id,
+            object_id=target.pk,
+        )
+        for recipient in recipients
+    ])
+
+
+def deliver_pending(batch_size=500):
+    """
+    Moves up to `batch_size` queued notifications into the Notification table.
+    Rows are claimed with SKIP LOCKED where the database supports it, so several
+    workers can drain the queue side by side. Events are folded into the open
+    (unread, recent) notification of their group when there is one; the rest
+    are written with a single bulk_create. Returns the number of events handled.
+    """
+    with transaction.atomic():
+        batch = list(
+            QueuedNotification.objects.select_for_update(skip_locked=True).order_by('id')[:batch_size]
+        )
+        if not batch:
+            return 0
+
+        window = aggregation_window()
+        usernames = dict(
+            get_user_model().objects.filter(pk__in={item.actor_id for item in batch}).values_list('id', 'username')
+        )
+        groups = _open_groups(batch, window)
+        created, updated = [], {}
+
+        for item in batch:
+            key = (item.recipient_id, item.verb, item.content_type_id, item.object_id)
+            username = usernames.get(item.actor_id, '')
+            group = groups.get(key)
+            if group is not None and item.created_at - group.timestamp <= window:
+                group.add_actor(item.actor_id, username, item.created_at)
+                if group.pk:
+                    updated[group.pk] = group
+                continue
+
+            group = Notification(
+                recipient_id=item.recipient_id,
+                actor_id=item.actor_id,
+                verb=item.verb,
+                content_type_id=item.content_type_id,
+                object_id=item.object_id,
+                timestamp=item.created_at,
+                sample_actors=[{'id': item.actor_id, 'username': username}],
+            )
+            groups[key] = group
+            created.append(group)
+
+        Notification.objects.bulk_create(created, batch_size=batch_size)
+        Notification.objects.bulk_update(
+            updated.values(), ['actor', 'actor_count', 'sample_actors', 'timestamp'], batch_size=batch_size
+        )
+        QueuedNotification.objects.filter(id__in=[item.id for item in batch]).delete()
+        # Folding into an open group leaves the unread count unchanged
+        transaction.on_commit(lambda: invalidate_unread(n.recipient_id for n in created))
+        # bulk_create only sets primary keys on backends that return them
+        changed_ids = [n.pk for n in created if n.pk] + list(updated)
+        transaction.on_commit(lambda: publish(changed_ids))
+    return len(batch)
+
+
+def publish(notification_ids):
+    """
+    Pushes the current state of these notifications to connected streams.
+    """
+    broker = get_broker()
+    notifications = Notification.objects.filter(pk__in=notification_ids).select_related('actor', 'content_type')
+    for notification in notifications:
+        broker.publish(notification.recipient_id, NotificationSerializer(notification).data)
+
+
+def _open_groups(batch, window):
+    """
+    Returns the latest unread notification for each group key in the batch
+    that is still inside the aggregation window.
+
+    The candidates are locked until the batch commits, so two workers
+    folding events into the same group take turns instead of overwriting
+    each other's actors, and a group marked read meanwhile drops out.
+    Locking in primary key order keeps workers from deadlocking.
+    """
+    keys = {(item.recipient_id, item.verb, item.content_type_id, item.object_id) for item in batch}
+    # Lock the notifications only, not their actors' user rows
+    of = ('self',) if connection.features.has_select_for_update_of else ()
+    candidates = Notification.objects.filter(
+        read=False,
+        timestamp__gte=min(item.created_at for item in batch) - window,
+        recipient_id__in={key[0] for key in keys},
+        object_id__in={key[3] for key in keys},
+    ).select_related('actor').select_for_update(of=of).order_by('id')
+    groups = {}
+    for n in sorted(candidates, key=lambda n: (n.timestamp, n.id)):
+        if n.group_key in keys:
+            groups[n.group_key] = n
+    return groups
@@ -0,0 +1,61 @@
+# notifications/retention.py
+
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Notification, ArchivedNotification
+
+
+ARCHIVED_FIELDS = ['id', 'recipient_id', 'actor_id', 'verb', 'content_type_id', 'object_id', 'actor_count', 'timestamp']
+
+
+def retention_age():
+    """
+    Read notifications older than this are moved out of the live table.
+    """
+    return timedelta(days=getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90))
+
+
+def archive_to_table(rows):
+    ArchivedNotification.objects.bulk_create(
+        [ArchivedNotification(**row) for row in rows], ignore_conflicts=True
+    )
+
+
+def archive_read_notifications(older_than=None, batch_size=1000, writer=archive_to_table, pause=0, max_batches=None):
+    """
+    Moves read notifications older than `older_than` out of the live table.
+
+    Works through the rows oldest first, `batch_size` at a time, following
+    the (read, timestamp, id) index. Each batch is copied with `writer` and
+    deleted by primary key in its own short transaction, so no single
+    statement locks a large part of the table. `pause` seconds between
+    batches leave room for regular traffic, and `max_batches` stops early so
+    a caller can interleave other work. Returns the number of notifications
+    archived.
+    """
+    cutoff = timezone.now() - (older_than or retention_age())
+    archived = batches = 0
+    after = Q()
+
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            rows = list(
+                Notification.objects.filter(after, read=True, timestamp__lt=cutoff)
+                .order_by('timestamp', 'id').values(*ARCHIVED_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+            writer(rows)
+            Notification.objects.filter(id__in=[row['id'] for row in rows]).delete()
+
+        archived += len(rows)
+        batches += 1
+        last = rows[-1]
+        after = Q(timestamp__gt=last['timestamp']) | Q(timestamp=last['timestamp'], id__gt=last['id'])
+        if pause:
+            time.sleep(pause)
+    return archived
@@ -1,44 +1,24 @@
-# posts/serializers.py
+# notifications/serializers.py
 
 from rest_framework import serializers
-from .models import Post, Comment, Like,Notification
-
-class LikeSerializer(serializers.ModelSerializer):
-    user = serializers.ReadOnlyField(source='user.username')
-    post = serializers.ReadOnlyField(source='post.id')
-
-    class Meta:
-        model = Like
-        fields = ['id', 'user', 'post', 'created_at']
-        read_only_fields = ['user', 'post', 'created_at']
-
-class CommentSerializer(serializers.ModelSerializer):
-    author = serializers.ReadOnlyField(source='author.username')
-
-    class Meta:
-        model = Comment
-        fields = ['id', 'author', 'post', 'content', 'created_at']
-        read_only_fields = ['author', 'post']
-
-class PostSerializer(serializers.ModelSerializer):
-    author = serializers.ReadOnlyField(source='author.username')
-    comments = CommentSerializer(many=True, read_only=True)
-    likes_count = serializers.SerializerMethodField()
-
-    class Meta:
-        model = Post
-        fields = ['id', 'author', 'title', 'content', 'created_at', 'comments', 'likes_count']
-        read_only_fields = ['author']
-
-    def get_likes_count(self, obj):
-        return obj.likes.count()
-    
+from .models import Notification
 
 class NotificationSerializer(serializers.ModelSerializer):
     actor = serializers.ReadOnlyField(source='actor.username')
     target_object_id = serializers.ReadOnlyField(source='object_id')
     target_type = serializers.ReadOnlyField(source='content_type.model')
+    sample_actors = serializers.ReadOnlyField(source='get_sample_actors')
+    summary = serializers.SerializerMethodField()
 
     class Meta:
         model = Notification
-        fields = ['id', 'recipient', 'actor', 'verb', 'timestamp', 'read', 'target_object_id', 'target_type']
\ No newline at end of file
+        fields = ['id', 'recipient', 'actor', 'verb', 'timestamp', 'read', 'target_object_id', 'target_type',
+                  'actor_count', 'sample_actors', 'summary']
+
+    def get_summary(self, obj):
+        # e.g. "alice and 41 others liked your post"
+        others = obj.actor_count - 1
+        if others <= 0:
+            return f"{obj.actor.username} {obj.verb}"
+        noun = 'other' if others == 1 else 'others'
+        return f"{obj.actor.username} and {others} {noun} {obj.verb}"
\ No newline at end of file
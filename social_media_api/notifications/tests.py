@@ -1,3 +1,346 @@
+# notifications/tests.py
+
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from datetime import timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from tokenauth.authentication import token_cache
+from accounts import signed_tokens
+from accounts.models import CustomUser
+from posts.models import Post
+from django.contrib.contenttypes.models import ContentType
+from .models import Notification, QueuedNotification, ArchivedNotification
+from .pubsub import InProcessBroker, RedisBroker, get_broker, set_broker
+from .retention import archive_read_notifications
+from .unread import unread_count
+from .views import _event_stream
+
+
+class NotificationQueueTests(APITestCase):
+    """
+    Tests for the queued notification pipeline.
+    """
+
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(username='author', password='password123')
+        self.post = Post.objects.create(author=self.author, title='Title', content='Content')
+        self.fans = [
+            CustomUser.objects.create_user(username=f'fan{i}', password='password123')
+            for i in range(5)
+        ]
+
+    def test_likes_are_queued_then_delivered(self):
+        """
+        Likes only enqueue; the worker writes the whole burst in one batch.
+        """
+        for fan in self.fans:
+            self.client.force_authenticate(fan)
+            self.client.post(reverse('like-post', kwargs={'pk': self.post.pk}))
+        self.assertEqual(Notification.objects.count(), 0)
+        self.assertEqual(QueuedNotification.objects.count(), 5)
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command('process_notifications', once=True, stdout=StringIO())
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT') and 'notifications_notification' in q['sql']]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(QueuedNotification.objects.count(), 0)
+        self.assertEqual(Notification.objects.filter(recipient=self.author, verb='liked your post').count(), 1)
+
+    def test_follow_and_comment_are_queued(self):
+        """
+        Follows and comments from other users also produce notifications.
+        """
+        self.client.force_authenticate(self.fans[0])
+        self.client.post(reverse('follow-user', kwargs={'user_id': self.author.id}))
+        self.client.post(reverse('follow-user', kwargs={'user_id': self.author.id}))
+        self.client.post(reverse('post-comments', kwargs={'pk': self.post.pk}), {'content': 'Nice'})
+
+        call_command('process_notifications', once=True, stdout=StringIO())
+        verbs = sorted(Notification.objects.filter(recipient=self.author).values_list('verb', flat=True))
+        self.assertEqual(verbs, ['commented on your post', 'started following you'])
+
+
+class NotificationAggregationTests(APITestCase):
+    """
+    Tests for folding notifications on the same target into one row.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.author = CustomUser.objects.create_user(username='author', password='password123')
+        self.post = Post.objects.create(author=self.author, title='Title', content='Content')
+        self.fans = [
+            CustomUser.objects.create_user(username=f'fan{i}', password='password123')
+            for i in range(5)
+        ]
+
+    def like_all(self):
+        for fan in self.fans:
+            self.client.force_authenticate(fan)
+            self.client.post(reverse('like-post', kwargs={'pk': self.post.pk}))
+        call_command('process_notifications', once=True, stdout=StringIO())
+
+    def test_likes_are_aggregated(self):
+        """
+        A burst of likes becomes one notification with a count and sample actors.
+        """
+        self.like_all()
+        notification = Notification.objects.get(recipient=self.author)
+        self.assertEqual(notification.actor_count, 5)
+        self.assertEqual([a['username'] for a in notification.sample_actors], ['fan4', 'fan3', 'fan2'])
+
+        self.client.force_authenticate(self.author)
+        response = self.client.get(reverse('notification-list'))
+        self.assertEqual(response.data['results'][0]['summary'], 'fan4 and 4 others liked your post')
+
+    def test_read_notification_starts_a_new_group(self):
+        """
+        Once the recipient has read a group, later events open a new one.
+        """
+        self.like_all()
+        Notification.objects.update(read=True)
+        self.client.force_authenticate(self.fans[0])
+        self.client.post(reverse('unlike-post', kwargs={'pk': self.post.pk}))
+        self.client.post(reverse('like-post', kwargs={'pk': self.post.pk}))
+        call_command('process_notifications', once=True, stdout=StringIO())
+        self.assertEqual(Notification.objects.filter(verb='liked your post', read=False).count(), 1)
+
+    def test_coalesce_existing_rows(self):
+        """
+        The coalesce command merges per-event rows written before aggregation.
+        """
+        content_type = ContentType.objects.get_for_model(Post)
+        for fan in self.fans:
+            Notification.objects.create(recipient=self.author, actor=fan, verb='liked your post',
+                                        content_type=content_type, object_id=self.post.pk)
+
+        self.assertEqual(unread_count(self.author.pk), 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('coalesce_notifications', stdout=StringIO())
+        notification = Notification.objects.get(recipient=self.author)
+        self.assertEqual(notification.actor_count, 5)
+        self.assertEqual(notification.actor, self.fans[-1])
+        self.assertEqual(unread_count(self.author.pk), 1)
+
+
+class UnreadCountTests(APITestCase):
+    """
+    Tests for the cached unread counter and mark-all-read.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.author = CustomUser.objects.create_user(username='author', password='password123')
+        self.fan = CustomUser.objects.create_user(username='fan', password='password123')
+        self.post = Post.objects.create(author=self.author, title='Title', content='Content')
+        self.client.force_authenticate(self.fan)
+        self.client.post(reverse('like-post', kwargs={'pk': self.post.pk}))
+        self.client.post(reverse('follow-user', kwargs={'user_id': self.author.id}))
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('process_notifications', once=True, stdout=StringIO())
+        self.client.force_authenticate(self.author)
+
+    def test_unread_count_is_cached(self):
+        """
+        The first poll counts, later polls are served from the cache.
+        """
+        url = reverse('notification-unread-count')
+        self.assertEqual(self.client.get(url).data['unread_count'], 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).data['unread_count'], 2)
+
+    def test_mark_all_read_resets_count(self):
+        """
+        Mark-all-read updates every unread row at once and invalidates the counter.
+        """
+        url = reverse('notification-unread-count')
+        self.client.get(url)
+        response = self.client.post(reverse('notification-mark-all-read'))
+        self.assertEqual(response.data['marked_read'], 2)
+        self.assertEqual(self.client.get(url).data['unread_count'], 0)
+
+
+class NotificationStreamTests(TestCase):
+    """
+    Tests for the Server-Sent Events stream, using a fresh in-process broker.
+    """
+
+    def setUp(self):
+        self.previous_broker = set_broker(InProcessBroker())
+        self.user = CustomUser.objects.create_user(username='author', password='password123')
+        self.token = Token.objects.create(user=self.user)
+
+    def tearDown(self):
+        set_broker(self.previous_broker)
+
+    async def test_stream_requires_token(self):
+        response = await self.async_client.get(reverse('notification-stream'))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_stream_opens_for_token(self):
+        response = await self.async_client.get(
+            reverse('notification-stream'), headers={'Authorization': f'Token {self.token.key}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+    async def test_stream_uses_the_api_authentication(self):
+        """
+        Tokens go through the cached token authentication, and signed
+        access tokens are accepted until they are revoked.
+        """
+        token_cache.clear()
+        await self.async_client.get(reverse('notification-stream'), headers={'Authorization': f'Token {self.token.key}'})
+        self.assertIsNotNone(token_cache.get(self.token.key))
+
+        with self.settings(SIGNED_TOKEN_AUTH=True):
+            access = signed_tokens.issue_tokens(self.user)['access']
+            response = await self.async_client.get(
+                reverse('notification-stream'), headers={'Authorization': f'Bearer {access}'}
+            )
+            self.assertEqual(response.status_code, 200)
+            await sync_to_async(signed_tokens.deny_access_token)(access)
+            response = await self.async_client.get(
+                reverse('notification-stream'), headers={'Authorization': f'Bearer {access}'}
+            )
+            self.assertEqual(response.status_code, 401)
+
+    async def test_stream_pushes_published_events(self):
+        """
+        Events published for the user arrive on an open stream.
+        """
+        stream = _event_stream(self.user.pk)
+        self.assertEqual(await anext(stream), 'retry: 5000\n\n')
+
+        get_broker().publish(self.user.pk, {'id': 7, 'summary': 'fan liked your post'})
+        chunk = await asyncio.wait_for(anext(stream), timeout=2)
+        self.assertTrue(chunk.startswith('id: 7\nevent: notification\n'))
+        await stream.aclose()
+
+
+class FakePubSub:
+    """
+    Stands in for a redis.asyncio PubSub connection; `broken` makes reads fail.
+    """
+
+    def __init__(self):
+        self.channels = set()
+        self.messages = asyncio.Queue()
+        self.broken = False
+
+    @property
+    def subscribed(self):
+        return bool(self.channels)
+
+    async def subscribe(self, *channels):
+        self.channels.update(channels)
+
+    async def unsubscribe(self, *channels):
+        self.channels.difference_update(channels)
+
+    async def get_message(self, timeout):
+        if self.broken:
+            raise ConnectionError('Connection closed by server.')
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        pass
+
+    def send(self, user_id, event):
+        self.messages.put_nowait({'type': 'message', 'channel': f'notifications:{user_id}'.encode(),
+                                  'data': json.dumps(event)})
+
+
+class RedisBrokerTests(TestCase):
+    """
+    Tests for the Redis listener, against fake connections.
+    """
+
+    async def wait_for(self, condition):
+        for _ in range(200):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+        self.fail('condition not met')
+
+    async def test_listener_subscribes_per_user_and_reconnects(self):
+        connections = []
+
+        class Broker(RedisBroker):
+            retry_delay = 0.01
+
+            def connect(self):
+                connections.append(FakePubSub())
+                return connections[-1]
+
+        broker = Broker(url='redis://localhost')
+        async with broker.subscribe(7) as queue:
+            await self.wait_for(lambda: connections and connections[0].channels == {'notifications:7'})
+            async with broker.subscribe(8):
+                self.assertEqual(connections[0].channels, {'notifications:7', 'notifications:8'})
+            self.assertEqual(connections[0].channels, {'notifications:7'})
+
+            connections[0].send(7, {'id': 1})
+            self.assertEqual(await asyncio.wait_for(queue.get(), timeout=2), {'id': 1})
+
+            # The connection drops: a new one is opened with the same channels
+            with self.assertLogs('notifications.pubsub', 'WARNING'):
+                connections[0].broken = True
+                connections[0].messages.put_nowait({'type': 'subscribe'})
+                await self.wait_for(lambda: len(connections) == 2 and connections[1].channels == {'notifications:7'})
+            connections[1].send(7, {'id': 2})
+            self.assertEqual(await asyncio.wait_for(queue.get(), timeout=2), {'id': 2})
+
+        listener = broker._listeners[asyncio.get_running_loop()]
+        self.assertEqual(connections[1].channels, set())
+        listener.task.cancel()
+
+
+class NotificationArchiveTests(APITestCase):
+    """
+    Tests for archiving old read notifications.
+    """
+
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(username='author', password='password123')
+        self.fan = CustomUser.objects.create_user(username='fan', password='password123')
+        content_type = ContentType.objects.get_for_model(CustomUser)
+        old = timezone.now() - timedelta(days=200)
+        for read, timestamp in [(True, old), (True, old), (False, old), (True, timezone.now())]:
+            Notification.objects.create(recipient=self.author, actor=self.fan, verb='started following you',
+                                        content_type=content_type, object_id=self.fan.pk,
+                                        read=read, timestamp=timestamp)
+
+    def test_only_old_read_notifications_are_archived(self):
+        """
+        Old read rows move to the archive in batches; unread and recent rows stay.
+        """
+        call_command('archive_notifications', batch_size=1, stdout=StringIO())
+        self.assertEqual(ArchivedNotification.objects.count(), 2)
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertFalse(Notification.objects.filter(read=True, timestamp__lt=timezone.now() - timedelta(days=90)).exists())
 
-# Create your tests here.
+    def test_archive_stops_after_max_batches(self):
+        """
+        The worker archives one bounded batch at a time; rows sharing a
+        timestamp are neither skipped nor archived twice.
+        """
+        self.assertEqual(archive_read_notifications(batch_size=1, max_batches=1), 1)
+        self.assertEqual(ArchivedNotification.objects.count(), 1)
+        self.assertEqual(archive_read_notifications(batch_size=1), 1)
+        self.assertEqual(archive_read_notifications(batch_size=1), 0)
+        self.assertEqual(ArchivedNotification.objects.count(), 2)
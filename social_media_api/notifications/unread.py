@@ -0,0 +1,38 @@
+# notifications/unread.py
+
+from django.conf import settings
+from django.core.cache import cache
+from .models import Notification
+
+
+def cache_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def unread_count(user_id):
+    """
+    Returns the user's unread notification count, computing and caching it on a miss.
+    """
+    key = cache_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(recipient_id=user_id, read=False).count()
+        cache.set(key, count, getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TIMEOUT', 300))
+    return count
+
+
+def invalidate_unread(user_ids):
+    """
+    Drops the cached counters of these users. Deleting instead of adjusting
+    the value means a racing writer can only cause one extra recount.
+    """
+    cache.delete_many([cache_key(user_id) for user_id in set(user_ids)])
+
+
+def mark_all_read(user_id):
+    """
+    Marks every unread notification of the user as read with a single UPDATE.
+    """
+    updated = Notification.objects.filter(recipient_id=user_id, read=False).update(read=True)
+    invalidate_unread([user_id])
+    return updated
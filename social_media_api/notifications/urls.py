@@ -1,8 +1,11 @@
 # notifications/urls.py
 
 from django.urls import path
-from .views import NotificationListView
+from .views import NotificationListView, UnreadCountView, MarkAllReadView, notification_stream
 
 urlpatterns = [
     path('', NotificationListView.as_view(), name='notification-list'),
+    path('unread_count/', UnreadCountView.as_view(), name='notification-unread-count'),
+    path('mark_all_read/', MarkAllReadView.as_view(), name='notification-mark-all-read'),
+    path('stream/', notification_stream, name='notification-stream'),
 ]
\ No newline at end of file
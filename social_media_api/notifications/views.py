@@ -1,9 +1,20 @@
 # notifications/views.py
 
-from rest_framework import generics
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import exceptions, generics, status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from .models import Notification
 from .serializers import NotificationSerializer
+from .pagination import NotificationPagination
+from .unread import unread_count, mark_all_read
+from .pubsub import get_broker
 
 class NotificationListView(generics.ListAPIView):
     """
@@ -11,7 +22,80 @@ class NotificationListView(generics.ListAPIView):
     """
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = NotificationPagination
 
     def get_queryset(self):
         # Return notifications for the current user, ordered by timestamp
-        return Notification.objects.filter(recipient=self.request.user).order_by('-timestamp')
\ No newline at end of file
+        return Notification.objects.filter(recipient=self.request.user).select_related('actor', 'content_type').order_by('-timestamp', '-id')
+
+
+class UnreadCountView(generics.GenericAPIView):
+    """
+    API view returning only the number of unread notifications.
+    Served from a per-user cached counter so clients can poll it cheaply.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({'unread_count': unread_count(request.user.pk)}, status=status.HTTP_200_OK)
+
+
+class MarkAllReadView(generics.GenericAPIView):
+    """
+    API view marking all notifications of the authenticated user as read.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        updated = mark_all_read(request.user.pk)
+        return Response({'marked_read': updated}, status=status.HTTP_200_OK)
+
+
+async def notification_stream(request):
+    """
+    Server-Sent Events stream of new and updated notifications for the
+    authenticated user. This is a native async view: under ASGI an idle
+    client costs a suspended coroutine, not a worker thread.
+    Authenticates with the same Authorization headers as the API.
+    """
+    user = await _authenticate(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    response = StreamingHttpResponse(_event_stream(user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop proxies such as nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _authenticate(request):
+    return await sync_to_async(_authenticate_sync)(request)
+
+
+def _authenticate_sync(request):
+    """
+    Runs the API's DEFAULT_AUTHENTICATION_CLASSES, so the stream accepts the
+    same credentials as every other endpoint and goes through the same
+    token cache and signed-token deny-list.
+    """
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        user = drf_request.user
+    except exceptions.APIException:
+        return None
+    return user if user.is_authenticated else None
+
+
+async def _event_stream(user_id):
+    keepalive = getattr(settings, 'NOTIFICATION_STREAM_KEEPALIVE', 15)
+    async with get_broker().subscribe(user_id) as events:
+        # Subscribed before the first byte, so nothing published after it is missed
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(events.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield f"id: {event['id']}\nevent: notification\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,54 @@
+# posts/likes.py
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Post, Like
+
+
+def _insert_like_sql():
+    """
+    Builds an INSERT ... SELECT that adds the like only if the post exists
+    and the (user, post) pair is not taken yet, so the cursor's rowcount
+    tells whether this request created the like.
+    """
+    like = Like._meta.db_table
+    post = Post._meta.db_table
+    select = f'SELECT %s, {post}.id, %s FROM {post} WHERE {post}.id = %s'
+    columns = f'{like} (user_id, post_id, created_at)'
+    if connection.vendor == 'postgresql':
+        return f'INSERT INTO {columns} {select} ON CONFLICT (user_id, post_id) DO NOTHING'
+    if connection.vendor == 'mysql':
+        return f'INSERT IGNORE INTO {columns} {select}'
+    # SQLite: OR IGNORE also works on versions that predate ON CONFLICT upserts
+    return f'INSERT OR IGNORE INTO {columns} {select}'
+
+
+def like_post(user, post_id):
+    """
+    Records that the user likes the post and bumps its counter.
+    Returns True when a new like was created and False when it already existed.
+    Concurrent double-taps are settled by the unique (user, post) constraint
+    in a single statement instead of a get-then-insert race.
+    """
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(_insert_like_sql(), [getattr(user, 'pk', user), now, post_id])
+            created = cursor.rowcount == 1
+        if created:
+            Post.objects.filter(pk=post_id).update(like_count=F('like_count') + 1)
+    return created
+
+
+def unlike_post(user, post_id):
+    """
+    Removes the user's like from the post and lowers its counter.
+    Returns True when a like was deleted. The filtered delete runs as one
+    DELETE statement, so two concurrent unlikes decrement the counter once.
+    """
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(user=user, post_id=post_id).delete()
+        if deleted:
+            Post.objects.filter(pk=post_id, like_count__gt=0).update(like_count=F('like_count') - 1)
+    return bool(deleted)
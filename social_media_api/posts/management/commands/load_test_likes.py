@@ -0,0 +1,89 @@
+import random
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import Count, F
+from accounts.models import CustomUser
+from posts.likes import like_post, unlike_post
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    """
+    Hammers the like/unlike write path from several threads at once against
+    a handful of hot posts, then checks that every post's like_count still
+    matches its Like rows. Reports throughput and how many writes lost a
+    race (an already-liked like or an already-removed unlike).
+
+    Each thread uses its own database connection, so run it against a
+    file or server database rather than an in-memory SQLite one. The rows it
+    creates are prefixed with --prefix and removed at the end.
+    """
+    help = 'Concurrent load test of liking and unliking posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--operations', type=int, default=500,
+                            help='Like/unlike calls per thread (default: 500).')
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=3)
+        parser.add_argument('--prefix', default='likeload')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in ('', ':memory:'):
+            raise CommandError('An in-memory SQLite database is not shared between threads.')
+        prefix = options['prefix']
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'{prefix}-{i}') for i in range(options['users'])
+        ])
+        users = list(CustomUser.objects.filter(username__startswith=f'{prefix}-').values_list('pk', flat=True))
+        posts = [
+            Post.objects.create(author_id=users[0], title=f'{prefix} {i}', content='load test').pk
+            for i in range(options['posts'])
+        ]
+
+        outcomes = {'applied': 0, 'raced': 0, 'failed': 0}
+        lock = threading.Lock()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            counts = dict.fromkeys(outcomes, 0)
+            try:
+                for _ in range(options['operations']):
+                    write = like_post if rng.random() < 0.6 else unlike_post
+                    try:
+                        changed = write(rng.choice(users), rng.choice(posts))
+                    except OperationalError:
+                        # e.g. SQLite's "database is locked" once its busy timeout runs out
+                        counts['failed'] += 1
+                    else:
+                        counts['applied' if changed else 'raced'] += 1
+            finally:
+                connections.close_all()
+            with lock:
+                for key, value in counts.items():
+                    outcomes[key] += value
+
+        threads = [threading.Thread(target=worker, args=(options['seed'] + i,)) for i in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        total = sum(outcomes.values())
+        self.stdout.write(f'{total} writes from {len(threads)} threads in {elapsed:.2f}s '
+                          f'({total / elapsed:.0f}/s): {outcomes["applied"]} applied, '
+                          f'{outcomes["raced"]} no-ops, {outcomes["failed"]} failed')
+
+        drifted = Post.objects.filter(pk__in=posts).annotate(likes_total=Count('likes')).exclude(
+            like_count=F('likes_total')
+        ).count()
+        Post.objects.filter(pk__in=posts).delete()
+        CustomUser.objects.filter(pk__in=users).delete()
+        if drifted:
+            raise CommandError(f'{drifted} posts have a like_count that does not match their likes.')
+        self.stdout.write(self.style.SUCCESS('All like counters match.'))
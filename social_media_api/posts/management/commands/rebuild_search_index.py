@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from posts.search import rebuild_index, search_backend
+
+
+class Command(BaseCommand):
+    """
+    Refills the SQLite full-text table from the posts table. Signals keep it
+    current for saves and deletes through the ORM; run this after bulk
+    changes made with QuerySet.update() or raw SQL. On PostgreSQL the index
+    is a generated column and never needs rebuilding.
+    """
+    help = 'Rebuild the full-text search index for posts.'
+
+    def handle(self, *args, **options):
+        if search_backend() != 'sqlite':
+            self.stdout.write('Nothing to rebuild on this database.')
+            return
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Rebuilt the post search index.'))
@@ -0,0 +1,49 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from posts.timeline import backfill_pulled_authors, rebuild_timeline, reset_pulled_authors
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the materialized home timelines from the follow graph.
+    Use it to backfill existing data, or to repair timelines after follower
+    counts changed outside the follow views: a full rebuild first re-derives
+    which authors are pulled on read from FEED_FANOUT_MAX_FOLLOWERS.
+
+    --pending only returns the authors that unfollows took back under the
+    limit to fan-out, copying their latest posts into their followers'
+    timelines (see posts.timeline.recheck_fanout). Run it from cron or with
+    --interval as a worker.
+    """
+    help = 'Rebuild the precomputed home feed timelines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only rebuild the timeline of this user id (repeatable).')
+        parser.add_argument('--pending', action='store_true',
+                            help='Only backfill the authors marked for a return to fan-out.')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='With --pending, keep running and poll for marked authors every N seconds.')
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            moved = 0
+            while True:
+                moved += backfill_pulled_authors()
+                if not options['interval']:
+                    break
+                time.sleep(options['interval'])
+            self.stdout.write(self.style.SUCCESS(f'Returned {moved} authors to fan-out.'))
+            return
+
+        users = get_user_model().objects.order_by('id')
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+        else:
+            reset_pulled_authors()
+
+        total = 0
+        for user in users.iterator():
+            total += rebuild_timeline(user)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt timelines with {total} entries.'))
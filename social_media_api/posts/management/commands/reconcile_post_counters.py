@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from posts.models import Comment, Like, Post
+
+
+def total(model):
+    rows = model.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(rows), 0)
+
+
+class Command(BaseCommand):
+    """
+    Recomputes Post.like_count and Post.comment_count from the Like and
+    Comment tables and writes back only the rows that have drifted.
+    Posts are walked in primary key order in fixed-size ranges so the
+    command never holds a long lock on the posts table.
+
+    Each range is fixed with one UPDATE whose correlated subqueries count
+    the rows as the statement runs, the same way migration 0006 filled the
+    counters. Counting in the database instead of reading the totals and
+    writing them back means a like landing mid-run is not overwritten, and
+    counting likes and comments separately avoids joining one against the other.
+    """
+    help = 'Repair drifted like/comment counters on posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of posts to check per batch (default: 1000).')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        checked = fixed = 0
+
+        while True:
+            ids = list(Post.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+
+            likes, comments = total(Like), total(Comment)
+            fixed += (
+                Post.objects.filter(pk__gt=last_id, pk__lte=ids[-1])
+                .exclude(like_count=likes, comment_count=comments)
+                .update(like_count=likes, comment_count=comments)
+            )
+            checked += len(ids)
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} posts, fixed {fixed}.'))
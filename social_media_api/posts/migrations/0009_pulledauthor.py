@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 22:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def pull_popular_authors(apps, schema_editor):
+    # Authors already over the limit were pulled on read by follower count
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    PulledAuthor = apps.get_model('posts', 'PulledAuthor')
+    limit = getattr(settings, 'FEED_FANOUT_MAX_FOLLOWERS', 5000)
+    PulledAuthor.objects.bulk_create(
+        [PulledAuthor(author_id=pk) for pk in User.objects.filter(followers_count__gt=limit).values_list('pk', flat=True)]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_tokenuser'),
+        ('posts', '0008_post_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PulledAuthor',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='feed_pull', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('backfill_pending', models.BooleanField(default=False)),
+                ('marked_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(pull_popular_authors, migrations.RunPython.noop),
+    ]
@@ -1,19 +1,52 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 User = settings.AUTH_USER_MODEL
 # Create your models here.
 
+def comment_preview_size():
+    """
+    Number of latest comments embedded in each serialized post.
+    """
+    return getattr(settings, 'POST_COMMENT_PREVIEW_SIZE', 3)
+
+
+class PostQuerySet(models.QuerySet):
+    def with_related(self):
+        """
+        Loads everything PostSerializer reads in a fixed number of queries:
+        the author through a join and the latest comments (with their
+        authors) in one windowed prefetch stored on `comment_preview`.
+        Like and comment totals are stored on the post itself.
+        """
+        latest_comments = Comment.objects.select_related('author').order_by('-created_at', '-id')
+        return self.select_related('author').prefetch_related(
+            models.Prefetch('comments', queryset=latest_comments[:comment_preview_size()], to_attr='comment_preview'),
+        )
+
+
 class Post(models.Model):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     title = models.CharField(max_length=100)
     content = models.TextField()
     created_at = models.DateField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters, kept in step with F() updates in the views and
+    # repaired by the reconcile_post_counters management command
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Back the keyset pagination on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='post_recent_idx'),
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.author.username}: {self.content[:30]}"
@@ -30,6 +63,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Serves both the per-post preview and the paginated thread
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_post_thread_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author} on {self.post}"
@@ -48,4 +85,60 @@ class Like(models.Model):
 
     def __str__(self):
         #return f"{self.user.username} likes {self.post.id}"
-        return f"{self.user} likes the post {self.post.title}"  
\ No newline at end of file
+        return f"{self.user} likes the post {self.post.title}"
+
+
+class TimelineEntry(models.Model):
+    """
+    A precomputed row of a user's home feed.
+    Filled when a followed author publishes (fan-out-on-write) so the feed
+    can be read as a single range scan over (user, created_at, post).
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    # Copied from the post so unfollow can trim by author without a join
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateField()
+
+    class Meta:
+        unique_together = ('user', 'post')
+        ordering = ['-created_at', '-post']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'], name='timeline_user_recent_idx'),
+            models.Index(fields=['user', 'author'], name='timeline_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} in timeline of {self.user_id}"
+
+
+class PulledAuthor(models.Model):
+    """
+    An author whose posts are pulled into feeds at read time instead of
+    being fanned out into follower timelines (see posts.timeline).
+    `backfill_pending` marks one whose follower count has dropped back
+    under the limit: they stay pulled until the backfill worker has copied
+    their latest posts into their followers' timelines and removed the row.
+    """
+    author = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='feed_pull')
+    backfill_pending = models.BooleanField(default=False)
+    marked_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.author_id} (pulled{', backfill pending' if self.backfill_pending else ''})"
+
+
+class PostSearchIndex(models.Model):
+    """
+    The SQLite FTS5 table used by posts.search (created by migration 0008,
+    not by Django). Only declared so querysets can join it; rows are written
+    with raw SQL by posts.search.index_post.
+    """
+    post = models.OneToOneField(Post, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+                                db_constraint=False, related_name='search_index')
+    title = models.TextField()
+    content = models.TextField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_fts'
@@ -0,0 +1,177 @@
+# posts/pagination.py
+
+import base64
+import json
+from collections import OrderedDict
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opaque-cursor (keyset) pagination over a composite ordering such as
+    (created_at, id). Each page is fetched with a WHERE on the last seen key
+    instead of an OFFSET, so deep pages cost the same as the first one and
+    new rows do not shift the page boundaries.
+
+    All fields in `ordering` must sort in the same direction and the last one
+    must be unique (usually the primary key). Fields compared in the cursor
+    must round-trip exactly: order by a fixed-precision decimal rather than
+    a float (see posts.search).
+    """
+    ordering = ('-created_at', '-id')
+    page_size = api_settings.PAGE_SIZE or 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, request, queryset, view=None):
+        return self.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            position = self.parse_position(position, queryset)
+            queryset = queryset.filter(self.get_seek_filter(position))
+
+        # Fetch one extra row to find out whether there is a next page
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        self.page = results[:page_size]
+        self.next_position = self.get_position(self.page[-1]) if self.has_next else None
+        return self.page
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_fields(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def get_position(self, instance):
+        """
+        Returns the sort key of `instance` as JSON-safe values. Decimals are
+        written as strings so the cursor carries them exactly.
+        """
+        values = []
+        for field in self.get_fields():
+            value = getattr(instance, field)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = str(value)
+            values.append(value)
+        return values
+
+    def parse_position(self, position, queryset):
+        """
+        Converts the values of a decoded cursor back to the types of the
+        ordering fields, so the seek filter compares them exactly (a rank
+        that went through a JSON float would not). A value that does not
+        convert is an invalid cursor.
+        """
+        values = []
+        for field, value in zip(self.get_fields(), position):
+            if field in queryset.query.annotations:
+                output_field = queryset.query.annotations[field].output_field
+            else:
+                output_field = queryset.model._meta.get_field(queryset.model._meta.pk.name if field == 'pk' else field)
+            try:
+                values.append(output_field.to_python(value))
+            except (ValidationError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_seek_filter(self, position):
+        """
+        Builds (a < x) OR (a = x AND b < y) ... for the last seen key.
+        """
+        lookup = 'lt' if self.ordering[0].startswith('-') else 'gt'
+        fields = self.get_fields()
+        condition = Q()
+        for index, field in enumerate(fields):
+            equal = {name: position[i] for i, name in enumerate(fields[:index])}
+            condition |= Q(**equal, **{f'{field}__{lookup}': position[index]})
+        return condition
+
+    def encode_cursor(self, position):
+        raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class PostPagination(KeysetPagination):
+    """
+    Keyset pagination for the post list. Search results (annotated with
+    search_rank by posts.search.PostSearchFilter) are paged by relevance.
+    """
+    def get_ordering(self, request, queryset, view=None):
+        if 'search_rank' in queryset.query.annotations:
+            return ('-search_rank', '-id')
+        return self.ordering
+
+
+class FeedPagination(KeysetPagination):
+    """
+    Keyset pagination for the home feed, keyed on the feed_created_at / feed_id
+    annotations added by posts.timeline.feed_queryset.
+    """
+    ordering = ('-feed_created_at', '-feed_id')
+
+
+class CommentPagination(KeysetPagination):
+    """
+    Keyset pagination for a comment thread, oldest first.
+    """
+    ordering = ('created_at', 'id')
@@ -0,0 +1,148 @@
+# posts/search.py
+
+import re
+from django.db import connection
+from decimal import Decimal
+from django.db.models import BooleanField, DecimalField, FloatField, Func, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+from rest_framework.filters import BaseFilterBackend
+
+
+FTS_TABLE = 'posts_post_fts'
+SEARCH_CONFIG = 'english'
+
+# Title matches weigh more than content matches in both backends
+TITLE_WEIGHT = 2.0
+CONTENT_WEIGHT = 1.0
+
+# Decimal places kept of search_rank. The rank is a pagination cursor key,
+# so it must survive the cursor unchanged (see posts.pagination). bm25()
+# scores of common words are floored at about 1e-6, hence more than six.
+RANK_PLACES = 9
+
+
+def search_backend():
+    """
+    Returns 'postgresql' or 'sqlite' when the database has a full-text index
+    for posts (see migration 0008), otherwise None.
+    """
+    return connection.vendor if connection.vendor in ('postgresql', 'sqlite') else None
+
+
+def fts5_query(text):
+    """
+    Turns free text into an FTS5 query matching every word, quoting each one
+    so that FTS5 operators in user input are taken literally.
+    """
+    return ' AND '.join(f'"{word}"' for word in re.findall(r'\w+', text))
+
+
+def rounded_rank(expression):
+    """
+    Rounds a floating point relevance score to a RANK_PLACES decimal, which
+    compares exactly against the same value read back from a cursor.
+    """
+    field = DecimalField(max_digits=18, decimal_places=RANK_PLACES)
+    return Func(Cast(expression, field), Value(RANK_PLACES), function='ROUND', output_field=field)
+
+
+def search_posts(queryset, text):
+    """
+    Restricts a Post queryset to posts matching `text` and annotates each
+    with `search_rank` (higher is more relevant), a decimal rounded to
+    RANK_PLACES places.
+
+    PostgreSQL matches against the generated, GIN-indexed search_vector
+    column; SQLite joins the FTS5 table kept in step by index_post. Other
+    databases fall back to substring matching without ranking.
+    """
+    backend = search_backend()
+    if backend == 'postgresql':
+        tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        return queryset.alias(
+            search_match=RawSQL(f'"posts_post"."search_vector" @@ {tsquery}', [text], output_field=BooleanField()),
+        ).filter(search_match=True).annotate(
+            search_rank=rounded_rank(
+                RawSQL(f'ts_rank("posts_post"."search_vector", {tsquery})', [text], output_field=FloatField())
+            ),
+        )
+
+    if backend == 'sqlite':
+        query = fts5_query(text)
+        if not query:
+            return queryset.none()
+        # The join to the FTS table comes from the search_index relation;
+        # bm25() is lower for better matches, so it is negated.
+        return queryset.filter(search_index__isnull=False).alias(
+            search_match=RawSQL(f'"{FTS_TABLE}" MATCH %s', [query], output_field=BooleanField()),
+        ).filter(search_match=True).annotate(
+            search_rank=rounded_rank(
+                RawSQL(f'-bm25("{FTS_TABLE}", {TITLE_WEIGHT}, {CONTENT_WEIGHT})', [], output_field=FloatField())
+            ),
+        )
+
+    return queryset.filter(Q(title__icontains=text) | Q(content__icontains=text)).annotate(
+        search_rank=Value(Decimal(0), output_field=DecimalField(max_digits=18, decimal_places=RANK_PLACES)),
+    )
+
+
+def index_post(post):
+    """
+    Writes the post into the SQLite FTS5 table. PostgreSQL needs nothing:
+    its search_vector is a generated column.
+    """
+    if search_backend() != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}" WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO "{FTS_TABLE}" (rowid, title, content) VALUES (%s, %s, %s)',
+            [post.pk, post.title, post.content],
+        )
+
+
+def unindex_post(post_id):
+    if search_backend() != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}" WHERE rowid = %s', [post_id])
+
+
+def rebuild_index():
+    """
+    Recreates the contents of the SQLite FTS5 table from the posts table,
+    e.g. after rows were changed with QuerySet.update().
+    """
+    if search_backend() != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}"')
+        cursor.execute(f'INSERT INTO "{FTS_TABLE}" (rowid, title, content) SELECT id, title, content FROM posts_post')
+
+
+class PostSearchFilter(BaseFilterBackend):
+    """
+    Full-text search over post titles and content with ?search=, ranked by
+    relevance. Replaces SearchFilter, whose LIKE '%term%' scans every post.
+    Results carry `search_rank`, which PostPagination orders by.
+    """
+    search_param = 'search'
+
+    def get_search_terms(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        text = self.get_search_terms(request)
+        if not text:
+            return queryset
+        return search_posts(queryset, text)
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Full-text search over title and content, ranked by relevance.',
+            'schema': {'type': 'string'},
+        }]
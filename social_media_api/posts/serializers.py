@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Post, Comment
+from .models import Post, Comment, Like, comment_preview_size
 from accounts.serializers import UserSerializer
 
 
@@ -16,10 +16,30 @@ class CommentSerializer(serializers.ModelSerializer):
 # Serializer for Post Model. this handles the relationship and validate data
 class PostSerializer(serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='author.username')
-    comments = CommentSerializer(many=True, read_only=True)
+    # Only the latest few comments; the full thread is served by /posts/{id}/comments/
+    comments = serializers.SerializerMethodField()
+    likes_count = serializers.ReadOnlyField(source='like_count')
+    comments_count = serializers.ReadOnlyField(source='comment_count')
 
     class Meta:
         model = Post
-        fields = ['id', 'author', 'title', 'content', 'created_at', 'updated_at','comments']
+        fields = ['id', 'author', 'title', 'content', 'created_at', 'updated_at','comments', 'likes_count', 'comments_count']
         read_only_fields = ['author']
 
+    def get_comments(self, obj):
+        preview = getattr(obj, 'comment_preview', None)
+        if preview is None:
+            preview = obj.comments.select_related('author').order_by('-created_at', '-id')[:comment_preview_size()]
+        # Newest comments are fetched first but shown in thread order
+        return CommentSerializer(reversed(list(preview)), many=True, context=self.context).data
+
+
+class LikeSerializer(serializers.ModelSerializer):
+    user = serializers.ReadOnlyField(source='user.username')
+    post = serializers.ReadOnlyField(source='post.id')
+
+    class Meta:
+        model = Like
+        fields = ['id', 'user', 'post', 'created_at']
+        read_only_fields = ['user', 'post', 'created_at']
+
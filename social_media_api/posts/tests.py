@@ -1,3 +1,441 @@
-from django.test import TestCase
+# posts/tests.py
 
-# Create your tests here.
+from decimal import Decimal
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from accounts.models import CustomUser
+from .models import Post, Comment, Like, PulledAuthor, TimelineEntry
+from .pagination import KeysetPagination
+from .search import RANK_PLACES, search_posts
+
+
+class PostQueryCountTests(APITestCase):
+    """
+    Regression tests for the number of queries needed to serialize a page of posts.
+    The count must not grow with the number of posts, comments or likes.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.reader = CustomUser.objects.create_user(username='reader', password='password123')
+        self.authors = [
+            CustomUser.objects.create_user(username=f'author{i}', password='password123')
+            for i in range(3)
+        ]
+        for author in self.authors:
+            self.client.force_authenticate(self.reader)
+            self.client.post(reverse('follow-user', kwargs={'user_id': author.id}))
+
+        # Ten posts with a few comments and likes each fill one page
+        for i in range(10):
+            author = self.authors[i % 3]
+            post = Post.objects.create(author=author, title=f'Post {i}', content='Content')
+            for commenter in self.authors:
+                Comment.objects.create(post=post, author=commenter, content='Nice')
+                Like.objects.create(post=post, user=commenter)
+            self.client.force_authenticate(author)
+            self.client.post(reverse('post-list'), {'title': f'Feed post {i}', 'content': 'Content'})
+
+        # The rows above bypass the views, so bring the stored counters up to date
+        call_command('reconcile_post_counters', stdout=StringIO())
+        self.client.force_authenticate(self.reader)
+
+    def test_post_list_query_count(self):
+        """
+        A page of posts is loaded with one query for the posts and one for their comments.
+        """
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('post-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_post_detail_query_count(self):
+        """
+        A single post is loaded with the same two queries.
+        """
+        post = Post.objects.filter(title='Post 0').get()
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('post-detail', kwargs={'pk': post.pk}))
+        self.assertEqual(response.data['likes_count'], 3)
+        self.assertEqual(response.data['comments_count'], 3)
+        self.assertEqual(len(response.data['comments']), 3)
+
+    def test_feed_query_count(self):
+        """
+        Followed authors served on read are found in the cached follow graph,
+        so a warm feed page takes the same two queries as the post list.
+        """
+        self.client.get(reverse('feed'))
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('feed'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 10)
+
+
+class TimelineTests(APITestCase):
+    """
+    Tests for the fan-out-on-write timelines and the authors pulled on read.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.author = CustomUser.objects.create_user(username='author', password='password123')
+        self.readers = [
+            CustomUser.objects.create_user(username=f'reader{i}', password='password123') for i in range(5)
+        ]
+
+    def follow(self, reader, action='follow-user'):
+        self.client.force_authenticate(reader)
+        self.client.post(reverse(action, kwargs={'user_id': self.author.id}))
+
+    def publish(self, title):
+        self.client.force_authenticate(self.author)
+        response = self.client.post(reverse('post-list'), {'title': title, 'content': 'Content'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def feed(self, reader):
+        self.client.force_authenticate(reader)
+        return [post['title'] for post in self.client.get(reverse('feed')).data['results']]
+
+    def entries(self, reader):
+        return list(TimelineEntry.objects.filter(user=reader).values_list('post__title', flat=True))
+
+    def test_new_posts_fan_out_and_deletes_follow(self):
+        for reader in self.readers:
+            self.follow(reader)
+        post_id = self.publish('Hello')
+        for reader in self.readers:
+            self.assertEqual(self.entries(reader), ['Hello'])
+            self.assertEqual(self.feed(reader), ['Hello'])
+
+        self.client.force_authenticate(self.author)
+        self.client.delete(reverse('post-detail', kwargs={'pk': post_id}))
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(self.readers[0]), [])
+
+    @override_settings(FEED_BACKFILL_LIMIT=2)
+    def test_follow_backfills_latest_posts_and_unfollow_trims(self):
+        for i in range(3):
+            self.publish(f'Post {i}')
+        self.follow(self.readers[0])
+        self.assertEqual(self.entries(self.readers[0]), ['Post 2', 'Post 1'])
+
+        self.follow(self.readers[0], 'unfollow-user')
+        self.assertEqual(self.entries(self.readers[0]), [])
+        self.assertEqual(self.feed(self.readers[0]), [])
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1, FEED_FANOUT_HYSTERESIS=0)
+    def test_popular_authors_are_pulled_on_read(self):
+        for reader in self.readers[:2]:
+            self.follow(reader)
+        self.publish('Popular')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(self.readers[0]), ['Popular'])
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=3, FEED_FANOUT_HYSTERESIS=1)
+    def test_crossing_the_limit_switches_paths(self):
+        """
+        Authors switch to pull above the limit plus the margin, and back to
+        fan-out below the limit minus it once the pending backfill has run.
+        """
+        self.follow(self.readers[0])
+        self.publish('Fanned out')
+        self.assertEqual(self.feed(self.readers[0]), ['Fanned out'])
+
+        # Five followers put the author over the band: new posts are pulled
+        for reader in self.readers[1:]:
+            self.follow(reader)
+        self.publish('Pulled')
+        self.assertEqual(self.entries(self.readers[0]), ['Fanned out'])
+        self.assertEqual(self.feed(self.readers[0]), ['Pulled', 'Fanned out'])
+
+        # Back at the limit, and even under it, the author stays pulled
+        for reader in self.readers[2:]:
+            self.follow(reader, 'unfollow-user')
+        self.assertFalse(PulledAuthor.objects.get().backfill_pending)
+
+        # Under the band: marked only, the posts are copied by the worker
+        self.follow(self.readers[1], 'unfollow-user')
+        self.assertTrue(PulledAuthor.objects.get().backfill_pending)
+        self.assertEqual(self.entries(self.readers[0]), ['Fanned out'])
+        self.assertEqual(self.feed(self.readers[0]), ['Pulled', 'Fanned out'])
+
+        out = StringIO()
+        call_command('rebuild_timelines', pending=True, stdout=out)
+        self.assertIn('Returned 1 authors to fan-out.', out.getvalue())
+        self.assertFalse(PulledAuthor.objects.exists())
+        self.assertCountEqual(self.entries(self.readers[0]), ['Pulled', 'Fanned out'])
+        self.publish('Fanned out again')
+        self.assertCountEqual(self.entries(self.readers[0]), ['Fanned out again', 'Pulled', 'Fanned out'])
+        self.assertEqual(self.feed(self.readers[0]), ['Fanned out again', 'Pulled', 'Fanned out'])
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=3, FEED_FANOUT_HYSTERESIS=1)
+    def test_unfollow_under_the_band_stays_cheap(self):
+        """
+        The unfollow that sends an author back to fan-out writes no timeline
+        rows, however many followers remain.
+        """
+        for reader in self.readers:
+            self.follow(reader)
+        self.publish('Pulled')
+        for reader in self.readers[2:]:
+            self.follow(reader, 'unfollow-user')
+
+        self.client.force_authenticate(self.readers[1])
+        url = reverse('unfollow-user', kwargs={'user_id': self.author.id})
+        # user, unfollow (savepoint, delete, two counters, stale mark, release),
+        # trim, follower count and mode, backfill mark
+        with self.assertNumQueries(10):
+            self.client.post(url)
+        self.assertTrue(PulledAuthor.objects.get().backfill_pending)
+        self.assertEqual(self.entries(self.readers[0]), [])
+
+
+class PostCounterTests(APITestCase):
+    """
+    Tests for the denormalized like and comment counters on Post.
+    """
+
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(username='author', password='password123')
+        self.fan = CustomUser.objects.create_user(username='fan', password='password123')
+        self.post = Post.objects.create(author=self.author, title='Title', content='Content')
+        self.client.force_authenticate(self.fan)
+
+    def test_like_and_unlike_update_counter(self):
+        """
+        Liking twice counts once, and unliking brings the counter back down.
+        """
+        self.client.post(reverse('like-post', kwargs={'pk': self.post.pk}))
+        self.client.post(reverse('like-post', kwargs={'pk': self.post.pk}))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+        self.client.post(reverse('unlike-post', kwargs={'pk': self.post.pk}))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+
+    def test_like_writes_are_single_statements(self):
+        """
+        A like is one conditional insert and an unlike one filtered delete,
+        each followed by the counter update; repeats and missing posts are reported.
+        """
+        url = reverse('like-post', kwargs={'pk': self.post.pk})
+        with self.assertNumQueries(6):
+            # post lookup, savepoint, insert, counter update, release, notification
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with self.assertNumQueries(4):
+            self.assertEqual(self.client.post(url).status_code, status.HTTP_200_OK)
+
+        unlike_url = reverse('unlike-post', kwargs={'pk': self.post.pk})
+        self.assertEqual(self.client.post(unlike_url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.post(unlike_url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(reverse('like-post', kwargs={'pk': 0})).status_code, status.HTTP_404_NOT_FOUND)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertFalse(Like.objects.exists())
+
+    def test_reconcile_fixes_drifted_counters(self):
+        """
+        The reconcile command rewrites counters that no longer match the rows.
+        """
+        Like.objects.create(post=self.post, user=self.fan)
+        Post.objects.filter(pk=self.post.pk).update(comment_count=7)
+
+        Post.objects.create(author=self.author, title='In step', content='Content')
+
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('reconcile_post_counters', batch_size=1, stdout=out)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(self.post.comment_count, 0)
+        self.assertIn('Checked 2 posts, fixed 1.', out.getvalue())
+        # Counted in one UPDATE per range, without joining likes to comments
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertNotIn('JOIN', updates[0])
+
+
+class CommentPreviewTests(APITestCase):
+    """
+    Tests for the bounded comment preview and the paginated comment thread.
+    """
+
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(username='author', password='password123')
+        self.post = Post.objects.create(author=self.author, title='Title', content='Content')
+        self.comments = [
+            Comment.objects.create(post=self.post, author=self.author, content=f'Comment {i}')
+            for i in range(8)
+        ]
+        self.client.force_authenticate(self.author)
+
+    def test_post_embeds_only_latest_comments(self):
+        """
+        Posts carry the latest comments in thread order, not the whole thread.
+        """
+        response = self.client.get(reverse('post-list'))
+        comments = response.data['results'][0]['comments']
+        self.assertEqual([c['id'] for c in comments], [c.id for c in self.comments[-3:]])
+
+    def test_comment_thread_is_paginated(self):
+        """
+        The nested endpoint walks the full thread oldest first through cursors.
+        """
+        url = reverse('post-comments', kwargs={'pk': self.post.pk}) + '?page_size=5'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen += [c['id'] for c in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, [c.id for c in self.comments])
+
+    def test_comment_created_on_thread(self):
+        """
+        Posting to the nested endpoint attaches the comment and bumps the counter.
+        """
+        url = reverse('post-comments', kwargs={'pk': self.post.pk})
+        response = self.client.post(url, {'content': 'Hello'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['post'], self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_comments_are_not_created_outside_a_thread(self):
+        """
+        The flat comment endpoint has no post to attach to, so it does not accept creates.
+        """
+        response = self.client.post(reverse('comment-list'), {'post': self.post.pk, 'content': 'Hello'})
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(Comment.objects.count(), len(self.comments))
+
+
+class KeysetPaginationTests(APITestCase):
+    """
+    Tests for the opaque cursors of KeysetPagination.
+    """
+
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(username='author', password='password123')
+        created_at = timezone.now()
+        # Five posts sharing one timestamp: only the id breaks the tie
+        self.posts = [
+            Post.objects.create(author=self.author, title=f'Post {i}', content='Content') for i in range(5)
+        ]
+        Post.objects.update(created_at=created_at)
+
+    def paginate(self, cursor=None, page_size=2):
+        params = {'page_size': page_size}
+        if cursor is not None:
+            params['cursor'] = cursor
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(Post.objects.all(), Request(APIRequestFactory().get('/', params)))
+        return paginator, page
+
+    def test_cursor_round_trip(self):
+        paginator, page = self.paginate()
+        position = paginator.next_position
+        self.assertEqual(position, [page[-1].created_at.isoformat(), page[-1].id])
+        request = Request(APIRequestFactory().get('/', {'cursor': paginator.encode_cursor(position)}))
+        self.assertEqual(paginator.decode_cursor(request), position)
+        self.assertEqual(paginator.parse_position(position, Post.objects.all()), [page[-1].created_at, page[-1].id])
+
+    def test_ties_are_paged_by_id(self):
+        """
+        Rows sharing the first sort key are neither skipped nor repeated.
+        """
+        seen, cursor = [], None
+        while True:
+            paginator, page = self.paginate(cursor)
+            seen += [post.id for post in page]
+            if not paginator.has_next:
+                break
+            cursor = paginator.encode_cursor(paginator.next_position)
+        self.assertEqual(seen, sorted((post.id for post in self.posts), reverse=True))
+
+    def test_tampered_cursor_is_rejected(self):
+        paginator = KeysetPagination()
+        for position in (['2026-01-01T00:00:00+00:00'], ['not a date', 1], ['2026-01-01T00:00:00+00:00', 'x']):
+            with self.subTest(position=position), self.assertRaises(NotFound):
+                self.paginate(paginator.encode_cursor(position))
+        for cursor in ('%%%', 'bm90IGpzb24='):
+            with self.subTest(cursor=cursor), self.assertRaises(NotFound):
+                self.paginate(cursor)
+
+
+class PostSearchTests(APITestCase):
+    """
+    Tests for the full-text post search.
+    """
+
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(username='author', password='password123')
+        self.in_title = Post.objects.create(author=self.author, title='Gardening tips', content='Water daily.')
+        self.in_content = Post.objects.create(author=self.author, title='Weekend', content='Some gardening and reading.')
+        Post.objects.create(author=self.author, title='Cooking', content='Pasta recipes.')
+        self.client.force_authenticate(self.author)
+
+    def search(self, text, **params):
+        response = self.client.get(reverse('post-list'), {'search': text, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_results_are_ranked(self):
+        """
+        Matches in the title rank above matches in the content; stemming applies.
+        """
+        response = self.search('gardens')
+        self.assertEqual([p['id'] for p in response.data['results']], [self.in_title.id, self.in_content.id])
+
+    def test_index_follows_edits_and_deletes(self):
+        """
+        Edited and deleted posts are reflected in the results straight away.
+        """
+        self.client.patch(reverse('post-detail', kwargs={'pk': self.in_content.pk}), {'content': 'Only reading.'})
+        self.assertEqual([p['id'] for p in self.search('gardening').data['results']], [self.in_title.id])
+
+        self.client.delete(reverse('post-detail', kwargs={'pk': self.in_title.pk}))
+        self.assertEqual(self.search('gardening').data['results'], [])
+
+    def test_search_results_are_paginated(self):
+        """
+        Cursors walk the ranked results without repeats, and operators in the query are harmless.
+        """
+        for i in range(5):
+            Post.objects.create(author=self.author, title=f'Garden diary {i}', content='gardening')
+        url = reverse('post-list') + '?search=gardening&page_size=2'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            seen += [p['id'] for p in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_rank_is_a_fixed_precision_decimal(self):
+        """
+        The rank sorts and travels in cursors as an exact decimal.
+        """
+        ranks = search_posts(Post.objects.all(), 'gardening').values_list('search_rank', flat=True)
+        for rank in ranks:
+            self.assertIsInstance(rank, Decimal)
+            self.assertEqual(rank, round(rank, RANK_PLACES))
+        cursor = self.search('gardening', page_size=1).data['next']
+        position = KeysetPagination().decode_cursor(Request(APIRequestFactory().get(cursor)))
+        self.assertEqual(Decimal(position[0]), max(ranks))
+        self.assertEqual(position[1], self.in_title.id)
+        self.assertEqual(self.search('garden* OR "').status_code, status.HTTP_200_OK)
@@ -0,0 +1,274 @@
+# posts/timeline.py
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from accounts.graph import Follow, following_ids
+from .models import Post, PulledAuthor, TimelineEntry
+
+
+BATCH_SIZE = 1000
+CELEBRITIES_KEY = 'posts:feed:celebrities'
+
+
+def fanout_max_followers():
+    """
+    Authors with more followers than this are not fanned out on write.
+    Their posts are merged into the feed at read time instead, so a single
+    post from a very popular account does not turn into millions of inserts.
+    """
+    return getattr(settings, 'FEED_FANOUT_MAX_FOLLOWERS', 5000)
+
+
+def backfill_limit():
+    """
+    How many of an author's latest posts are copied into a timeline on follow.
+    """
+    return getattr(settings, 'FEED_BACKFILL_LIMIT', 200)
+
+
+def fanout_hysteresis():
+    """
+    Followers an author must get past fanout_max_followers() before being
+    switched to pull, and lose under it before being switched back, so an
+    account hovering at the limit does not flip paths on every follow.
+    """
+    return getattr(settings, 'FEED_FANOUT_HYSTERESIS', 500)
+
+
+def celebrity_ids():
+    """
+    Returns the IDs of every pulled author (PulledAuthor), whose posts are
+    merged into feeds on read. There are few of them by definition, so the
+    whole set is cached for FEED_CELEBRITY_CACHE_TIMEOUT seconds and feeds
+    need no query to find the ones a user follows.
+    """
+    ids = cache.get(CELEBRITIES_KEY)
+    if ids is None:
+        ids = set(PulledAuthor.objects.values_list('author_id', flat=True))
+        cache.set(CELEBRITIES_KEY, ids, getattr(settings, 'FEED_CELEBRITY_CACHE_TIMEOUT', 5 * 60))
+    return ids
+
+
+def is_fanout_author(author):
+    """
+    Returns True when the author's posts should be written into follower timelines.
+    """
+    return not PulledAuthor.objects.filter(author_id=author.pk).exists()
+
+
+def fan_out_post(post):
+    """
+    Copies a newly created post into the timeline of every follower of its author.
+    """
+    if not is_fanout_author(post.author):
+        return 0
+    follower_ids = post.author.followers.values_list('id', flat=True).iterator(chunk_size=BATCH_SIZE)
+    entries = (
+        TimelineEntry(user_id=follower_id, post=post, author_id=post.author_id, created_at=post.created_at)
+        for follower_id in follower_ids
+    )
+    return _bulk_insert(entries)
+
+
+def backfill_timeline(user, author):
+    """
+    Adds the author's most recent posts to the user's timeline after a follow.
+    """
+    if not is_fanout_author(author):
+        return 0
+    posts = Post.objects.filter(author=author).order_by('-created_at', '-id').values_list('id', 'created_at')
+    entries = (
+        TimelineEntry(user=user, post_id=post_id, author=author, created_at=created_at)
+        for post_id, created_at in posts[:backfill_limit()]
+    )
+    return _bulk_insert(entries)
+
+
+def backfill_timelines(user, author_ids):
+    """
+    Bulk version of backfill_timeline for a user who just followed many authors.
+    The latest posts of every fan-out author are picked with one windowed query.
+    """
+    pulled_ids = PulledAuthor.objects.filter(author__in=author_ids).values('author')
+    posts = Post.objects.filter(author__in=author_ids).exclude(author__in=pulled_ids).annotate(
+        rank=Window(RowNumber(), partition_by=F('author'), order_by=[F('created_at').desc(), F('id').desc()])
+    ).filter(rank__lte=backfill_limit()).values_list('id', 'author_id', 'created_at')
+    entries = (
+        TimelineEntry(user=user, post_id=post_id, author_id=author_id, created_at=created_at)
+        for post_id, author_id, created_at in posts.iterator(chunk_size=BATCH_SIZE)
+    )
+    return _bulk_insert(entries)
+
+
+def recheck_fanout(author_ids):
+    """
+    Moves authors whose follower count has left the band of
+    fanout_hysteresis() followers around fanout_max_followers() to the other
+    feed path. Called after follows and unfollows, so it only reads the
+    counts and flips PulledAuthor rows; nothing here scales with followers.
+
+    An author above the band is pulled on read from now on, so the cached
+    celebrity set is dropped; the rows already in timelines stay and are
+    merged with the pulled posts. An author below it is only marked
+    backfill_pending and stays pulled until backfill_pulled_authors(), run
+    by "rebuild_timelines --pending", has copied their latest posts into
+    their followers' timelines. Returns the IDs of the authors that moved.
+    """
+    limit, margin = fanout_max_followers(), fanout_hysteresis()
+    rows = get_user_model().objects.filter(pk__in=author_ids).filter(
+        Q(followers_count__gt=limit + margin) | Q(followers_count__lt=limit - margin)
+    ).values_list('pk', 'followers_count', 'feed_pull__backfill_pending')
+
+    pulled, resumed, pending = [], [], []
+    for author_id, followers, backfill_pending in rows:
+        if followers > limit + margin:
+            if backfill_pending is None:
+                pulled.append(author_id)
+            elif backfill_pending:
+                resumed.append(author_id)
+        elif backfill_pending is False:
+            pending.append(author_id)
+
+    if pulled:
+        PulledAuthor.objects.bulk_create([PulledAuthor(author_id=pk) for pk in pulled], ignore_conflicts=True)
+        cache.delete(CELEBRITIES_KEY)
+    if resumed:
+        # Back over the band before the worker got to them: stay pulled
+        PulledAuthor.objects.filter(author__in=resumed).update(backfill_pending=False)
+    if pending:
+        PulledAuthor.objects.filter(author__in=pending).update(backfill_pending=True, marked_at=timezone.now())
+    return pulled + pending
+
+
+def backfill_pulled_authors():
+    """
+    Returns the authors marked backfill_pending to fan-out. Each one's row
+    is removed first, so posts published from then on are fanned out, and
+    their latest posts are then copied into every follower's timeline.
+    That copy touches up to fanout_max_followers() timelines per author,
+    which is why it runs here and not in the unfollow request.
+    Returns the number of authors moved.
+    """
+    moved = 0
+    for author_id in PulledAuthor.objects.filter(backfill_pending=True).values_list('author_id', flat=True):
+        # A follow may have put the author back over the band since
+        if not PulledAuthor.objects.filter(author_id=author_id, backfill_pending=True).delete()[0]:
+            continue
+        _backfill_followers(author_id)
+        moved += 1
+    if moved:
+        # Dropped last, so feeds keep pulling these posts until they are copied
+        cache.delete(CELEBRITIES_KEY)
+    return moved
+
+
+def reset_pulled_authors():
+    """
+    Recomputes PulledAuthor from the follower counts alone, for
+    rebuild_timelines after counts were changed outside the follow views.
+    Pending backfills are dropped with it, as the rebuild covers them.
+    """
+    PulledAuthor.objects.all().delete()
+    users = get_user_model().objects.filter(followers_count__gt=fanout_max_followers())
+    PulledAuthor.objects.bulk_create(
+        (PulledAuthor(author_id=pk) for pk in users.values_list('pk', flat=True).iterator(chunk_size=BATCH_SIZE)),
+        batch_size=BATCH_SIZE,
+    )
+    cache.delete(CELEBRITIES_KEY)
+
+
+def _backfill_followers(author_id):
+    """
+    Copies the author's latest posts into the timelines of all their
+    followers with one INSERT ... SELECT, skipping rows already there.
+    """
+    timeline = TimelineEntry._meta.db_table
+    post = Post._meta.db_table
+    follow = Follow._meta.db_table
+    columns = f'{timeline} (user_id, post_id, author_id, created_at)'
+    select = (
+        f'SELECT {follow}.from_customuser_id, latest.id, latest.author_id, latest.created_at FROM {follow} '
+        f'INNER JOIN (SELECT id, author_id, created_at FROM {post} WHERE author_id = %s '
+        f'ORDER BY created_at DESC, id DESC LIMIT %s) latest ON latest.author_id = {follow}.to_customuser_id '
+        f'WHERE {follow}.to_customuser_id = %s'
+    )
+    if connection.vendor == 'postgresql':
+        sql = f'INSERT INTO {columns} {select} ON CONFLICT (user_id, post_id) DO NOTHING'
+    elif connection.vendor == 'mysql':
+        sql = f'INSERT IGNORE INTO {columns} {select}'
+    else:
+        sql = f'INSERT OR IGNORE INTO {columns} {select}'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [author_id, backfill_limit(), author_id])
+        return cursor.rowcount
+
+
+def trim_timeline(user, author):
+    """
+    Removes the author's posts from the user's timeline after an unfollow.
+    Deleted posts leave the timelines through the cascade on TimelineEntry.post.
+    """
+    return trim_timelines(user, [author.pk])
+
+
+def trim_timelines(user, author_ids):
+    """
+    Removes the posts of several unfollowed authors from the user's timeline.
+    """
+    deleted, _ = TimelineEntry.objects.filter(user=user, author__in=author_ids).delete()
+    return deleted
+
+
+def rebuild_timeline(user):
+    """
+    Recomputes a user's timeline from scratch using the current follow graph.
+    """
+    TimelineEntry.objects.filter(user=user).delete()
+    return sum(backfill_timeline(user, author) for author in user.following.all())
+
+
+def feed_queryset(user):
+    """
+    Returns the posts in the user's home feed, newest first.
+
+    Posts from regular authors are read from the materialized timeline.
+    Posts from followed pulled authors (see recheck_fanout) are pulled in at
+    read time (fan-out-on-read), which keeps their write cost constant. They
+    are found from the cached follow graph and celebrity set, without a query.
+
+    Both branches expose the sort key as feed_created_at / feed_id so the
+    feed can be keyset-paginated the same way.
+    """
+    followed_celebrities = celebrity_ids().intersection(following_ids(user.pk))
+    if not followed_celebrities:
+        # Pure fan-out-on-write: ordered by the timeline index itself
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_created_at=F('timeline_entries__created_at'),
+            feed_id=F('timeline_entries__post'),
+        ).order_by('-feed_created_at', '-feed_id')
+
+    timeline_post_ids = TimelineEntry.objects.filter(user=user).values('post')
+    return Post.objects.filter(
+        Q(pk__in=timeline_post_ids) | Q(author__in=followed_celebrities)
+    ).annotate(
+        feed_created_at=F('created_at'),
+        feed_id=F('id'),
+    ).order_by('-feed_created_at', '-feed_id')
+
+
+def _bulk_insert(entries):
+    created = 0
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            created += len(TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True))
+            batch = []
+    if batch:
+        created += len(TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True))
+    return created
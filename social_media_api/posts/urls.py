@@ -2,7 +2,7 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PostViewSet, CommentViewSet,FeedView,LikePostView,UnlikePostView
+from .views import PostViewSet, CommentViewSet,FeedView,LikePostView,UnlikePostView,PostCommentListView
 
 router = DefaultRouter()
 router.register(r'posts', PostViewSet)
@@ -13,5 +13,6 @@ urlpatterns = [
     path('feed/',FeedView.as_view(), name='feed'),
     path('posts/<int:pk>/like/', LikePostView.as_view(), name='like-post'),
     path('posts/<int:pk>/unlike/', UnlikePostView.as_view(), name='unlike-post'),
+    path('posts/<int:pk>/comments/', PostCommentListView.as_view(), name='post-comments'),
 
 ]
\ No newline at end of file
@@ -1,16 +1,21 @@
 # posts/views.py
 
+from django.db import transaction
+from django.db.models import F
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import generics,viewsets, permissions,status, filters
+from rest_framework import generics, mixins, viewsets, permissions,status
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Post, Comment,Like
+from .models import Post, Comment
 from .serializers import PostSerializer, CommentSerializer
 from .permissions import IsOwnerOrReadOnly
 from rest_framework.generics import ListAPIView
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
-from notifications.models import Notification
+from notifications.queue import enqueue
+from .timeline import fan_out_post, feed_queryset
+from .pagination import PostPagination, FeedPagination, CommentPagination
+from .search import PostSearchFilter
+from .likes import like_post, unlike_post
 
 
 class PostViewSet(viewsets.ModelViewSet):
@@ -18,33 +23,72 @@ class PostViewSet(viewsets.ModelViewSet):
     ViewSet for handling Post-related API operations.
     Provides CRUD functionality for posts and applies search and filtering.
     """
-    queryset = Post.objects.all()
+    queryset = Post.objects.with_related()
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    pagination_class = PostPagination
+    filter_backends = [DjangoFilterBackend, PostSearchFilter]
     filterset_fields = ['author']
-    search_fields = ['title', 'content']
 
     def perform_create(self, serializer):
         """
-        Sets the author of the post to the current user upon creation.
+        Sets the author of the post to the current user upon creation
+        and writes the post into the timelines of the author's followers.
         """
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        fan_out_post(post)
 
-class CommentViewSet(viewsets.ModelViewSet):
+def save_comment(serializer, **kwargs):
+    """
+    Saves a new comment, bumps the comment counter of its post
+    and queues a notification for the post's author.
+    """
+    with transaction.atomic():
+        comment = serializer.save(**kwargs)
+        Post.objects.filter(pk=comment.post_id).update(comment_count=F('comment_count') + 1)
+    if comment.post.author_id != comment.author_id:
+        enqueue(recipient=comment.post.author_id, actor=comment.author_id, verb='commented on your post', target=comment.post)
+    return comment
+
+
+class CommentViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.UpdateModelMixin,
+                     mixins.DestroyModelMixin, viewsets.GenericViewSet):
     """
     ViewSet for handling Comment-related API operations.
-    Provides CRUD functionality for comments.
+    Lists, shows, edits and deletes comments. Comments are created on
+    their post's thread (PostCommentListView), which sets the post.
     """
-    queryset = Comment.objects.all()
+    queryset = Comment.objects.select_related('author')
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
 
-    def perform_create(self, serializer):
+    def perform_destroy(self, instance):
         """
-        Sets the author of the comment to the current user.
+        Deletes the comment and lowers the comment counter of the post.
         """
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            post_id = instance.post_id
+            instance.delete()
+            Post.objects.filter(pk=post_id, comment_count__gt=0).update(comment_count=F('comment_count') - 1)
+
+
+class PostCommentListView(generics.ListCreateAPIView):
+    """
+    API view for the full comment thread of a single post.
+    Lists comments oldest first with cursor pagination and adds new ones.
+    """
+    serializer_class = CommentSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = CommentPagination
+
+    def get_post(self):
+        return generics.get_object_or_404(Post, pk=self.kwargs['pk'])
+
+    def get_queryset(self):
+        return Comment.objects.filter(post=self.get_post()).select_related('author')
+
+    def perform_create(self, serializer):
+        save_comment(serializer, author=self.request.user, post=self.get_post())
 
 
 class FeedView(ListAPIView):
@@ -53,46 +97,48 @@ class FeedView(ListAPIView):
     """
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = PageNumberPagination
+    pagination_class = FeedPagination
 
     def get_queryset(self):
-        # Get the users that the current user is following
-        following_users = self.request.user.following.all()
-        # Return posts from those users, ordered by creation date
-        queryset = Post.objects.filter(author__in=following_users).order_by('-created_at')
-        return queryset
-    
+        # Read the precomputed timeline of the current user, newest first
+        return feed_queryset(self.request.user).with_related()
+
+
+def get_post_stub(pk):
+    """
+    Loads only the id and author of a post, which is all the like endpoints
+    need to write the like and address the notification.
+    """
+    return generics.get_object_or_404(Post.objects.only('id', 'author_id'), pk=pk)
+
+
 class LikePostView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
-        post = generics.get_object_or_404(Post, pk=pk)  
-        like, created = Like.objects.get_or_create(user=request.user, post=post)
-        if created:
-            Notification.objects.create(
-                recipient=post.author,
-                actor=request.user,
-                verb='liked your post',
-                target=post
-            )
-            return Response({'message': 'Post liked'}, status=status.HTTP_201_CREATED)
-        return Response({'message': 'Already liked'}, status=status.HTTP_200_OK)
+        post = get_post_stub(pk)
+        if not like_post(request.user, post.pk):
+            return Response({'message': 'Already liked'}, status=status.HTTP_200_OK)
+        enqueue(
+            recipient=post.author_id,
+            actor=request.user,
+            verb='liked your post',
+            target=post
+        )
+        return Response({'message': 'Post liked'}, status=status.HTTP_201_CREATED)
 
 
 class UnlikePostView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
-        post = generics.get_object_or_404(Post, pk=pk)  
-        try:
-            like = Like.objects.get(user=request.user, post=post)
-            like.delete()
-            Notification.objects.create(
-                recipient=post.author,
-                actor=request.user,
-                verb='unliked your post',
-                target=post
-            )
-            return Response({'message': 'Post unliked'}, status=status.HTTP_200_OK)
-        except Like.DoesNotExist:
-            return Response({'message': 'You have not liked this post'}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        post = get_post_stub(pk)
+        if not unlike_post(request.user, post.pk):
+            return Response({'message': 'You have not liked this post'}, status=status.HTTP_400_BAD_REQUEST)
+        enqueue(
+            recipient=post.author_id,
+            actor=request.user,
+            verb='unliked your post',
+            target=post
+        )
+        return Response({'message': 'Post unliked'}, status=status.HTTP_200_OK)
\ No newline at end of file
@@ -11,11 +11,16 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+from django.conf import global_settings
 import dj_database_url
 import os
+import sys
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Apps shared by the projects of this repository (e.g. tokenauth)
+sys.path.insert(0, str(BASE_DIR.parent / 'shared'))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -46,6 +51,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'accounts',
     'rest_framework.authtoken',
+    'tokenauth',
     'posts',
     'notifications',
 ]
@@ -53,12 +59,58 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'tokenauth.authentication.CachingTokenAuthentication',
+        'accounts.authentication.SignedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
 }
 
+# Validated API tokens are remembered per process for this many seconds
+# (0 disables the cache); the least recently used go first past the size.
+TOKEN_AUTH_CACHE_TIMEOUT = 60
+TOKEN_AUTH_CACHE_SIZE = 10000
+
+# Optional stateless mode: accounts/token/ issues SECRET_KEY-signed access
+# tokens (sent as "Authorization: Bearer ...") that are checked without a
+# database read, and refresh tokens to renew them. Lifetimes are in seconds;
+# revoked tokens sit on a deny-list in the cache until they expire.
+SIGNED_TOKEN_AUTH = os.environ.get('SIGNED_TOKEN_AUTH', '') == '1'
+SIGNED_TOKEN_ACCESS_LIFETIME = 5 * 60
+SIGNED_TOKEN_REFRESH_LIFETIME = 14 * 24 * 60 * 60
+
+# Home feed: authors above this follower count are merged in at read time
+# instead of being fanned out into every follower's timeline.
+FEED_FANOUT_MAX_FOLLOWERS = 5000
+# Authors switch to pull above the limit plus this margin and back to
+# fan-out below the limit minus it; the way back is run by
+# "rebuild_timelines --pending".
+FEED_FANOUT_HYSTERESIS = 500
+FEED_BACKFILL_LIMIT = 200
+# Seconds the set of accounts above that limit is cached for feed reads.
+FEED_CELEBRITY_CACHE_TIMEOUT = 5 * 60
+
+# Lifetime of the cached follower / following ID arrays (accounts.graph)
+FOLLOW_GRAPH_CACHE_TIMEOUT = 60 * 60
+
+# "Who to follow": candidates stored per user by refresh_follow_suggestions.
+# Follows by accounts above the follower limit only refresh their own list.
+FOLLOW_SUGGESTIONS_LIMIT = 50
+FOLLOW_SUGGESTIONS_STALE_MAX_FOLLOWERS = 5000
+
+# Latest comments embedded in each post; the full thread is paginated separately.
+POST_COMMENT_PREVIEW_SIZE = 3
+
+# Notifications for the same recipient, verb and target within this many
+# seconds are folded into one row ("alice and 41 others liked your post").
+NOTIFICATION_AGGREGATION_WINDOW = 24 * 60 * 60
+# Seconds a cached unread counter may live before it is recounted.
+NOTIFICATION_UNREAD_CACHE_TIMEOUT = 300
+# Read notifications older than this many days are archived by the worker
+# every NOTIFICATION_ARCHIVE_INTERVAL seconds (or by archive_notifications).
+NOTIFICATION_RETENTION_DAYS = 90
+NOTIFICATION_ARCHIVE_INTERVAL = 60 * 60
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -88,6 +140,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'social_media_api.wsgi.application'
+# Served under ASGI so the notification stream does not hold a worker thread per client
+ASGI_APPLICATION = 'social_media_api.asgi.application'
 
 
 # Database
@@ -101,6 +155,37 @@ DATABASES = {
     }
 
 
+# Cache
+# The notification worker and the web processes must share one cache for
+# counter invalidation to be seen everywhere, so production uses Redis.
+# The local-memory fallback is only suitable for a single local process.
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Pub/sub behind the notification stream. Redis carries events from the
+# worker process to the web processes; in-process only works when both run
+# in the same process (local development, tests).
+if REDIS_URL:
+    NOTIFICATION_BROKER = 'notifications.pubsub.RedisBroker'
+else:
+    NOTIFICATION_BROKER = 'notifications.pubsub.InProcessBroker'
+# Seconds between keep-alive comments on an idle notification stream.
+NOTIFICATION_STREAM_KEEPALIVE = 15
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -120,6 +205,23 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing profile, picked with the PASSWORD_HASHER_PROFILE env var.
+# The profile's hasher hashes new passwords; Django's default hashers follow
+# it so every existing hash still verifies (and is upgraded on login).
+# "argon2" needs the argon2-cffi package.
+PASSWORD_HASHER_PROFILES = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+}
+_preferred_hasher = PASSWORD_HASHER_PROFILES[os.environ.get('PASSWORD_HASHER_PROFILE', 'pbkdf2')]
+PASSWORD_HASHERS = [_preferred_hasher] + [
+    hasher for hasher in global_settings.PASSWORD_HASHERS if hasher != _preferred_hasher
+]
+
+# Threads used by register/async/ to hash passwords off the event loop
+PASSWORD_HASH_WORKERS = 4
+
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
 # Internationalization